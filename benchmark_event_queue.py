@@ -0,0 +1,198 @@
+"""
+事件队列微基准：在 sarathi 和 nested booking limit 场景下比较各个事件队列实现的 events/sec。
+
+每个场景先完整跑一遍模拟（端到端 events/sec，包含调度和预测的开销），同时记录事件队列的
+push/pop 序列；然后把这个序列在各个队列实现上单独回放，得到只包含队列本身开销的 events/sec。
+
+用法: python benchmark_event_queue.py [--num_requests 8000] [--repeats 5] [--output_file xxx.csv]
+"""
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+from utils import (
+    DEFAULT_PROMPT_TYPES,
+    PREDICTOR_ARGS,
+    REPLICA_ARGS,
+    batch_size_args,
+    booking_limit_args,
+    custom_request_args,
+)
+from vidur.config import BaseEventQueueConfig, SimulationConfig
+from vidur.event_queue import EventQueueRegistry
+from vidur.simulator import Simulator
+from vidur.sweep import get_execution_time_predictor
+from vidur.types import EventQueueType
+from vidur.utils.random import set_seeds
+
+# 不写 trace 和图，只保留模拟本身
+METRICS_ARGS = [
+    "--no-metrics_config_enable_chrome_trace",
+    "--no-metrics_config_store_plots",
+]
+
+
+def get_scenarios(num_requests):
+    return {
+        "sarathi": [
+            *REPLICA_ARGS,
+            *custom_request_args(DEFAULT_PROMPT_TYPES, num_requests),
+            *batch_size_args("sarathi", 128),
+            *PREDICTOR_ARGS,
+        ],
+        "nested_booking_limit": [
+            *REPLICA_ARGS,
+            *custom_request_args(DEFAULT_PROMPT_TYPES, num_requests),
+            *booking_limit_args(
+                "general_nested_booking_limit",
+                "general_nested_booking_limit_scheduler_config",
+                DEFAULT_PROMPT_TYPES,
+                num_requests,
+                40,
+            ),
+            *PREDICTOR_ARGS,
+        ],
+    }
+
+
+class _ReplayEvent:
+    """回放用的轻量事件，只带优先级"""
+
+    __slots__ = ["_priority_number"]
+
+    def __init__(self, priority_number):
+        self._priority_number = priority_number
+
+
+def record_queue_operations(event_queue, operations):
+    """
+    用实例属性包住队列的 push/pop，把操作序列记到 operations 里：
+    push 记录 (time, order)，pop 记录 None。
+    模拟器初始化时已经放进队列的事件先取出来再重新放回，这样回放时也有这些 push
+    """
+    pending_events = [event_queue.pop() for _ in range(len(event_queue))]
+    push, pop = event_queue.push, event_queue.pop
+
+    def recording_push(event):
+        operations.append(event._priority_number[:2])
+        push(event)
+
+    def recording_push_all(events):
+        for event in events:
+            recording_push(event)
+
+    def recording_pop():
+        operations.append(None)
+        return pop()
+
+    event_queue.push = recording_push
+    event_queue.push_all = recording_push_all
+    event_queue.pop = recording_pop
+
+    recording_push_all(pending_events)
+
+
+def run_scenario(args, event_queue_type, output_dir, operations=None):
+    """完整跑一次模拟，返回 (处理的事件数, 模拟耗时)"""
+    config = SimulationConfig.create_from_cli_args(
+        [
+            *args,
+            *METRICS_ARGS,
+            "--event_queue_config_type",
+            str(event_queue_type),
+            "--metrics_config_output_dir",
+            output_dir,
+        ]
+    )
+    set_seeds(config.seed)
+
+    simulator = Simulator(config, get_execution_time_predictor(config))
+    if operations is not None:
+        record_queue_operations(simulator._event_queue, operations)
+
+    num_events = [0]
+    pop = simulator._event_queue.pop
+
+    def counting_pop():
+        num_events[0] += 1
+        return pop()
+
+    simulator._event_queue.pop = counting_pop
+
+    start_time = time.perf_counter()
+    simulator.run()
+    elapsed = time.perf_counter() - start_time
+
+    simulator.write_output()
+    return num_events[0], elapsed
+
+
+def replay_operations(operations, event_queue_type, repeats):
+    """在给定队列实现上回放 push/pop 序列，返回 (pop 次数, 最快一次的耗时)"""
+    config = BaseEventQueueConfig.create_from_type(event_queue_type)
+    events = [
+        None if operation is None else _ReplayEvent(operation)
+        for operation in operations
+    ]
+    num_pops = sum(event is None for event in events)
+
+    best_time = float("inf")
+    for _ in range(repeats):
+        event_queue = EventQueueRegistry.get(event_queue_type, config)
+        push, pop = event_queue.push, event_queue.pop
+
+        start_time = time.perf_counter()
+        for event in events:
+            if event is None:
+                pop()
+            else:
+                push(event)
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    return num_pops, best_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event queue micro-benchmark")
+    parser.add_argument("--num_requests", type=int, default=8000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output_file", type=str, default=None)
+    cli_args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for scenario, args in get_scenarios(cli_args.num_requests).items():
+            # 先用默认的堆跑一遍并记录操作序列，供后面回放
+            operations = []
+            run_scenario(args, EventQueueType.HEAP, output_dir, operations)
+
+            for event_queue_type in EventQueueType:
+                num_events, simulation_time = run_scenario(
+                    args, event_queue_type, output_dir
+                )
+                num_pops, replay_time = replay_operations(
+                    operations, event_queue_type, cli_args.repeats
+                )
+                rows.append(
+                    {
+                        "scenario": scenario,
+                        "event_queue": str(event_queue_type),
+                        "num_events": num_events,
+                        "simulation_time_s": simulation_time,
+                        "simulation_events_per_s": num_events / simulation_time,
+                        "queue_ops": len(operations),
+                        "queue_replay_time_s": replay_time,
+                        "queue_events_per_s": num_pops / replay_time,
+                    }
+                )
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    if cli_args.output_file:
+        results.to_csv(cli_args.output_file, index=False)
+
+
+if __name__ == "__main__":
+    main()
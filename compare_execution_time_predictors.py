@@ -0,0 +1,136 @@
+"""
+比较解析式 (analytical) 预测器和随机森林预测器在 profiling 数据上的精度。
+
+两个预测器用同样的 profiling CSV 和过滤条件得到每个算子的训练数据。每个算子的 MAPE 用 k 折交叉
+验证计算：每一折在其余数据上重新拟合，只在留出的数据上预测，所以随机森林不能靠记住训练点占便宜。
+随机森林每一折沿用网格搜索在全部数据上选出的超参数。另外记录两个预测器的初始化耗时
+(随机森林已经训练过时会从模型缓存里加载)。
+
+用法: python compare_execution_time_predictors.py [--output_file xxx.csv] [其他 vidur 参数 ...]
+其他参数会传给两个预测器的配置，例如 --replica_config_model_name。两个预测器共用的参数可以写成
+--execution_time_predictor_config_xxx，会分别替换成各自的前缀，例如
+--execution_time_predictor_config_attention_input_file。
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import KFold
+
+from utils import REPLICA_ARGS
+from vidur.config import SimulationConfig
+from vidur.execution_time_predictor.profiling_data_execution_time_predictor import (
+    ProfilingDataExecutionTimePredictor,
+)
+from vidur.sweep import get_execution_time_predictor
+
+SHARED_PREFIX = "--execution_time_predictor_config_"
+
+
+def create_predictor(predictor_type, args):
+    """返回 (预测器, 初始化耗时)"""
+    args = [
+        (
+            arg.replace(
+                SHARED_PREFIX, f"--{predictor_type}_execution_time_predictor_config_"
+            )
+            if arg.startswith(SHARED_PREFIX)
+            else arg
+        )
+        for arg in args
+    ]
+    config = SimulationConfig.create_from_cli_args(
+        [*REPLICA_ARGS, *args, f"{SHARED_PREFIX}type", predictor_type]
+    )
+    start_time = time.perf_counter()
+    predictor = get_execution_time_predictor(config)
+    return predictor, time.perf_counter() - start_time
+
+
+def get_training_jobs(predictor):
+    return [
+        *predictor._get_compute_training_jobs(),
+        *predictor._get_cpu_overhead_training_jobs(),
+        *predictor._get_attention_layer_training_jobs(),
+    ]
+
+
+def get_held_out_predictions(job, fit_and_predict, num_splits):
+    """
+    k 折交叉验证：每一折用 fit_and_predict(训练 df, 测试 df) 在其余的行上拟合并预测留出的行，
+    返回每一行的留出预测
+    """
+    predictions = np.zeros(len(job.df))
+    k_fold = KFold(n_splits=min(num_splits, len(job.df)), shuffle=True, random_state=0)
+    for train_index, test_index in k_fold.split(job.df):
+        predictions[test_index] = fit_and_predict(
+            job.df.iloc[train_index], job.df.iloc[test_index]
+        )
+    return predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the analytical and random forest execution time predictors"
+    )
+    parser.add_argument("--output_file", type=str, default=None)
+    cli_args, vidur_args = parser.parse_known_args()
+
+    analytical, analytical_setup_time = create_predictor("analytical", vidur_args)
+    random_forrest, random_forrest_setup_time = create_predictor(
+        "random_forrest", vidur_args
+    )
+    # 预测表已经导出时随机森林模型不会被加载，这里显式加载 (已训练过的直接读缓存)
+    random_forrest_models = random_forrest._models or random_forrest._train_models()
+
+    num_splits = analytical._config.k_fold_cv_splits
+
+    rows = []
+    for job in get_training_jobs(analytical):
+
+        def fit_and_predict_analytical(train_df, test_df):
+            model = analytical._fit_closed_form(job._replace(df=train_df))
+            return model.predict(
+                [test_df[col].to_numpy(dtype=float) for col in job.feature_cols]
+            )
+
+        def fit_and_predict_random_forrest(train_df, test_df):
+            model = clone(random_forrest_models[job.model_name])
+            model.fit(train_df[job.feature_cols], train_df[job.target_col])
+            return model.predict(test_df[job.feature_cols])
+
+        y = job.df[job.target_col].to_numpy()
+        analytical_prediction = get_held_out_predictions(
+            job, fit_and_predict_analytical, num_splits
+        )
+        random_forrest_prediction = get_held_out_predictions(
+            job, fit_and_predict_random_forrest, num_splits
+        )
+        rows.append(
+            {
+                "model": job.model_name,
+                "num_rows": len(job.df),
+                "analytical_mape": ProfilingDataExecutionTimePredictor.mean_absolute_percentage_error(
+                    y, analytical_prediction
+                ),
+                "random_forrest_mape": ProfilingDataExecutionTimePredictor.mean_absolute_percentage_error(
+                    y, random_forrest_prediction
+                ),
+            }
+        )
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    print(
+        f"setup time: analytical {analytical_setup_time:.2f}s, "
+        f"random forest {random_forrest_setup_time:.2f}s"
+    )
+    if cli_args.output_file:
+        results.to_csv(cli_args.output_file, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import pytest
+
+from vidur.scheduler.utils.block_allocator import BlockAllocator
+
+
+def test_allocate_hands_out_lowest_blocks_first():
+    block_allocator = BlockAllocator(8)
+
+    assert block_allocator.allocate(3) == [2, 1, 0]
+    assert block_allocator.allocate(0) == []
+    assert block_allocator.num_free_blocks == 5
+    assert block_allocator.num_allocations == 3
+
+
+def test_freed_blocks_are_reused_first():
+    block_allocator = BlockAllocator(8)
+    first = block_allocator.allocate(2)
+    second = block_allocator.allocate(2)
+
+    block_allocator.free(first)
+    assert block_allocator.allocate(2) == first
+
+    block_allocator.free(second)
+    block_allocator.free(first)
+    # the most recently freed blocks come out first
+    assert block_allocator.allocate(1) == first[-1:]
+    assert block_allocator.allocate(3) == [*second, first[0]]
+
+
+def test_exhaustion():
+    block_allocator = BlockAllocator(4)
+    blocks = block_allocator.allocate(4)
+
+    assert block_allocator.num_free_blocks == 0
+    assert block_allocator.get_largest_free_run() == 0
+    with pytest.raises(AssertionError):
+        block_allocator.allocate(1)
+
+    block_allocator.free(blocks)
+    assert block_allocator.num_free_blocks == 4
+    assert block_allocator.get_largest_free_run() == 4
+
+
+def test_double_free():
+    block_allocator = BlockAllocator(4)
+    blocks = block_allocator.allocate(2)
+    block_allocator.free(blocks)
+
+    with pytest.raises(AssertionError):
+        block_allocator.free(blocks[:1])
+    with pytest.raises(AssertionError):
+        # never allocated
+        block_allocator.free([3])
+    assert block_allocator.num_free_blocks == 4
+
+
+def test_largest_free_run():
+    block_allocator = BlockAllocator(8)
+    blocks = block_allocator.allocate(8)
+
+    block_allocator.free([blocks[0], blocks[1], blocks[4]])
+    assert block_allocator.get_largest_free_run() == 2
+    block_allocator.free([blocks[2], blocks[3]])
+    assert block_allocator.get_largest_free_run() == 5
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from vidur.config import CalendarEventQueueConfig, HeapEventQueueConfig
+from vidur.event_queue.calendar_event_queue import CalendarEventQueue
+from vidur.event_queue.heap_event_queue import HeapEventQueue
+
+
+class _Event:
+    """Stand-in event, the queues only look at the priority number."""
+
+    __slots__ = ["_priority_number"]
+
+    def __init__(self, time: float, order: int) -> None:
+        self._priority_number = (time, order, None)
+
+
+def _push_pop_orders(seed: int, num_operations: int, time_step: float):
+    """
+    Runs the same random push/pop sequence on both queues and returns their pop
+    orders and the bucket counts the calendar queue went through. Times are
+    multiples of `time_step`, so many events share a timestamp and only the
+    creation order breaks the tie. Like in the simulator, an event is never
+    scheduled before the last popped one.
+    """
+    rng = random.Random(seed)
+    heap_queue = HeapEventQueue(HeapEventQueueConfig())
+    calendar_queue = CalendarEventQueue(CalendarEventQueueConfig(num_buckets=4))
+
+    heap_order, calendar_order = [], []
+    bucket_counts = {calendar_queue._num_buckets}
+    now = 0.0
+    order = 0
+    for i in range(num_operations):
+        # grow the queue in the first half and drain it in the second half, so the
+        # calendar queue doubles and then halves its buckets
+        push_probability = 0.7 if i < num_operations // 2 else 0.3
+        if len(heap_queue) and rng.random() > push_probability:
+            heap_event = heap_queue.pop()
+            calendar_event = calendar_queue.pop()
+            now = heap_event._priority_number[0]
+            heap_order.append(heap_event._priority_number[:2])
+            calendar_order.append(calendar_event._priority_number[:2])
+        else:
+            order += 1
+            event = _Event(now + rng.randint(0, 50) * time_step, order)
+            heap_queue.push(event)
+            calendar_queue.push(event)
+        assert len(heap_queue) == len(calendar_queue)
+        bucket_counts.add(calendar_queue._num_buckets)
+
+    while len(heap_queue):
+        heap_order.append(heap_queue.pop()._priority_number[:2])
+        calendar_order.append(calendar_queue.pop()._priority_number[:2])
+    bucket_counts.add(calendar_queue._num_buckets)
+
+    return heap_order, calendar_order, bucket_counts
+
+
+@pytest.mark.parametrize("time_step", [1e-3, 0.5, 7.0])
+def test_calendar_queue_matches_heap_queue(time_step):
+    heap_order, calendar_order, bucket_counts = _push_pop_orders(
+        seed=42, num_operations=5000, time_step=time_step
+    )
+
+    assert calendar_order == heap_order
+    # ties on the timestamp did occur and were broken the same way
+    times = [time for time, _ in heap_order]
+    assert len(set(times)) < len(times)
+    # the queue grew and shrank through several bucket counts
+    assert len(bucket_counts) > 2
+
+
+def test_calendar_queue_equal_timestamps():
+    calendar_queue = CalendarEventQueue(CalendarEventQueueConfig(num_buckets=4))
+    events = [_Event(1.0, order) for order in range(100)]
+    for event in reversed(events):
+        calendar_queue.push(event)
+
+    assert [calendar_queue.pop() for _ in range(len(events))] == events
+    assert len(calendar_queue) == 0
+
+
+def test_calendar_queue_pop_empty():
+    calendar_queue = CalendarEventQueue(CalendarEventQueueConfig())
+
+    with pytest.raises(IndexError):
+        calendar_queue.pop()
@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+
+from vidur.config import (
+    LinearRegressionExecutionTimePredictorConfig,
+    MetricsConfig,
+    ReplicaConfig,
+    VllmSchedulerConfig,
+)
+from vidur.entities import Batch, Request
+from vidur.execution_time_predictor.linear_regression_execution_time_predictor import (
+    LinearRegressionExecutionTimePredictor,
+)
+from vidur.execution_time_predictor.sklearn_execution_time_predictor import (
+    BATCH_SIZE_MODEL_NAMES,
+    TOKEN_MODEL_NAMES,
+)
+
+
+class SumModel:
+    # stands in for a fitted model, the prediction grows with every feature
+    def predict(self, X):
+        return np.asarray(X, dtype=float).sum(axis=1)
+
+
+class UntrainedPredictor(LinearRegressionExecutionTimePredictor):
+    def _train_models(self):
+        return {
+            model_name: SumModel()
+            for model_name in [
+                *TOKEN_MODEL_NAMES,
+                *BATCH_SIZE_MODEL_NAMES,
+                "attn_prefill",
+                "attn_decode",
+            ]
+        }
+
+
+def test_prefix_hit_prefills_beyond_the_kv_cache_grid(tmp_path):
+    predictor_config = LinearRegressionExecutionTimePredictorConfig(
+        prediction_max_tokens_per_request=4096,
+        kv_cache_prediction_granularity=64,
+        lazy_prediction=True,
+    )
+    predictor = UntrainedPredictor(
+        predictor_config=predictor_config,
+        replica_config=ReplicaConfig(),
+        replica_scheduler_config=VllmSchedulerConfig(),
+        metrics_config=MetricsConfig(
+            output_dir=str(tmp_path), cache_dir=str(tmp_path / "cache")
+        ),
+    )
+
+    # 19 prefills resuming after a cached 512 token prefix, their kv cache adds up
+    # to 19 * 512 tokens, more than a single request's grid covers
+    requests = []
+    for _ in range(19):
+        request = Request(arrived_at=0, num_prefill_tokens=600, num_decode_tokens=10)
+        request._num_processed_tokens = 512
+        requests.append(request)
+    batch = Batch(0, requests, [88] * len(requests))
+
+    execution_time = predictor.get_execution_time(batch, 0)
+
+    assert math.isfinite(execution_time.total_time)
+    # priced at the last kv cache bucket of the grid
+    chunk_size = round(math.sqrt(19 * 88**2))
+    assert predictor._get_attention_prefill_execution_time_from_table(batch) == (
+        4096 + chunk_size**2
+    ) * (1 + predictor._attention_prefill_batching_overhead_fraction)
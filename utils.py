@@ -1,7 +1,10 @@
 import os
 import glob
+import json
 from datetime import datetime
 
+from vidur.sweep import run_sweep
+
 def get_latest_simulation_folder(base_path="/Users/luogan/Code/vidur_or/simulator_output"):
     # 获取所有子目录
     subdirs = [d for d in glob.glob(os.path.join(base_path, "*")) if os.path.isdir(d)]
@@ -157,189 +160,157 @@ def copy_latest_csv(destination_folder, add="", find_batch_size=False):
         return
     
     # 复制 throughput CSV 文件
-    copy_throughput_csv(latest_folder, destination_folder, add=add, find_batch_size=find_batch_size)
-    copy_complete_time_csv(latest_folder, destination_folder, add=add)
+    copy_simulation_csv(latest_folder, destination_folder, add=add, find_batch_size=find_batch_size)
 
-import subprocess
-
-import subprocess
-import json
+def copy_simulation_csv(source_folder, destination_folder, add="", find_batch_size=False):
+    """
+    复制指定模拟结果文件夹中的 throughput 和 request_completion_time_series CSV 文件到目标文件夹，
+    并在目标文件名后面添加 add。
+    """
+    copy_throughput_csv(source_folder, destination_folder, add=add, find_batch_size=find_batch_size)
+    copy_complete_time_csv(source_folder, destination_folder, add=add)
+
+
+DEFAULT_PROMPT_TYPES = [
+    {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
+    {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
+    {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
+]
+
+REPLICA_ARGS = [
+    "--replica_config_device", "a100",
+    "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
+    "--cluster_config_num_replicas", "1",
+    "--replica_config_tensor_parallel_size", "1",
+    "--replica_config_num_pipeline_stages", "1",
+]
+
+PREDICTOR_ARGS = [
+    "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
+    "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
+    "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
+]
+
+
+def custom_request_args(prompt_types, num_requests):
+    return [
+        "--request_generator_config_type", "custom",
+        "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
+        "--custom_request_generator_config_num_requests", str(num_requests),
+    ]
+
+
+def trace_request_args(num_requests, qps, trace_file):
+    return [
+        "--request_generator_config_type", "synthetic",
+        "--synthetic_request_generator_config_num_requests", str(num_requests),
+        "--length_generator_config_type", "trace",
+        "--trace_request_length_generator_config_max_tokens", "16384",
+        "--trace_request_length_generator_config_trace_file", trace_file,
+        "--interval_generator_config_type", "poisson",
+        "--poisson_request_interval_generator_config_qps", str(qps),
+    ]
+
+
+def booking_limit_args(scheduler, config_prefix, prompt_types, num_requests, limit):
+    return [
+        "--replica_scheduler_config_type", scheduler,
+        f"--{config_prefix}_prompt_types", json.dumps(prompt_types),
+        f"--{config_prefix}_total_num_requests", str(num_requests),
+        f"--{config_prefix}_total_limit", str(limit),
+        f"--{config_prefix}_force_clear",
+    ]
+
+
+def batch_size_args(scheduler, batch_size):
+    return [
+        "--replica_scheduler_config_type", scheduler,
+        f"--{scheduler}_scheduler_config_batch_size_cap", str(batch_size),
+    ]
+
+
+def run_sweep_and_copy(name, points, destination_folder, find_batch_size, num_workers=None):
+    """
+    在当前进程内并行运行 points 中的所有模拟（sweep key -> 命令行参数），
+    然后按 sweep key 从对应的输出文件夹复制结果，而不是查找最新的文件夹。
+    """
+    print(f"运行{name}: {', '.join(points)}")
+    results = run_sweep(points, num_workers=num_workers, output_dir=f"simulator_output/{name}")
 
-def run_modified(destination_folder, limit_start, limit_end, limit_interval, num_requests, prompt_types=None):
-    if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
-        ]
+    for key, result in results.items():
+        print(f"完成{name}: {key} ({result.wall_time:.1f}s)")
+        copy_simulation_csv(result.output_dir, destination_folder, add=key, find_batch_size=find_batch_size)
 
-    for limit in range(limit_start, limit_end, limit_interval):
-        cmd = [
-            "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-            "--replica_config_device", "a100",
-            "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-            "--cluster_config_num_replicas", "1",
-            "--replica_config_tensor_parallel_size", "1",
-            "--replica_config_num_pipeline_stages", "1",
-            "--request_generator_config_type", "custom",
-            "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-            "--custom_request_generator_config_num_requests", str(num_requests),
-            "--replica_scheduler_config_type", "modified_booking_limit",
-            "--modified_booking_limit_scheduler_config_prompt_types", json.dumps(prompt_types),
-            "--modified_booking_limit_scheduler_config_total_num_requests", str(num_requests),
-            "--modified_booking_limit_scheduler_config_total_limit", str(limit),
-            "--modified_booking_limit_scheduler_config_force_clear",
-            "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-            "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-            "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-        ]
-        print(f"运行modified: limit={limit}")
-        subprocess.run(cmd, check=True)
-        print(f"完成modified: limit={limit}\n")
-        copy_latest_csv(destination_folder, add=f"limit_{limit}", find_batch_size=True)
 
-def run_nested(destination_folder, limit_start, limit_end, limit_interval, num_requests, prompt_types=None):
+def run_modified(destination_folder, limit_start, limit_end, limit_interval, num_requests, prompt_types=None, num_workers=None):
     if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
-        ]
-
-    for limit in range(limit_start, limit_end, limit_interval):
-        cmd = [
-            "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-            "--replica_config_device", "a100",
-            "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-            "--cluster_config_num_replicas", "1",
-            "--replica_config_tensor_parallel_size", "1",
-            "--replica_config_num_pipeline_stages", "1",
-            "--request_generator_config_type", "custom",
-            "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-            "--custom_request_generator_config_num_requests", str(num_requests),
-            "--replica_scheduler_config_type", "general_nested_booking_limit",
-            "--general_nested_booking_limit_scheduler_config_prompt_types", json.dumps(prompt_types),
-            "--general_nested_booking_limit_scheduler_config_total_num_requests", str(num_requests),
-            "--general_nested_booking_limit_scheduler_config_total_limit", str(limit),
-            "--general_nested_booking_limit_scheduler_config_force_clear",
-            "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-            "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-            "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
+        prompt_types = DEFAULT_PROMPT_TYPES
+
+    points = {
+        f"limit_{limit}": [
+            *REPLICA_ARGS,
+            *custom_request_args(prompt_types, num_requests),
+            *booking_limit_args(
+                "modified_booking_limit", "modified_booking_limit_scheduler_config",
+                prompt_types, num_requests, limit,
+            ),
+            *PREDICTOR_ARGS,
         ]
-        print(f"运行nested: limit={limit}")
-        subprocess.run(cmd, check=True)
-        print(f"完成nested: limit={limit}\n")
-        copy_latest_csv(destination_folder, add=f"limit_{limit}", find_batch_size=True)
+        for limit in range(limit_start, limit_end, limit_interval)
+    }
+    run_sweep_and_copy("modified", points, destination_folder, find_batch_size=True, num_workers=num_workers)
 
-def run_vllm(destination_folder, batchsize_start, batchsize_end, batchsize_interval, num_requests, prompt_types=None, batch_size_list=None):
+def run_nested(destination_folder, limit_start, limit_end, limit_interval, num_requests, prompt_types=None, num_workers=None):
     if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
+        prompt_types = DEFAULT_PROMPT_TYPES
+
+    points = {
+        f"limit_{limit}": [
+            *REPLICA_ARGS,
+            *custom_request_args(prompt_types, num_requests),
+            *booking_limit_args(
+                "general_nested_booking_limit", "general_nested_booking_limit_scheduler_config",
+                prompt_types, num_requests, limit,
+            ),
+            *PREDICTOR_ARGS,
         ]
+        for limit in range(limit_start, limit_end, limit_interval)
+    }
+    run_sweep_and_copy("nested", points, destination_folder, find_batch_size=True, num_workers=num_workers)
 
-    if batch_size_list is None:
-        for batch_size in range(batchsize_start, batchsize_end, batchsize_interval):
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "custom",
-                "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-                "--custom_request_generator_config_num_requests", str(num_requests),
-                "--replica_scheduler_config_type", "vllm",
-                "--vllm_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行vllm: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成vllm: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
-    else:
-        for batch_size in batch_size_list:
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "custom",
-                "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-                "--custom_request_generator_config_num_requests", str(num_requests),
-                "--replica_scheduler_config_type", "vllm",
-                "--vllm_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行vllm: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成vllm: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
-
-def run_sarathi(destination_folder, batchsize_start, batchsize_end, batchsize_interval, num_requests, prompt_types=None, batch_size_list=None):
+def run_vllm(destination_folder, batchsize_start, batchsize_end, batchsize_interval, num_requests, prompt_types=None, batch_size_list=None, num_workers=None):
     if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
+        prompt_types = DEFAULT_PROMPT_TYPES
+    if batch_size_list is None:
+        batch_size_list = range(batchsize_start, batchsize_end, batchsize_interval)
+
+    points = {
+        f"batch_size_{batch_size}": [
+            *REPLICA_ARGS,
+            *custom_request_args(prompt_types, num_requests),
+            *batch_size_args("vllm", batch_size),
+            *PREDICTOR_ARGS,
         ]
+        for batch_size in batch_size_list
+    }
+    run_sweep_and_copy("vllm", points, destination_folder, find_batch_size=False, num_workers=num_workers)
 
+def run_sarathi(destination_folder, batchsize_start, batchsize_end, batchsize_interval, num_requests, prompt_types=None, batch_size_list=None, num_workers=None):
+    if prompt_types is None:
+        prompt_types = DEFAULT_PROMPT_TYPES
     if batch_size_list is None:
-        for batch_size in range(batchsize_start, batchsize_end, batchsize_interval):
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "custom",
-                "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-                "--custom_request_generator_config_num_requests", str(num_requests),
-                "--replica_scheduler_config_type", "sarathi",
-                "--sarathi_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行sarathi: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成sarathi: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
-    else:
-        for batch_size in batch_size_list:
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "custom",
-                "--custom_request_generator_config_prompt_types", json.dumps(prompt_types),
-                "--custom_request_generator_config_num_requests", str(num_requests),
-                "--replica_scheduler_config_type", "sarathi",
-                "--sarathi_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行sarathi: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成sarathi: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
+        batch_size_list = range(batchsize_start, batchsize_end, batchsize_interval)
+
+    points = {
+        f"batch_size_{batch_size}": [
+            *REPLICA_ARGS,
+            *custom_request_args(prompt_types, num_requests),
+            *batch_size_args("sarathi", batch_size),
+            *PREDICTOR_ARGS,
+        ]
+        for batch_size in batch_size_list
+    }
+    run_sweep_and_copy("sarathi", points, destination_folder, find_batch_size=False, num_workers=num_workers)
 
 
 
@@ -359,69 +330,23 @@ def run_vllm_real_data(
         prompt_types=None, 
         batch_size_list=None, 
         qps=10,
-        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv"
+        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv",
+        num_workers=None,
         ):
-    if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
-        ]
-
+    # prompt_types 仅为保持接口一致，real data 的请求来自 trace_file
     if batch_size_list is None:
-        for batch_size in range(batchsize_start, batchsize_end, batchsize_interval):
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "synthetic",
-                "--synthetic_request_generator_config_num_requests", str(num_requests),
-                "--length_generator_config_type", "trace",
-                "--trace_request_length_generator_config_max_tokens", "16384",
-                "--trace_request_length_generator_config_trace_file", trace_file,
-                "--interval_generator_config_type", "poisson",
-                "--poisson_request_interval_generator_config_qps", str(qps),
-                "--replica_scheduler_config_type", "vllm",
-                "--vllm_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行vllm: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成vllm: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
-    else:
-        for batch_size in batch_size_list:
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "synthetic",
-                "--synthetic_request_generator_config_num_requests", str(num_requests),
-                "--length_generator_config_type", "trace",
-                "--trace_request_length_generator_config_max_tokens", "16384",
-                "--trace_request_length_generator_config_trace_file", trace_file,
-                "--interval_generator_config_type", "poisson",
-                "--poisson_request_interval_generator_config_qps", str(qps),
-                "--replica_scheduler_config_type", "vllm",
-                "--vllm_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行vllm: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成vllm: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
+        batch_size_list = range(batchsize_start, batchsize_end, batchsize_interval)
+
+    points = {
+        f"batch_size_{batch_size}": [
+            *REPLICA_ARGS,
+            *trace_request_args(num_requests, qps, trace_file),
+            *batch_size_args("vllm", batch_size),
+            *PREDICTOR_ARGS,
+        ]
+        for batch_size in batch_size_list
+    }
+    run_sweep_and_copy("vllm", points, destination_folder, find_batch_size=False, num_workers=num_workers)
 
 
 
@@ -436,69 +361,23 @@ def run_sarathi_real_data(
         prompt_types=None, 
         batch_size_list=None,
         qps=10,
-        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv"
+        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv",
+        num_workers=None,
         ):
-    if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
-        ]
-
+    # prompt_types 仅为保持接口一致，real data 的请求来自 trace_file
     if batch_size_list is None:
-        for batch_size in range(batchsize_start, batchsize_end, batchsize_interval):
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "synthetic",
-                "--synthetic_request_generator_config_num_requests", str(num_requests),
-                "--length_generator_config_type", "trace",
-                "--trace_request_length_generator_config_max_tokens", "16384",
-                "--trace_request_length_generator_config_trace_file", trace_file,
-                "--interval_generator_config_type", "poisson",
-                "--poisson_request_interval_generator_config_qps", str(qps),
-                "--replica_scheduler_config_type", "sarathi",
-                "--sarathi_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行sarathi: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成sarathi: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
-    else:
-        for batch_size in batch_size_list:
-            cmd = [
-                "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-                "--replica_config_device", "a100",
-                "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-                "--cluster_config_num_replicas", "1",
-                "--replica_config_tensor_parallel_size", "1",
-                "--replica_config_num_pipeline_stages", "1",
-                "--request_generator_config_type", "synthetic",
-                "--synthetic_request_generator_config_num_requests", str(num_requests),
-                "--length_generator_config_type", "trace",
-                "--trace_request_length_generator_config_max_tokens", "16384",
-                "--trace_request_length_generator_config_trace_file", trace_file,
-                "--interval_generator_config_type", "poisson",
-                "--poisson_request_interval_generator_config_qps", str(qps),
-                "--replica_scheduler_config_type", "sarathi",
-                "--sarathi_scheduler_config_batch_size_cap", str(batch_size),
-                "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-                "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-                "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
-            ]
-            print(f"运行sarathi: batch_size ={batch_size}")
-            # 启动进程并等待完成
-            subprocess.run(cmd, check=True)
-            print(f"完成sarathi: batch_size ={batch_size}\n")
-            copy_latest_csv(destination_folder, add=f"batch_size_{batch_size}", find_batch_size=False)
+        batch_size_list = range(batchsize_start, batchsize_end, batchsize_interval)
+
+    points = {
+        f"batch_size_{batch_size}": [
+            *REPLICA_ARGS,
+            *trace_request_args(num_requests, qps, trace_file),
+            *batch_size_args("sarathi", batch_size),
+            *PREDICTOR_ARGS,
+        ]
+        for batch_size in batch_size_list
+    }
+    run_sweep_and_copy("sarathi", points, destination_folder, find_batch_size=False, num_workers=num_workers)
 
 
 
@@ -511,40 +390,22 @@ def run_nested_real_data(
         num_requests, 
         prompt_types=None,
         qps=10,
-        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv"
+        trace_file = "data/processed_traces/sample_2e5_input<200_output<500.csv",
+        num_workers=None,
         ):
     if prompt_types is None:
-        prompt_types = [
-            {"type": "type1", "prefill": 20, "decode": 100, "arrival_rate": 6000},
-            {"type": "type2", "prefill": 20, "decode": 200, "arrival_rate": 4000},
-            {"type": "type3", "prefill": 20, "decode": 300, "arrival_rate": 8000}
-        ]
-
-    for limit in range(limit_start, limit_end, limit_interval):
-        cmd = [
-            "python", "-m", "vidur.main",  # 通过 `-m` 方式运行模块
-            "--replica_config_device", "a100",
-            "--replica_config_model_name", "meta-llama/Meta-Llama-3-8B",
-            "--cluster_config_num_replicas", "1",
-            "--replica_config_tensor_parallel_size", "1",
-            "--replica_config_num_pipeline_stages", "1",
-            "--request_generator_config_type", "synthetic",
-            "--synthetic_request_generator_config_num_requests", str(num_requests),
-            "--length_generator_config_type", "trace",
-            "--trace_request_length_generator_config_max_tokens", "16384",
-            "--trace_request_length_generator_config_trace_file", trace_file,
-            "--interval_generator_config_type", "poisson",
-            "--poisson_request_interval_generator_config_qps", str(qps),
-            "--replica_scheduler_config_type", "general_nested_booking_limit",
-            "--general_nested_booking_limit_scheduler_config_prompt_types", json.dumps(prompt_types),
-            "--general_nested_booking_limit_scheduler_config_total_num_requests", str(num_requests),
-            "--general_nested_booking_limit_scheduler_config_total_limit", str(limit),
-            "--general_nested_booking_limit_scheduler_config_force_clear",
-            "--random_forrest_execution_time_predictor_config_prediction_max_prefill_chunk_size", "16384",
-            "--random_forrest_execution_time_predictor_config_prediction_max_batch_size", "2048",
-            "--random_forrest_execution_time_predictor_config_prediction_max_tokens_per_request", "16384"
+        prompt_types = DEFAULT_PROMPT_TYPES
+
+    points = {
+        f"limit_{limit}": [
+            *REPLICA_ARGS,
+            *trace_request_args(num_requests, qps, trace_file),
+            *booking_limit_args(
+                "general_nested_booking_limit", "general_nested_booking_limit_scheduler_config",
+                prompt_types, num_requests, limit,
+            ),
+            *PREDICTOR_ARGS,
         ]
-        print(f"运行nested: limit={limit}")
-        subprocess.run(cmd, check=True)
-        print(f"完成nested: limit={limit}\n")
-        copy_latest_csv(destination_folder, add=f"limit_{limit}", find_batch_size=True)
\ No newline at end of file
+        for limit in range(limit_start, limit_end, limit_interval)
+    }
+    run_sweep_and_copy("nested", points, destination_folder, find_batch_size=True, num_workers=num_workers)
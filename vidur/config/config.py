@@ -13,6 +13,7 @@ from vidur.config.node_sku_config import BaseNodeSKUConfig
 from vidur.config.utils import dataclass_to_dict
 from vidur.logger import init_logger
 from vidur.types import (
+    EventQueueType,
     ExecutionTimePredictorType,
     GlobalSchedulerType,
     ReplicaSchedulerType,
@@ -278,6 +279,11 @@ class TraceRequestGeneratorConfig(BaseRequestGeneratorConfig):
         return RequestGeneratorType.TRACE_REPLAY
 
 
+PREEMPTION_MODES = ("recompute", "swap")
+# the other replica schedulers never preempt a request
+SWAP_PREEMPTION_SCHEDULER_TYPES = ("vllm", "sarathi")
+
+
 @dataclass
 class BaseReplicaSchedulerConfig(BasePolyConfig):
     batch_size_cap: int = field(
@@ -296,6 +302,50 @@ class BaseReplicaSchedulerConfig(BasePolyConfig):
         default=None,
         metadata={"help": "Number of blocks."},
     )
+    enable_prefix_caching: bool = field(
+        default=False,
+        metadata={
+            "help": "Share and cache the KV cache blocks of prompt prefixes across requests with "
+            "the same prefix id, cached prefix tokens are not recomputed. Used by the vllm and "
+            "sarathi schedulers."
+        },
+    )
+    enable_block_allocator: bool = field(
+        default=False,
+        metadata={
+            "help": "Track the KV cache block ids of every request with a free list block allocator, "
+            "to measure the fragmentation of the KV cache (written with the utilization metrics)."
+        },
+    )
+    preemption_mode: str = field(
+        default="recompute",
+        metadata={
+            "help": "How the vllm and sarathi schedulers preempt a request when the KV cache is full: "
+            "'recompute' frees its blocks and prefills it again, 'swap' moves its blocks to CPU memory "
+            "and back, the transfers are timed with the send_recv network profile. The other "
+            "schedulers do not preempt and reject 'swap'."
+        },
+    )
+    swap_space_gb: float = field(
+        default=4,
+        metadata={
+            "help": "CPU memory per GPU for swapped out KV cache blocks in GiB, with the 'swap' "
+            "preemption mode. Requests that do not fit are preempted by recomputation."
+        },
+    )
+
+    def __post_init__(self):
+        if self.preemption_mode not in PREEMPTION_MODES:
+            raise ValueError(f"Unknown preemption mode: {self.preemption_mode}")
+        if (
+            self.preemption_mode == "swap"
+            and str(self.get_type()) not in SWAP_PREEMPTION_SCHEDULER_TYPES
+        ):
+            raise ValueError(
+                "The swap preemption mode is only supported by the"
+                f" {' and '.join(SWAP_PREEMPTION_SCHEDULER_TYPES)} schedulers,"
+                f" not by {self.get_type()}"
+            )
 
 
 @dataclass
@@ -390,6 +440,19 @@ class MetricsConfig:
         default=True,
         metadata={"help": "Enable Chrome tracing."},
     )
+    enable_event_loop_profiler: bool = field(
+        default=False,
+        metadata={
+            "help": "Profile the wall time of the simulator event loop per event type and handler, "
+            "written as a summary table and a collapsed-stack (flamegraph) file."
+        },
+    )
+    trace_flush_interval: int = field(
+        default=10000,
+        metadata={
+            "help": "Number of trace events buffered in memory before they are flushed to the trace files."
+        },
+    )
     save_table_to_wandb: bool = field(
         default=False,
         metadata={"help": "Whether to save table to wandb."},
@@ -442,8 +505,28 @@ class MetricsConfig:
         default="cache",
         metadata={"help": "Cache directory."},
     )
+    profile: str = field(
+        default="full",
+        metadata={
+            "help": "Metrics profile. 'full' follows the store_* flags, 'requests_only' keeps only the "
+            "per-request metrics and throughput (e.g. scheduling delay quantiles for capacity searches) "
+            "and turns off all other metrics and the traces."
+        },
+    )
 
     def __post_init__(self):
+        if self.profile == "requests_only":
+            self.write_json_trace = False
+            self.enable_chrome_trace = False
+            self.store_operation_metrics = False
+            self.store_token_completion_metrics = False
+            self.store_request_metrics = True
+            self.store_batch_metrics = False
+            self.store_utilization_metrics = False
+            self.keep_individual_batch_metrics = False
+        elif self.profile != "full":
+            raise ValueError(f"Unknown metrics profile: {self.profile}")
+
         self.output_dir = (
             f"{self.output_dir}/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}"
         )
@@ -509,13 +592,66 @@ class RoundRobinGlobalSchedulerConfig(BaseGlobalSchedulerConfig):
         return GlobalSchedulerType.ROUND_ROBIN
 
 
+LOAD_MEASURES = (
+    "pending_requests",
+    "outstanding_tokens",
+    "outstanding_decode_tokens",
+    "allocated_blocks",
+)
+LOAD_MEASURE_HELP = (
+    "Load of a replica that requests are balanced on. 'pending_requests' counts the requests "
+    "waiting in the replica queue, 'outstanding_tokens' the prefill and decode tokens not yet "
+    "processed of the requests sent to the replica, 'outstanding_decode_tokens' only their decode "
+    "tokens, 'allocated_blocks' the KV cache blocks allocated on the replica."
+)
+
+
 @dataclass
 class LORGlobalSchedulerConfig(BaseGlobalSchedulerConfig):
+    load_measure: str = field(
+        default="pending_requests",
+        metadata={"help": LOAD_MEASURE_HELP},
+    )
+
+    def __post_init__(self):
+        if self.load_measure not in LOAD_MEASURES:
+            raise ValueError(f"Unknown LOR load measure: {self.load_measure}")
+
     @staticmethod
     def get_type():
         return GlobalSchedulerType.LOR
 
 
+@dataclass
+class TokenLoadGlobalSchedulerConfig(BaseGlobalSchedulerConfig):
+    @staticmethod
+    def get_type():
+        return GlobalSchedulerType.TOKEN_LOAD
+
+
+@dataclass
+class KvAwareGlobalSchedulerConfig(BaseGlobalSchedulerConfig):
+    @staticmethod
+    def get_type():
+        return GlobalSchedulerType.KV_AWARE
+
+
+@dataclass
+class PowerOfTwoGlobalSchedulerConfig(BaseGlobalSchedulerConfig):
+    load_measure: str = field(
+        default="pending_requests",
+        metadata={"help": LOAD_MEASURE_HELP},
+    )
+
+    def __post_init__(self):
+        if self.load_measure not in LOAD_MEASURES:
+            raise ValueError(f"Unknown power of two load measure: {self.load_measure}")
+
+    @staticmethod
+    def get_type():
+        return GlobalSchedulerType.POWER_OF_TWO
+
+
 @dataclass
 class BaseExecutionTimePredictorConfig(BasePolyConfig):
     compute_input_file: str = field(
@@ -582,10 +718,28 @@ class BaseExecutionTimePredictorConfig(BasePolyConfig):
         default=-1,
         metadata={"help": "Number of training job threads."},
     )
+    num_training_processes: int = field(
+        default=-1,
+        metadata={
+            "help": "Number of processes the models are trained on concurrently, -1 uses one per CPU."
+        },
+    )
     skip_cpu_overhead_modeling: bool = field(
         default=True,
         metadata={"help": "Whether to skip CPU overhead modeling."},
     )
+    lazy_prediction: bool = field(
+        default=False,
+        metadata={
+            "help": "Predict execution times only for the batch shapes the simulation asks for, in blocks, instead of the whole prediction grid at start-up."
+        },
+    )
+    execution_time_cache_size: int = field(
+        default=4096,
+        metadata={
+            "help": "Max number of batch shapes whose execution time is memoized (LRU). 0 disables the cache."
+        },
+    )
 
 
 @dataclass
@@ -632,6 +786,81 @@ class RandomForrestExecutionTimePredictorConfig(BaseExecutionTimePredictorConfig
         return ExecutionTimePredictorType.RANDOM_FORREST
 
 
+@dataclass
+class AnalyticalExecutionTimePredictorConfig(BaseExecutionTimePredictorConfig):
+    num_knots: int = field(
+        default=6,
+        metadata={
+            "help": "Number of interior knots of the piecewise linear fits of the per-token and per-batch operations."
+        },
+    )
+
+    @staticmethod
+    def get_type():
+        return ExecutionTimePredictorType.ANALYTICAL
+
+
+@dataclass
+class BaseEventQueueConfig(BasePolyConfig):
+    pass
+
+
+@dataclass
+class HeapEventQueueConfig(BaseEventQueueConfig):
+    @staticmethod
+    def get_type():
+        return EventQueueType.HEAP
+
+
+@dataclass
+class CalendarEventQueueConfig(BaseEventQueueConfig):
+    num_buckets: int = field(
+        default=64,
+        metadata={
+            "help": "Initial number of buckets, doubled or halved as the queue grows or shrinks."
+        },
+    )
+    bucket_width: float = field(
+        default=0.01,
+        metadata={
+            "help": "Initial bucket width in seconds, re-estimated from the pending events on every resize."
+        },
+    )
+
+    @staticmethod
+    def get_type():
+        return EventQueueType.CALENDAR
+
+
+@dataclass
+class CheckpointConfig:
+    """Periodic snapshots of the simulator state, to resume long simulations."""
+
+    interval: float = field(
+        default=0,
+        metadata={
+            "help": "Wall clock seconds between checkpoints of the simulator state. 0 disables checkpointing."
+        },
+    )
+    output_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory the checkpoints are written to, defaults to <metrics output dir>/checkpoints."
+        },
+    )
+    num_to_keep: int = field(
+        default=2,
+        metadata={"help": "Number of most recent checkpoints kept on disk."},
+    )
+    resume_from: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Checkpoint file, or directory whose latest checkpoint, the simulation resumes from. "
+            "The simulation starts from scratch if the directory holds no checkpoint yet."
+        },
+    )
+
+
 @dataclass
 class ClusterConfig:
     num_replicas: int = field(
@@ -683,17 +912,43 @@ class SimulationConfig(ABC):
         default_factory=MetricsConfig,
         metadata={"help": "Metrics config."},
     )
+    event_queue_config: BaseEventQueueConfig = field(
+        default_factory=HeapEventQueueConfig,
+        metadata={"help": "Simulator event queue config."},
+    )
+    checkpoint_config: CheckpointConfig = field(
+        default_factory=CheckpointConfig,
+        metadata={"help": "Simulator checkpoint config."},
+    )
+    num_shards: int = field(
+        default=1,
+        metadata={
+            "help": "Simulate the replicas in this many processes. Requests are assigned to replicas up front, "
+            "which needs a stateless global scheduler (round robin, random), and the metrics of the shards are merged."
+        },
+    )
 
     def __post_init__(self):
+        if self.checkpoint_config.output_dir is None:
+            self.checkpoint_config.output_dir = (
+                f"{self.metrics_config.output_dir}/checkpoints"
+            )
         self.write_config_to_file()
 
     @classmethod
-    def create_from_cli_args(cls):
-        flat_config = create_flat_dataclass(cls).create_from_cli_args()
+    def create_from_cli_args(cls, args: Optional[List[str]] = None):
+        flat_config = create_flat_dataclass(cls).create_from_cli_args(args)
         instance = flat_config.reconstruct_original_dataclass()
         instance.__flat_config__ = flat_config
         return instance
 
+    def __getstate__(self):
+        # the flat config is an instance of a class created at runtime, which
+        # cannot be pickled (e.g. to send metrics stores between processes)
+        state = self.__dict__.copy()
+        state.pop("__flat_config__", None)
+        return state
+
     def to_dict(self):
         if not hasattr(self, "__flat_config__"):
             logger.warning("Flat config not found. Returning the original config.")
@@ -720,6 +975,10 @@ class BookingLimitSchedulerConfig(BaseReplicaSchedulerConfig):
         default=False,
         metadata={"help": "Force clear the requests still in the scheduler when all requests arrived."},
     )
+    use_request_table: bool = field(
+        default=False,
+        metadata={"help": "Keep queued request fields in NumPy columns and group / count them with vectorized operations."},
+    )
 
     @staticmethod
     def get_type():
@@ -786,6 +1045,10 @@ class ModifiedBookingLimitSchedulerConfig(BaseReplicaSchedulerConfig):
             "help": "List of prompt types in JSON format.",
         },
     )
+    use_request_table: bool = field(
+        default=False,
+        metadata={"help": "Keep queued request fields in NumPy columns and group / count them with vectorized operations."},
+    )
 
     @staticmethod
     def get_type():
@@ -1,10 +1,18 @@
 class BaseEntity:
-    _id = -1
+    # subclasses with many instances (requests, batches) declare __slots__, the
+    # id counter lives under a separate name so it does not clash with the slot
+    __slots__ = ("_id",)
+
+    _last_id = -1
 
     @classmethod
     def generate_id(cls):
-        cls._id += 1
-        return cls._id
+        cls._last_id += 1
+        return cls._last_id
+
+    @classmethod
+    def reset_id(cls):
+        cls._last_id = -1
 
     @property
     def id(self) -> int:
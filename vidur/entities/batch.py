@@ -7,26 +7,34 @@ from vidur.logger import init_logger
 logger = init_logger(__name__)
 
 
-# a decorator which checks if the request has been scheduled
-def check_scheduled(func):
-    def wrapper(self, *args, **kwargs):
-        if not self._scheduled:
-            raise ValueError("Batch has not been scheduled yet")
-        return func(self, *args, **kwargs)
-
-    return wrapper
-
+def _raise_not_scheduled():
+    raise ValueError("Batch has not been scheduled yet")
 
-def check_completed(func):
-    def wrapper(self, *args, **kwargs):
-        if not self._completed:
-            raise ValueError("Batch has not been scheduled yet")
-        return func(self, *args, **kwargs)
 
-    return wrapper
+def _raise_not_completed():
+    raise ValueError("Batch has not been completed yet")
 
 
 class Batch(BaseEntity):
+    __slots__ = (
+        "_replica_id",
+        "_requests",
+        "_num_tokens",
+        "_total_num_tokens",
+        "_num_prefill_tokens",
+        "_total_num_tokens_rounded",
+        "_scheduled_at",
+        "_completed_at",
+        "_scheduled",
+        "_completed",
+        "_decode_params",
+        "_prefill_params",
+        "_swap_in_bytes",
+        "_swap_out_bytes",
+        "_swap_in_time",
+        "_swap_out_time",
+    )
+
     def __init__(
         self,
         replica_id: int,
@@ -41,8 +49,8 @@ class Batch(BaseEntity):
         self._total_num_tokens = sum(num_tokens)
         self._num_prefill_tokens = sum(
             [
-                (t if not r.is_prefill_complete else 0)
-                for r, t in zip(self.requests, self._num_tokens)
+                (t if not r._is_prefill_complete else 0)
+                for r, t in zip(requests, num_tokens)
             ]
         )
 
@@ -53,6 +61,17 @@ class Batch(BaseEntity):
         self._scheduled = False
         self._completed = False
 
+        # attention params of the batch, computed once by the execution time
+        # predictor on first use
+        self._decode_params = None
+        self._prefill_params = None
+
+        # KV cache swapped in / out by the replica scheduler before the batch runs
+        self._swap_in_bytes = 0
+        self._swap_out_bytes = 0
+        self._swap_in_time = 0
+        self._swap_out_time = 0
+
     @property
     def replica_id(self) -> int:
         return self._replica_id
@@ -75,16 +94,18 @@ class Batch(BaseEntity):
 
     @property
     def num_decode_tokens(self) -> int:
-        return self.total_num_tokens - self.num_prefill_tokens
+        return self._total_num_tokens - self._num_prefill_tokens
 
     @property
-    @check_scheduled
     def scheduled_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._scheduled_at
 
     @property
-    @check_completed
     def completed_at(self) -> float:
+        if not self._completed:
+            _raise_not_completed()
         return self._completed_at
 
     @property
@@ -105,11 +126,43 @@ class Batch(BaseEntity):
 
     @property
     def request_ids(self) -> List[int]:
-        return [request.id for request in self._requests]
+        return [request._id for request in self._requests]
+
+    @property
+    def swap_in_bytes(self) -> int:
+        return self._swap_in_bytes
+
+    @property
+    def swap_out_bytes(self) -> int:
+        return self._swap_out_bytes
+
+    @property
+    def swap_in_time(self) -> float:
+        return self._swap_in_time
+
+    @property
+    def swap_out_time(self) -> float:
+        return self._swap_out_time
+
+    @property
+    def swap_time(self) -> float:
+        return self._swap_in_time + self._swap_out_time
+
+    def set_swaps(
+        self,
+        swap_in_bytes: int,
+        swap_in_time: float,
+        swap_out_bytes: int,
+        swap_out_time: float,
+    ) -> None:
+        self._swap_in_bytes = swap_in_bytes
+        self._swap_in_time = swap_in_time
+        self._swap_out_bytes = swap_out_bytes
+        self._swap_out_time = swap_out_time
 
     @property
     def all_requests_completed(self) -> bool:
-        return all([request.completed for request in self._requests])
+        return all([request._completed for request in self._requests])
 
     def on_schedule(
         self,
@@ -134,7 +187,7 @@ class Batch(BaseEntity):
 
     @property
     def completed_requests(self) -> List[Request]:
-        return [request for request in self._requests if request.completed]
+        return [request for request in self._requests if request._completed]
 
     def to_dict(self) -> dict:
         return {
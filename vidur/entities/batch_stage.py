@@ -7,17 +7,24 @@ from vidur.logger import init_logger
 logger = init_logger(__name__)
 
 
-# a decorator which checks if the request has been scheduled
-def check_scheduled(func):
-    def wrapper(self, *args, **kwargs):
-        if not self._scheduled:
-            raise ValueError("Batch has not been scheduled yet")
-        return func(self, *args, **kwargs)
-
-    return wrapper
+def _raise_not_scheduled():
+    raise ValueError("Batch has not been scheduled yet")
 
 
 class BatchStage(BaseEntity):
+    __slots__ = (
+        "_requests",
+        "_num_tokens",
+        "_batch_id",
+        "_replica_id",
+        "_pipeline_stage",
+        "_execution_time",
+        "_model_execution_time",
+        "_scheduled_at",
+        "_completed_at",
+        "_scheduled",
+    )
+
     def __init__(
         self,
         batch_id: int,
@@ -47,13 +54,15 @@ class BatchStage(BaseEntity):
         return self._num_tokens
 
     @property
-    @check_scheduled
     def scheduled_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._scheduled_at
 
     @property
-    @check_scheduled
     def completed_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._completed_at
 
     @property
@@ -70,7 +79,7 @@ class BatchStage(BaseEntity):
 
     @property
     def request_ids(self) -> List[int]:
-        return [request.id for request in self._requests]
+        return [request._id for request in self._requests]
 
     @property
     def requests(self) -> List[Request]:
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 from vidur.entities.base_entity import BaseEntity
 from vidur.logger import init_logger
@@ -6,39 +6,68 @@ from vidur.logger import init_logger
 logger = init_logger(__name__)
 
 
-# a decorator which checks if the request has been scheduled
-def check_scheduled(func):
-    def wrapper(self, *args, **kwargs):
-        if not self._scheduled:
-            raise ValueError("Request has not been scheduled yet")
-        return func(self, *args, **kwargs)
-
-    return wrapper
+# the checked getters below test the flag inline instead of going through a
+# wrapper closure, they are read for every request in the metrics store
+def _raise_not_scheduled():
+    raise ValueError("Request has not been scheduled yet")
 
 
-def check_completed(func):
-    def wrapper(self, *args, **kwargs):
-        if not self._completed:
-            raise ValueError("Request has not been completed yet")
-        return func(self, *args, **kwargs)
-
-    return wrapper
+def _raise_not_completed():
+    raise ValueError("Request has not been completed yet")
 
 
 class Request(BaseEntity):
+    # requests are the most numerous objects in a simulation, slots keep them
+    # small and make attribute access cheaper
+    __slots__ = (
+        "_arrived_at",
+        "_num_prefill_tokens",
+        "_num_decode_tokens",
+        "_num_processed_tokens",
+        "_prefix_id",
+        "_num_prefix_tokens",
+        "_num_cached_tokens",
+        "prompt_type",
+        "current_stage",
+        "_scheduled_at",
+        "_execution_time",
+        "_model_execution_time",
+        "_scheduling_delay",
+        "_preempted_time",
+        "_completed_at",
+        "_prefill_completed_at",
+        "_latest_stage_scheduled_at",
+        "_latest_stage_completed_at",
+        "_latest_iteration_scheduled_at",
+        "_latest_iteration_completed_at",
+        "_latest_iteration_scheduling_delay",
+        "_scheduled",
+        "_preempted",
+        "_completed",
+        "_is_prefill_complete",
+        "_num_restarts",
+    )
+
     def __init__(
         self,
         arrived_at: float,
         num_prefill_tokens: int,
         num_decode_tokens: int,
         num_processed_tokens: int = 0,
-        prompt_type: str = "default"  # 新增 prompt_type 参数，默认为 "default"
+        prompt_type: str = "default",  # 新增 prompt_type 参数，默认为 "default"
+        prefix_id: Optional[int] = None,
+        num_prefix_tokens: int = 0,
     ):
         self._id = Request.generate_id()
         self._arrived_at = arrived_at
         self._num_prefill_tokens = num_prefill_tokens
         self._num_decode_tokens = num_decode_tokens
         self._num_processed_tokens = num_processed_tokens
+        # requests with the same prefix id share their first num_prefix_tokens
+        # prompt tokens (e.g. a system prompt), whose KV cache can be reused
+        self._prefix_id = prefix_id
+        self._num_prefix_tokens = min(num_prefix_tokens, num_prefill_tokens)
+        self._num_cached_tokens = 0
 
         # 新增属性：用于区分请求类型和阶段
         self.prompt_type = prompt_type
@@ -70,84 +99,100 @@ class Request(BaseEntity):
         return (self._num_prefill_tokens, self._num_decode_tokens)
 
     @property
-    @check_scheduled
     def scheduled_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._scheduled_at
 
     @property
-    @check_scheduled
     def latest_stage_scheduled_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._latest_stage_scheduled_at
 
     @property
-    @check_scheduled
     def latest_stage_completed_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._latest_stage_completed_at
 
     @property
-    @check_scheduled
     def latest_iteration_scheduled_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._latest_iteration_scheduled_at
 
     @property
-    @check_scheduled
     def latest_iteration_completed_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._latest_iteration_completed_at
 
     @property
-    @check_scheduled
     def latest_iteration_scheduling_delay(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._latest_iteration_scheduling_delay
 
     @property
-    @check_scheduled
     def prefill_completed_at(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._prefill_completed_at
 
     @property
-    @check_scheduled
     def scheduling_delay(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._scheduling_delay
 
     @property
-    @check_scheduled
     def preempted_time(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._preempted_time
 
     @property
-    @check_completed
     def completed_at(self) -> float:
+        if not self._completed:
+            _raise_not_completed()
         return self._completed_at
 
     @property
-    @check_scheduled
     def e2e_time(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._completed_at - self._arrived_at
 
     @property
-    @check_scheduled
     def e2e_time_normalized(self) -> float:
-        return self.e2e_time / self.num_decode_tokens
+        if not self._scheduled:
+            _raise_not_scheduled()
+        return (self._completed_at - self._arrived_at) / self._num_decode_tokens
 
     @property
-    @check_scheduled
     def execution_time(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._execution_time
 
     @property
-    @check_scheduled
     def execution_time_normalized(self) -> float:
-        return self._execution_time / self.num_decode_tokens
+        if not self._scheduled:
+            _raise_not_scheduled()
+        return self._execution_time / self._num_decode_tokens
 
     @property
-    @check_scheduled
     def model_execution_time(self) -> float:
+        if not self._scheduled:
+            _raise_not_scheduled()
         return self._model_execution_time
 
     @property
-    @check_scheduled
     def model_execution_time_normalized(self) -> float:
-        return self._model_execution_time / self.num_decode_tokens
+        if not self._scheduled:
+            _raise_not_scheduled()
+        return self._model_execution_time / self._num_decode_tokens
 
     @property
     def arrived_at(self) -> float:
@@ -169,6 +214,18 @@ class Request(BaseEntity):
     def num_processed_tokens(self) -> int:
         return self._num_processed_tokens
 
+    @property
+    def prefix_id(self) -> Optional[int]:
+        return self._prefix_id
+
+    @property
+    def num_prefix_tokens(self) -> int:
+        return self._num_prefix_tokens
+
+    @property
+    def num_cached_tokens(self) -> int:
+        return self._num_cached_tokens
+
     @property
     def total_tokens(self) -> int:
         return self._num_prefill_tokens + self._num_decode_tokens
@@ -225,6 +282,14 @@ class Request(BaseEntity):
         self._scheduling_delay = time - self._arrived_at
         self._scheduled = True
 
+    def on_prefix_cache_hit(self, num_tokens: int) -> None:
+        # the KV cache of the first num_tokens prompt tokens is reused, the
+        # prefill only computes (and attends from) the remaining tokens
+        assert self._num_processed_tokens == 0
+        assert num_tokens < self._num_prefill_tokens
+        self._num_processed_tokens = num_tokens
+        self._num_cached_tokens += num_tokens
+
     def on_batch_end(
         self,
         time: float,
@@ -233,7 +298,8 @@ class Request(BaseEntity):
         self._num_processed_tokens += num_tokens_processed
         self._latest_iteration_completed_at = time
 
-        assert self._num_processed_tokens <= self.total_tokens
+        total_tokens = self._num_prefill_tokens + self._num_decode_tokens
+        assert self._num_processed_tokens <= total_tokens
 
         if self._num_processed_tokens == self._num_prefill_tokens:
             self._is_prefill_complete = True
@@ -247,7 +313,7 @@ class Request(BaseEntity):
                 self._prefill_completed_at = time
 
         # check if request is completed
-        if self._num_processed_tokens == self.total_tokens:
+        if self._num_processed_tokens == total_tokens:
             self._completed_at = time
             self._completed = True
             logger.debug(f"Request {self._id} completed at {self._completed_at}")
@@ -287,6 +353,8 @@ class Request(BaseEntity):
             "num_prefill_tokens": self._num_prefill_tokens,
             "num_decode_tokens": self._num_decode_tokens,
             "num_processed_tokens": self._num_processed_tokens,
+            "prefix_id": self._prefix_id,
+            "num_cached_tokens": self._num_cached_tokens,
             "scheduled": self._scheduled,
             "preempted": self._preempted,
             "completed": self._completed,
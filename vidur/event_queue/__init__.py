@@ -0,0 +1,4 @@
+from vidur.event_queue.base_event_queue import BaseEventQueue
+from vidur.event_queue.event_queue_registry import EventQueueRegistry
+
+__all__ = [BaseEventQueue, EventQueueRegistry]
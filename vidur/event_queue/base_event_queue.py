@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from vidur.config import BaseEventQueueConfig
+from vidur.events import BaseEvent
+
+
+class BaseEventQueue(ABC):
+    """
+    Priority queue of pending simulator events. Events come out ordered by their
+    priority number, i.e. by time and then by creation order (arrival order for
+    request arrivals).
+    """
+
+    def __init__(self, config: BaseEventQueueConfig) -> None:
+        self._config = config
+
+    @abstractmethod
+    def push(self, event: BaseEvent) -> None:
+        pass
+
+    @abstractmethod
+    def pop(self) -> BaseEvent:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def push_all(self, events: List[BaseEvent]) -> None:
+        for event in events:
+            self.push(event)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} events)"
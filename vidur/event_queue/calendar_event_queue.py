@@ -0,0 +1,125 @@
+from heapq import heapify, heappop, heappush, nsmallest
+from typing import List, Tuple
+
+from vidur.config import CalendarEventQueueConfig
+from vidur.event_queue.base_event_queue import BaseEventQueue
+from vidur.events import BaseEvent
+
+# number of earliest events the bucket width is estimated from on a resize
+WIDTH_SAMPLE_SIZE = 32
+
+
+class CalendarEventQueue(BaseEventQueue):
+    """
+    Calendar queue (R. Brown, 1988). Events are hashed by time into buckets of
+    `bucket_width` seconds which wrap around every `num_buckets` buckets (a "year"),
+    and a pop scans forward from the bucket of the last popped event. When the
+    width matches the spacing of the pending events push and pop are O(1) on
+    average, so the queue suits dense time ranges with many pending events. The
+    bucket count doubles/halves with the queue size and the width is re-estimated
+    from the earliest events on every resize.
+
+    Each bucket is a small heap of (time, order, event) tuples, events come out in
+    exactly the same order as from the binary heap queue.
+    """
+
+    def __init__(self, config: CalendarEventQueueConfig) -> None:
+        super().__init__(config)
+
+        assert config.num_buckets > 0 and config.bucket_width > 0
+
+        self._min_num_buckets = config.num_buckets
+        self._bucket_width = config.bucket_width
+        self._num_buckets = config.num_buckets
+        self._buckets: List[List[Tuple[float, int, BaseEvent]]] = [
+            [] for _ in range(self._num_buckets)
+        ]
+        self._size = 0
+        # virtual bucket (time / width, not wrapped) of the last popped event, no
+        # pending event lies in an earlier one
+        self._current_bucket = 0
+
+    def push(self, event: BaseEvent) -> None:
+        priority = event._priority_number
+        time = priority[0]
+        virtual_bucket = int(time / self._bucket_width)
+
+        heappush(
+            self._buckets[virtual_bucket % self._num_buckets],
+            (time, priority[1], event),
+        )
+        if virtual_bucket < self._current_bucket:
+            self._current_bucket = virtual_bucket
+
+        self._size += 1
+        if self._size > 2 * self._num_buckets:
+            self._resize(2 * self._num_buckets)
+
+    def pop(self) -> BaseEvent:
+        if not self._size:
+            raise IndexError("pop from an empty event queue")
+
+        buckets = self._buckets
+        num_buckets = self._num_buckets
+        bucket_width = self._bucket_width
+
+        virtual_bucket = self._current_bucket
+        for _ in range(num_buckets):
+            bucket = buckets[virtual_bucket % num_buckets]
+            # the bucket head is its earliest event, it is due if it belongs to
+            # this year rather than a later one
+            if bucket and int(bucket[0][0] / bucket_width) == virtual_bucket:
+                break
+            virtual_bucket += 1
+        else:
+            # nothing due within a year, jump straight to the earliest event
+            bucket = min(
+                (bucket for bucket in buckets if bucket), key=lambda x: x[0][:2]
+            )
+            virtual_bucket = int(bucket[0][0] / bucket_width)
+
+        self._current_bucket = virtual_bucket
+        event = heappop(bucket)[2]
+
+        self._size -= 1
+        if (
+            self._size < self._num_buckets // 2
+            and self._num_buckets > self._min_num_buckets
+        ):
+            self._resize(self._num_buckets // 2)
+
+        return event
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _estimate_bucket_width(
+        self, entries: List[Tuple[float, int, BaseEvent]]
+    ) -> float:
+        # a few times the average gap between the earliest distinct event times, so
+        # that a bucket holds a handful of events
+        times = sorted({entry[0] for entry in nsmallest(WIDTH_SAMPLE_SIZE, entries)})
+        gaps = [next_time - time for time, next_time in zip(times, times[1:])]
+        if not gaps:
+            return self._bucket_width
+
+        return 3 * sum(gaps) / len(gaps)
+
+    def _resize(self, num_buckets: int) -> None:
+        entries = [entry for bucket in self._buckets for entry in bucket]
+
+        self._bucket_width = self._estimate_bucket_width(entries)
+        self._num_buckets = num_buckets
+        self._buckets = [[] for _ in range(num_buckets)]
+
+        for entry in entries:
+            self._buckets[int(entry[0] / self._bucket_width) % num_buckets].append(
+                entry
+            )
+        for bucket in self._buckets:
+            heapify(bucket)
+
+        if entries:
+            self._current_bucket = int(min(entries)[0] / self._bucket_width)
+        else:
+            self._current_bucket = 0
@@ -0,0 +1,35 @@
+from heapq import heappop, heappush
+from typing import List, Tuple
+
+from vidur.config import HeapEventQueueConfig
+from vidur.event_queue.base_event_queue import BaseEventQueue
+from vidur.events import BaseEvent
+
+
+class HeapEventQueue(BaseEventQueue):
+    """
+    Binary heap of flat (time, order, event) tuples. The keys are plain floats and
+    ints compared in C, and since the order is unique the events themselves are
+    never compared.
+    """
+
+    def __init__(self, config: HeapEventQueueConfig) -> None:
+        super().__init__(config)
+
+        self._heap: List[Tuple[float, int, BaseEvent]] = []
+
+    def push(self, event: BaseEvent) -> None:
+        priority = event._priority_number
+        heappush(self._heap, (priority[0], priority[1], event))
+
+    def push_all(self, events: List[BaseEvent]) -> None:
+        heap = self._heap
+        for event in events:
+            priority = event._priority_number
+            heappush(heap, (priority[0], priority[1], event))
+
+    def pop(self) -> BaseEvent:
+        return heappop(self._heap)[2]
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -24,6 +24,7 @@ class ReplicaScheduleEvent(BaseEvent):
 
         replica_scheduler = scheduler.get_replica_scheduler(self._replica_id)
         self._batches = replica_scheduler.on_schedule()
+        scheduler.on_replica_schedule(self._replica_id, self._batches)
 
         if not self._batches:
             return []
@@ -32,6 +33,10 @@ class ReplicaScheduleEvent(BaseEvent):
         metrics_store.on_replica_schedule(
             self.time, self._replica_id, memory_usage_percent
         )
+        if replica_scheduler.block_allocator is not None:
+            metrics_store.on_block_allocator_update(
+                self.time, self._replica_id, replica_scheduler.block_allocator
+            )
 
         for batch in self._batches:
             batch.on_schedule(self.time)
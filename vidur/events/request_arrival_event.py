@@ -1,4 +1,5 @@
-from typing import List
+import sys
+from typing import List, Optional
 
 from vidur.entities import Request
 from vidur.events.base_event import BaseEvent
@@ -11,11 +12,23 @@ logger = init_logger(__name__)
 
 
 class RequestArrivalEvent(BaseEvent):
-    def __init__(self, time: float, request: Request) -> None:
+    def __init__(
+        self, time: float, request: Request, arrival_index: Optional[int] = None
+    ) -> None:
+        self._arrival_index = arrival_index
+
         super().__init__(time, EventType.REQUEST_ARRIVAL)
 
         self._request = request
 
+    def _get_priority_number(self):
+        if self._arrival_index is None:
+            return super()._get_priority_number()
+        # arrivals are pushed one at a time while the simulation runs, rank them by
+        # arrival index ahead of every other event at the same time, the same order
+        # they get when all of them are created before the simulation starts
+        return (self._time, self._arrival_index - sys.maxsize, self.event_type)
+
     def handle_event(
         self, scheduler: BaseGlobalScheduler, metrics_store: MetricsStore
     ) -> List[BaseEvent]:
@@ -0,0 +1,152 @@
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from vidur.config import (
+    AnalyticalExecutionTimePredictorConfig,
+    BaseReplicaSchedulerConfig,
+    MetricsConfig,
+    ReplicaConfig,
+)
+from vidur.execution_time_predictor.profiling_data_execution_time_predictor import (
+    ModelTrainingJob,
+    ProfilingDataExecutionTimePredictor,
+)
+from vidur.logger import init_logger
+
+logger = init_logger(__name__)
+
+
+def _decode_attention_terms(batch_size, kv_cache_size) -> Tuple:
+    # decode attention is memory bound, its time follows the kv cache bytes read
+    return 1, batch_size, batch_size * kv_cache_size
+
+
+def _prefill_attention_terms(kv_cache_size, prefill_chunk_size_squared) -> Tuple:
+    # prefill attention flops grow with chunk^2 (causal part) and kv * chunk
+    prefill_chunk_size = prefill_chunk_size_squared**0.5
+    return (
+        1,
+        prefill_chunk_size,
+        prefill_chunk_size_squared,
+        kv_cache_size,
+        kv_cache_size * prefill_chunk_size,
+    )
+
+
+def _get_piecewise_linear_terms(knots: Sequence[float]) -> Callable[..., Tuple]:
+    def piecewise_linear_terms(x) -> Tuple:
+        # (x - knot) * (x > knot) is max(0, x - knot) for scalars and arrays alike
+        return (1, x, *((x - knot) * (x > knot) for knot in knots))
+
+    return piecewise_linear_terms
+
+
+class ClosedFormModel:
+    """
+    Execution time of one operation as a linear combination of a few closed-form
+    terms of its features, e.g. a piecewise linear function of the number of
+    tokens. Indexing with a feature tuple evaluates it, like the prediction dicts
+    of the sklearn predictors; `predict` evaluates it on feature columns.
+    """
+
+    def __init__(
+        self, terms: Callable[..., Tuple], coefficients: Sequence[float]
+    ) -> None:
+        self._terms = terms
+        self._coefficients = tuple(float(c) for c in coefficients)
+
+    @classmethod
+    def fit(
+        cls, terms: Callable[..., Tuple], features: List[np.ndarray], y: np.ndarray
+    ) -> "ClosedFormModel":
+        A = np.column_stack(np.broadcast_arrays(*terms(*features))).astype(float)
+        # weighting the rows by 1 / y minimizes the relative instead of the
+        # absolute error, which is what the MAPE of the other predictors measures
+        weights = 1 / np.maximum(np.abs(y), 1e-6)
+        coefficients, *_ = np.linalg.lstsq(
+            A * weights[:, None], y * weights, rcond=None
+        )
+        return cls(terms, coefficients)
+
+    def predict(self, features: List[np.ndarray]) -> np.ndarray:
+        A = np.column_stack(np.broadcast_arrays(*self._terms(*features)))
+        return np.maximum(A @ np.array(self._coefficients), 0)
+
+    def __getitem__(self, key: Tuple) -> float:
+        value = 0.0
+        for coefficient, term in zip(self._coefficients, self._terms(*key)):
+            value += coefficient * term
+        return max(value, 0.0)
+
+
+class AnalyticalExecutionTimePredictor(ProfilingDataExecutionTimePredictor):
+    """
+    Fits closed forms per operation to the profiling data instead of training
+    sklearn models: piecewise linear functions of the number of tokens (or batch
+    size) and roofline-style terms for the attention kernels. Fitting is a
+    least squares solve per operation and an execution time costs a handful of
+    multiply-adds per operation, there is no prediction grid.
+    """
+
+    def __init__(
+        self,
+        predictor_config: AnalyticalExecutionTimePredictorConfig,
+        replica_config: ReplicaConfig,
+        replica_scheduler_config: BaseReplicaSchedulerConfig,
+        metrics_config: MetricsConfig,
+    ) -> None:
+        super().__init__(
+            predictor_config=predictor_config,
+            replica_config=replica_config,
+            replica_scheduler_config=replica_scheduler_config,
+            metrics_config=metrics_config,
+        )
+
+        self._models = self._train_models()
+        # the closed forms answer the same tuple keyed lookups as prediction dicts
+        self._predictions = self._models
+
+    def _get_model_params(self) -> Dict[str, Any]:
+        return {"num_knots": self._config.num_knots}
+
+    def _get_knots(self, x: np.ndarray) -> np.ndarray:
+        # the profiles sweep the number of tokens roughly geometrically, and the
+        # curves bend most at small sizes (launch / memory bound regime)
+        x_min, x_max = max(x.min(), 1), max(x.max(), 1)
+        if x_min == x_max:
+            return np.array([])
+        return np.geomspace(x_min, x_max, self._config.num_knots + 2)[1:-1]
+
+    def _fit_closed_form(self, job: ModelTrainingJob) -> ClosedFormModel:
+        features = [job.df[col].to_numpy(dtype=float) for col in job.feature_cols]
+        y = job.df[job.target_col].to_numpy(dtype=float)
+
+        if job.model_name == "attn_decode":
+            terms = _decode_attention_terms
+        elif job.model_name == "attn_prefill":
+            terms = _prefill_attention_terms
+        else:
+            terms = _get_piecewise_linear_terms(self._get_knots(features[0]).tolist())
+
+        return ClosedFormModel.fit(terms, features, y)
+
+    def _run_training_jobs(
+        self, jobs: List[ModelTrainingJob]
+    ) -> Dict[str, ClosedFormModel]:
+        models = {}
+        for job in jobs:
+            model = self._fit_closed_form(job)
+            error = self.mean_absolute_percentage_error(
+                job.df[job.target_col].to_numpy(),
+                model.predict(
+                    [job.df[col].to_numpy(dtype=float) for col in job.feature_cols]
+                ),
+            )
+            logger.info(
+                f"Fitted closed form for {job.model_name} "
+                f"with mean absolute percentage error (MEAP) {error}%"
+            )
+            models[job.model_name] = model
+
+        return models
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
 
 from vidur.config import (
     BaseExecutionTimePredictorConfig,
@@ -29,7 +31,62 @@ class BaseExecutionTimePredictor(ABC):
             self._model_config.num_layers // self._replica_config.num_pipeline_stages
         )
 
+        # LRU cache: (batch shape signature, pipeline stage) -> ExecutionTime
+        self._execution_time_cache_size = self._config.execution_time_cache_size
+        self._execution_time_cache: OrderedDict = OrderedDict()
+        self._execution_time_cache_hits = 0
+        self._execution_time_cache_misses = 0
+
+    def _get_batch_shape_signature(self, batch: Batch) -> Optional[Hashable]:
+        """
+        Returns a compact key that fully determines the predicted execution time of
+        the batch, or None if the batch should not be cached. Predictors that can
+        describe a batch by a few aggregate features should override this.
+        """
+        return None
+
     def get_execution_time(self, batch: Batch, pipeline_stage: int) -> ExecutionTime:
+        if not self._execution_time_cache_size:
+            return self._get_execution_time(batch, pipeline_stage)
+
+        signature = self._get_batch_shape_signature(batch)
+        if signature is None:
+            return self._get_execution_time(batch, pipeline_stage)
+
+        key = (signature, pipeline_stage)
+        execution_time = self._execution_time_cache.get(key)
+        if execution_time is not None:
+            self._execution_time_cache.move_to_end(key)
+            self._execution_time_cache_hits += 1
+            return execution_time
+
+        self._execution_time_cache_misses += 1
+        execution_time = self._get_execution_time(batch, pipeline_stage)
+        self._execution_time_cache[key] = execution_time
+        if len(self._execution_time_cache) > self._execution_time_cache_size:
+            self._execution_time_cache.popitem(last=False)
+
+        return execution_time
+
+    def get_execution_time_cache_stats(self) -> Dict[str, Any]:
+        num_lookups = (
+            self._execution_time_cache_hits + self._execution_time_cache_misses
+        )
+        return {
+            "hits": self._execution_time_cache_hits,
+            "misses": self._execution_time_cache_misses,
+            "hit_rate": (
+                self._execution_time_cache_hits / num_lookups if num_lookups else 0
+            ),
+            "size": len(self._execution_time_cache),
+        }
+
+    @abstractmethod
+    def get_swap_time(self, num_bytes: int) -> float:
+        """Time in seconds to copy `num_bytes` of KV cache between a device and the host."""
+        pass
+
+    def _get_execution_time(self, batch: Batch, pipeline_stage: int) -> ExecutionTime:
         if pipeline_stage == self._replica_config.num_pipeline_stages - 1:
             pipeline_parallel_communication_time = 0
         else:
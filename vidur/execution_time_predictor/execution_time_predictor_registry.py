@@ -1,3 +1,6 @@
+from vidur.execution_time_predictor.analytical_execution_time_predictor import (
+    AnalyticalExecutionTimePredictor,
+)
 from vidur.execution_time_predictor.linear_regression_execution_time_predictor import (
     LinearRegressionExecutionTimePredictor,
 )
@@ -20,3 +23,6 @@ ExecutionTimePredictorRegistry.register(
 ExecutionTimePredictorRegistry.register(
     ExecutionTimePredictorType.LINEAR_REGRESSION, LinearRegressionExecutionTimePredictor
 )
+ExecutionTimePredictorRegistry.register(
+    ExecutionTimePredictorType.ANALYTICAL, AnalyticalExecutionTimePredictor
+)
@@ -0,0 +1,87 @@
+import json
+import os
+import pickle
+import time
+from typing import IO, Any, Callable, Dict, Optional
+
+from fasteners import InterProcessLock
+
+from vidur.logger import init_logger
+
+logger = init_logger(__name__)
+
+INDEX_FILE_NAME = "index.json"
+
+
+def write_file_atomically(
+    path: str, write: Callable[[IO], None], mode: str = "wb"
+) -> None:
+    # write to a temporary file first, readers never see a partially written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class ModelStore:
+    """
+    Content addressed store for the trained models and their prediction dicts.
+
+    Objects live as pickle files in one directory next to a JSON index that maps
+    each key to its file and some metadata (size, creation time, training score,
+    ...). Both the objects and the index are written atomically, readers never
+    take a lock; only concurrent writers serialize on one lock around the index
+    update.
+    """
+
+    def __init__(self, store_dir: str) -> None:
+        self._store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+        self._index_file = f"{store_dir}/{INDEX_FILE_NAME}"
+        self._index_lock = InterProcessLock(f"{store_dir}/index.lock")
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self._index_file):
+            return {}
+
+        with open(self._index_file) as f:
+            return json.load(f)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._read_index()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._read_index().get(key)
+        if entry is None:
+            return None
+
+        path = f"{self._store_dir}/{entry['file']}"
+        if not os.path.exists(path):
+            logger.warning(f"Model store entry {key} is missing its file {path}")
+            return None
+
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def put(self, key: str, obj: Any, **metadata) -> None:
+        file_name = f"{key}.pkl"
+        path = f"{self._store_dir}/{file_name}"
+        write_file_atomically(
+            path, lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+        entry = {
+            "file": file_name,
+            "size_bytes": os.path.getsize(path),
+            "created_at": time.time(),
+            **metadata,
+        }
+        with self._index_lock:
+            index = self._read_index()
+            index[key] = entry
+            write_file_atomically(
+                self._index_file,
+                lambda f: json.dump(index, f, indent=4, sort_keys=True, default=str),
+                mode="w",
+            )
@@ -0,0 +1,750 @@
+import hashlib
+import os
+from abc import abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vidur.config import (
+    BaseExecutionTimePredictorConfig,
+    BaseReplicaSchedulerConfig,
+    MetricsConfig,
+    ReplicaConfig,
+)
+from vidur.entities import Batch
+from vidur.execution_time_predictor.base_execution_time_predictor import (
+    BaseExecutionTimePredictor,
+)
+from vidur.logger import init_logger
+
+logger = init_logger(__name__)
+
+# input file path -> ((size, mtime), md5 of the file content)
+_input_file_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def _get_input_file_digest(path: str) -> str:
+    stat = os.stat(path)
+    file_stats = (stat.st_size, stat.st_mtime_ns)
+
+    cached = _input_file_digests.get(path)
+    if cached is not None and cached[0] == file_stats:
+        return cached[1]
+
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    _input_file_digests[path] = (file_stats, digest.hexdigest())
+    return digest.hexdigest()
+
+
+class ModelTrainingJob(NamedTuple):
+    model_name: str
+    model_hash: str
+    df: pd.DataFrame
+    feature_cols: List[str]
+    target_col: str
+
+
+class ProfilingDataExecutionTimePredictor(BaseExecutionTimePredictor):
+    """
+    Base of the predictors that fit one model per operation to the profiling data.
+    It loads and filters the profiling CSVs into training jobs, and prices the
+    operations of a batch by looking up its features in `_predictions`, which maps
+    a model name to anything indexable by a feature tuple. Subclasses fit the
+    models in `_run_training_jobs` and set `_models` and `_predictions`.
+    """
+
+    def __init__(
+        self,
+        predictor_config: BaseExecutionTimePredictorConfig,
+        replica_config: ReplicaConfig,
+        replica_scheduler_config: BaseReplicaSchedulerConfig,
+        metrics_config: MetricsConfig,
+    ) -> None:
+        super().__init__(
+            predictor_config=predictor_config,
+            replica_config=replica_config,
+            replica_scheduler_config=replica_scheduler_config,
+            metrics_config=metrics_config,
+        )
+
+        # These overheads are only for GQA models
+        self._attention_prefill_batching_overhead_fraction = (
+            (self._config.attention_prefill_batching_overhead_fraction)
+            if self._model_config.num_q_heads > self._model_config.num_kv_heads
+            else 0
+        )
+        self._attention_decode_batching_overhead_fraction = (
+            (self._config.attention_decode_batching_overhead_fraction)
+            if self._model_config.num_q_heads > self._model_config.num_kv_heads
+            else 0
+        )
+        if self._replica_scheduler_provider == "orca":
+            self._max_tokens = (
+                self._config.prediction_max_tokens_per_request
+                * self._config.prediction_max_batch_size
+            )
+        else:
+            self._max_tokens = self._config.prediction_max_tokens_per_request
+
+        num_workers = (
+            self._replica_config.num_pipeline_stages
+            * self._replica_config.tensor_parallel_size
+        )
+        devices_per_node = self._replica_config.node_config.num_devices_per_node
+        assert (
+            num_workers < devices_per_node or num_workers % devices_per_node == 0
+        ), "Number of workers should be less than devices per node or a multiple of devices per node"
+
+        self._is_multi_node = num_workers > devices_per_node
+
+        (
+            self._compute_input_file,
+            self._attention_input_file,
+            self._all_reduce_input_file,
+            self._send_recv_input_file,
+            self._cpu_overhead_input_file,
+        ) = self._get_input_files()
+
+        # model name -> fitted model, and model name -> predictions indexed by
+        # feature tuples, set by the subclasses
+        self._models = None
+        self._predictions = None
+        # (latency in ms, ms per byte) of KV cache swaps, fitted on first use
+        self._swap_time_model: Optional[Tuple[float, float]] = None
+
+    def _get_input_files(self) -> Tuple[str, str, str, str, str]:
+        input_files = [
+            self._config.compute_input_file,
+            self._config.attention_input_file,
+            self._config.all_reduce_input_file,
+            self._config.send_recv_input_file,
+            self._config.cpu_overhead_input_file,
+        ]
+        for i in range(len(input_files)):
+            input_files[i] = (
+                input_files[i]
+                .replace("{DEVICE}", self._replica_config.device)
+                .replace("{MODEL}", self._model_config.get_name())
+                .replace("{NETWORK_DEVICE}", self._replica_config.network_device)
+            )
+
+        return tuple(input_files)
+
+    def _load_compute_df(self, file_path: str) -> pd.DataFrame:
+        df = self._read_input_file(file_path)
+        df = df.drop_duplicates()
+
+        logger.debug(f"Length of complete compute df: {len(df)} {file_path}")
+        logger.debug(f"self._num_q_heads: {self._model_config.num_q_heads}")
+        logger.debug(f"self._embedding_dim: {self._model_config.embedding_dim}")
+        logger.debug(f"self._mlp_hidden_dim: {self._model_config.mlp_hidden_dim}")
+        logger.debug(f"self._use_gated_mlp: {self._model_config.use_gated_mlp}")
+        logger.debug(f"self._vocab_size: {self._model_config.vocab_size}")
+        logger.debug(
+            f"self._num_tensor_parallel_workers: {self._replica_config.tensor_parallel_size}"
+        )
+
+        df = df[
+            (df["n_head"] == self._model_config.num_q_heads)
+            & (df["n_kv_head"] == self._model_config.num_kv_heads)
+            & (df["n_embd"] == self._model_config.embedding_dim)
+            & (df["n_expanded_embd"] == self._model_config.mlp_hidden_dim)
+            & (df["use_gated_mlp"] == self._model_config.use_gated_mlp)
+            & (df["vocab_size"] == self._model_config.vocab_size)
+            & (
+                df["num_tensor_parallel_workers"]
+                == self._replica_config.tensor_parallel_size
+            )
+        ]
+
+        for column in [
+            "time_stats.post_attention_layernorm.median",
+            "time_stats.add.median",
+            "time_stats.input_layernorm.median",
+        ]:
+            if column not in df.columns:
+                df[column] = 0
+            else:
+                df.fillna({column: 0}, inplace=True)
+        return df
+
+    def _load_attention_df(self, file_path: str) -> pd.DataFrame:
+        df = pd.read_csv(file_path)
+        df = df.drop_duplicates()
+
+        for column in [
+            "time_stats.attn_kv_cache_save.median",
+        ]:
+            if column not in df.columns:
+                df[column] = 0
+            else:
+                df.fillna({column: 0}, inplace=True)
+
+        return df[
+            (df["n_embd"] == self._model_config.embedding_dim)
+            & (df["n_q_head"] == self._model_config.num_q_heads)
+            & (df["n_kv_head"] == self._model_config.num_kv_heads)
+            & (df["block_size"] == self._block_size)
+            & (
+                df["num_tensor_parallel_workers"]
+                == self._replica_config.tensor_parallel_size
+            )
+        ]
+
+    def _load_all_reduce_df(self, file_path: str) -> pd.DataFrame:
+        df = self._read_input_file(file_path)
+        return df[
+            (df["num_workers"] == self._replica_config.tensor_parallel_size)
+            & (df["devices_per_node"] == self._replica_config.tensor_parallel_size)
+            & (df["collective"] == "all_reduce")
+        ]
+
+    def _load_send_recv_df(self, file_path: str) -> pd.DataFrame:
+        if self._is_multi_node:
+            devices_per_node = 1
+        else:
+            devices_per_node = 2
+
+        df = self._read_input_file(file_path)
+        filtered_df = df[
+            (df["collective"] == "send_recv")
+            & (df["devices_per_node"] == devices_per_node)
+        ]
+        return filtered_df
+
+    def _fit_swap_time_model(self) -> Tuple[float, float]:
+        # there is no profile of host <-> device copies, the transfers between
+        # nodes also go through PCIe and are the closest proxy for KV cache swaps
+        df = self._read_input_file(self._send_recv_input_file)
+        df = df[(df["collective"] == "send_recv") & (df["devices_per_node"] == 1)]
+        time_per_byte, latency = np.polyfit(
+            df["size"], df["time_stats.send_recv.median"], 1
+        )
+        return max(float(latency), 0.0), float(time_per_byte)
+
+    def get_swap_time(self, num_bytes: int) -> float:
+        if not num_bytes:
+            return 0
+
+        if self._swap_time_model is None:
+            self._swap_time_model = self._fit_swap_time_model()
+        latency, time_per_byte = self._swap_time_model
+        # return in seconds
+        return (latency + num_bytes * time_per_byte) * 1e-3
+
+    def _load_cpu_overhead_df(self, file_path: str) -> pd.DataFrame:
+        df = self._read_input_file(file_path)
+        filtered_df = df[
+            (df["model_name"] == self._model_config.get_name())
+            & (
+                df["tensor_parallel_degree"]
+                == self._replica_config.tensor_parallel_size
+            )
+        ]
+        return filtered_df
+
+    def _read_input_file(self, file_path: str) -> pd.DataFrame:
+        df = pd.read_csv(file_path)
+        df = df.drop_duplicates()
+        return df
+
+    def _get_compute_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        df_with_derived_features = df.copy()
+        return df_with_derived_features
+
+    def _get_attention_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        df_with_derived_features = df.copy()
+        df_with_derived_features["num_tokens"] = df_with_derived_features[
+            ["prefill_chunk_size", "batch_size"]
+        ].max(axis=1)
+        df_with_derived_features["is_decode"] = (
+            df_with_derived_features["prefill_chunk_size"] == 0
+        )
+        df_with_derived_features["prefill_chunk_size_squared"] = (
+            df_with_derived_features["prefill_chunk_size"] ** 2
+        )
+        return df_with_derived_features
+
+    def _get_all_reduce_df_with_derived_features(
+        self, df: pd.DataFrame
+    ) -> pd.DataFrame:
+        df_with_derived_features = df.copy()
+        # convert bytes to num tokens
+        # each token is of size 2 * h bytes
+        df_with_derived_features["num_tokens"] = (
+            df_with_derived_features["size"] / self._model_config.embedding_dim / 2
+        )
+        return df_with_derived_features
+
+    def _get_send_recv_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        df_with_derived_features = df.copy()
+        df_with_derived_features["num_tokens"] = (
+            df_with_derived_features["size"] / self._model_config.embedding_dim / 2
+        )
+        return df_with_derived_features
+
+    def _get_cpu_overhead_df_with_derived_features(
+        self, df: pd.DataFrame
+    ) -> pd.DataFrame:
+        df_with_derived_features = df.copy()
+        return df_with_derived_features
+
+    @staticmethod
+    def mean_absolute_percentage_error(y_true: np.array, y_pred: np.array) -> float:
+        y_true, y_pred = np.array(y_true), np.array(y_pred)
+        # Handling the case where y_true is 0 separately to avoid division by zero
+        zero_true_mask = y_true == 0
+        non_zero_true_mask = ~zero_true_mask
+
+        # For non-zero true values, calculate the absolute percentage error
+        error = np.zeros_like(y_true, dtype=float)  # using float instead of np.float
+        error[non_zero_true_mask] = (
+            np.abs(
+                (y_true[non_zero_true_mask] - y_pred[non_zero_true_mask])
+                / y_true[non_zero_true_mask]
+            )
+            * 100
+        )
+
+        # For zero true values, if prediction is also 0, error is 0, else it is 100
+        error[zero_true_mask] = np.where(y_pred[zero_true_mask] == 0, 0, 100)
+
+        # Return the mean of the absolute percentage errors
+        return np.mean(error)
+
+    @abstractmethod
+    def _get_model_params(self) -> Dict[str, Any]:
+        """Parameters of the model fits that are not in `to_dict`, part of the model hash."""
+        pass
+
+    def _get_model_hash(
+        self,
+        model_name: str,
+        input_file: str,
+        feature_cols: List[str],
+        target_col: str,
+    ) -> str:
+        # the training frame is fully determined by the input file and the filters
+        # applied to it, so hash those instead of serializing the frame itself
+        model_str = str(
+            {
+                **self.to_dict(),
+                "model_name": model_name,
+                "model": self._model_config.get_name(),
+                "is_multi_node": self._is_multi_node,
+                "input_file_digest": _get_input_file_digest(input_file),
+                "feature_cols": feature_cols,
+                "target_col": target_col,
+                # keeps its old name, so that the cached sklearn models stay valid
+                "grid_search_params": self._get_model_params(),
+            }
+        )
+        return hashlib.md5(model_str.encode("utf-8")).hexdigest()[0:8]
+
+    def _create_training_job(
+        self,
+        model_name: str,
+        input_file: str,
+        df: pd.DataFrame,
+        feature_cols: List[str],
+        target_col: str,
+    ) -> ModelTrainingJob:
+        if len(df) == 0:
+            raise Exception(f"Training data for model {model_name} is empty")
+
+        return ModelTrainingJob(
+            model_name=model_name,
+            model_hash=self._get_model_hash(
+                model_name, input_file, feature_cols, target_col
+            ),
+            df=df,
+            feature_cols=feature_cols,
+            target_col=target_col,
+        )
+
+    def _get_compute_training_jobs(self) -> List[ModelTrainingJob]:
+        compute_df = self._load_compute_df(self._compute_input_file)
+        compute_df = self._get_compute_df_with_derived_features(compute_df)
+
+        jobs = []
+        model_names = [
+            "attn_pre_proj",
+            "attn_post_proj",
+            "mlp_up_proj",
+            "mlp_down_proj",
+            "mlp_act",
+            "input_layernorm",
+            "post_attention_layernorm",
+            "attn_rope",
+            "add",
+        ]
+
+        for model_name in model_names:
+            logger.debug(
+                f"Training model {model_name}, size of training data: {len(compute_df)}"
+            )
+            jobs.append(
+                self._create_training_job(
+                    model_name=model_name,
+                    input_file=self._compute_input_file,
+                    df=compute_df,
+                    feature_cols=["num_tokens"],
+                    target_col=f"time_stats.{model_name}.median",
+                )
+            )
+
+        attention_df = self._load_attention_df(self._attention_input_file)
+        attention_df = self._get_attention_df_with_derived_features(attention_df)
+
+        model_names = [
+            "attn_kv_cache_save",
+        ]
+
+        for model_name in model_names:
+            jobs.append(
+                self._create_training_job(
+                    model_name=model_name,
+                    input_file=self._attention_input_file,
+                    df=attention_df,
+                    feature_cols=["num_tokens"],
+                    target_col=f"time_stats.{model_name}.median",
+                )
+            )
+
+        if self._replica_config.num_pipeline_stages > 1:
+            send_recv_df = self._load_send_recv_df(self._send_recv_input_file)
+            send_recv_df = self._get_send_recv_df_with_derived_features(send_recv_df)
+
+            jobs.append(
+                self._create_training_job(
+                    model_name="send_recv",
+                    input_file=self._send_recv_input_file,
+                    df=send_recv_df,
+                    feature_cols=["num_tokens"],
+                    target_col="time_stats.send_recv.median",
+                )
+            )
+
+        if self._replica_config.tensor_parallel_size > 1:
+            all_reduce_df = self._load_all_reduce_df(self._all_reduce_input_file)
+            all_reduce_df = self._get_all_reduce_df_with_derived_features(all_reduce_df)
+
+            jobs.append(
+                self._create_training_job(
+                    model_name="all_reduce",
+                    input_file=self._all_reduce_input_file,
+                    df=all_reduce_df,
+                    feature_cols=["num_tokens"],
+                    target_col="time_stats.all_reduce.median",
+                )
+            )
+
+        return jobs
+
+    def _get_cpu_overhead_training_jobs(self) -> List[ModelTrainingJob]:
+        if self._config.skip_cpu_overhead_modeling:
+            return []
+
+        jobs = []
+        model_names = [
+            "schedule",
+            "sampler_e2e",
+            "prepare_inputs_e2e",
+            "process_model_outputs",
+            "ray_comm_time",
+        ]
+
+        cpu_overhead_df = self._load_cpu_overhead_df(self._cpu_overhead_input_file)
+        cpu_overhead_df = self._get_cpu_overhead_df_with_derived_features(
+            cpu_overhead_df
+        )
+
+        for model_name in model_names:
+            if model_name == "ray_comm_time":
+                target_col = "ray_comm_time_mean"
+            else:
+                target_col = f"{model_name}_median"
+
+            jobs.append(
+                self._create_training_job(
+                    model_name=model_name,
+                    input_file=self._cpu_overhead_input_file,
+                    df=cpu_overhead_df,
+                    feature_cols=["batch_size"],
+                    target_col=target_col,
+                )
+            )
+
+        return jobs
+
+    def _get_attention_layer_training_jobs(self) -> List[ModelTrainingJob]:
+        attention_df = self._load_attention_df(self._attention_input_file)
+        attention_df = self._get_attention_df_with_derived_features(attention_df)
+        prefill_df = attention_df[~attention_df["is_decode"]]
+        decode_df = attention_df[attention_df["is_decode"]]
+
+        return [
+            self._create_training_job(
+                model_name="attn_prefill",
+                input_file=self._attention_input_file,
+                df=prefill_df,
+                feature_cols=["kv_cache_size", "prefill_chunk_size_squared"],
+                target_col="time_stats.attn_prefill.median",
+            ),
+            self._create_training_job(
+                model_name="attn_decode",
+                input_file=self._attention_input_file,
+                df=decode_df,
+                feature_cols=["batch_size", "kv_cache_size"],
+                target_col="time_stats.attn_decode.median",
+            ),
+        ]
+
+    @abstractmethod
+    def _run_training_jobs(self, jobs: List[ModelTrainingJob]) -> Dict[str, Any]:
+        """Fits a model per job, returns model name -> model."""
+        pass
+
+    def _train_models(self) -> Dict[str, Any]:
+        jobs = self._get_compute_training_jobs()
+        jobs.extend(self._get_cpu_overhead_training_jobs())
+        jobs.extend(self._get_attention_layer_training_jobs())
+
+        return self._run_training_jobs(jobs)
+
+    def _get_batch_shape_signature(self, batch: Batch) -> Tuple:
+        # everything the prediction tables are indexed by
+        return (
+            batch._total_num_tokens_rounded,
+            batch.total_num_tokens,
+            batch.size,
+            self._get_batch_decode_attention_params(batch),
+            self._get_batch_prefill_attention_key(batch),
+        )
+
+    def _get_batch_prefill_attention_key(
+        self, batch: Batch
+    ) -> Optional[Tuple[int, int, bool]]:
+        """
+        Returns (aggregate kv cache size, rounded aggregate prefill chunk size,
+        whether more than one prefill is batched), or None if there are no prefills.
+        """
+        prefill_params = self._get_batch_prefill_attention_params(batch)
+
+        if len(prefill_params) == 0:
+            return None
+
+        agg_kv_cache_size = 0
+        agg_prefill_chunk_size_squared = 0
+        for kv_cache_size, prefill_chunk_size in prefill_params:
+            agg_kv_cache_size += kv_cache_size
+            agg_prefill_chunk_size_squared += prefill_chunk_size**2
+
+        return (
+            agg_kv_cache_size,
+            round(agg_prefill_chunk_size_squared**0.5),
+            len(prefill_params) > 1,
+        )
+
+    def _get_batch_decode_attention_params(self, batch: Batch) -> Tuple[int, int]:
+        if batch._decode_params is not None:
+            return batch._decode_params
+
+        decode_batch_size = 0
+        decode_total_kv_cache_size = 0
+
+        for request in batch.requests:
+            if request._is_prefill_complete:
+                decode_batch_size += 1
+                decode_total_kv_cache_size += request.num_processed_tokens
+
+        if not decode_batch_size:
+            batch._decode_params = (0, 0)
+            return batch._decode_params
+
+        decode_avg_kv_cache_size = decode_total_kv_cache_size // decode_batch_size
+        decode_avg_kv_cache_size = (
+            (
+                decode_avg_kv_cache_size
+                + self._config.kv_cache_prediction_granularity
+                - 1
+            )
+            // self._config.kv_cache_prediction_granularity
+        ) * self._config.kv_cache_prediction_granularity
+
+        batch._decode_params = (decode_batch_size, decode_avg_kv_cache_size)
+
+        return batch._decode_params
+
+    def _get_batch_prefill_attention_params(
+        self, batch: Batch
+    ) -> List[Tuple[int, int]]:
+        if batch._prefill_params is not None:
+            return batch._prefill_params
+
+        prefill_params = []
+
+        for request, num_tokens_to_process in zip(batch.requests, batch.num_tokens):
+            if request._is_prefill_complete:
+                continue
+
+            prefill_chunk_size = num_tokens_to_process
+            kv_cache_size = (
+                (
+                    request.num_processed_tokens
+                    + self._config.kv_cache_prediction_granularity
+                    - 1
+                )
+                // self._config.kv_cache_prediction_granularity
+            ) * self._config.kv_cache_prediction_granularity
+
+            prefill_params.append((kv_cache_size, prefill_chunk_size))
+
+        batch._prefill_params = prefill_params
+
+        return prefill_params
+
+    def _get_attention_layer_pre_proj_execution_time(self, batch: Batch) -> float:
+        return self._predictions["attn_pre_proj"][(batch._total_num_tokens_rounded,)]
+
+    def _get_attention_layer_post_proj_execution_time(self, batch: Batch) -> float:
+        return self._predictions["attn_post_proj"][(batch._total_num_tokens_rounded,)]
+
+    def _get_mlp_layer_up_proj_execution_time(self, batch: Batch) -> float:
+        return self._predictions["mlp_up_proj"][(batch._total_num_tokens_rounded,)]
+
+    def _get_mlp_layer_down_proj_execution_time(self, batch: Batch) -> float:
+        return self._predictions["mlp_down_proj"][(batch._total_num_tokens_rounded,)]
+
+    def _get_mlp_layer_act_execution_time(self, batch: Batch) -> float:
+        return self._predictions["mlp_act"][(batch._total_num_tokens_rounded,)]
+
+    def _get_attn_norm_layer_act_execution_time(self, batch: Batch) -> float:
+        return self._predictions["input_layernorm"][(batch._total_num_tokens_rounded,)]
+
+    def _get_mlp_norm_layer_act_execution_time(self, batch: Batch) -> float:
+        if not self._model_config.post_attn_norm:
+            return 0
+
+        return self._predictions["post_attention_layernorm"][
+            (batch._total_num_tokens_rounded,)
+        ]
+
+    def _get_add_layer_act_execution_time(self, batch: Batch) -> float:
+        return self._predictions["add"][(batch._total_num_tokens_rounded,)]
+
+    def _get_tensor_parallel_communication_time(self, batch: Batch) -> float:
+        return (
+            self._predictions["all_reduce"][(batch._total_num_tokens_rounded,)]
+            + self._config.nccl_cpu_launch_overhead_ms
+            + self._config.nccl_cpu_skew_overhead_per_device_ms
+            * self._replica_config.tensor_parallel_size**1.25
+        )
+
+    def _get_pipeline_parallel_communication_time(self, batch: Batch) -> float:
+        try:
+            return self._predictions["send_recv"][(batch._total_num_tokens_rounded,)]
+        except KeyError as e:
+            logger.error(f"Failed to get send_recv prediction for batch {batch}")
+            raise e
+
+    def _get_attention_rope_execution_time(self, batch: Batch) -> float:
+        return self._predictions["attn_rope"][(batch._total_num_tokens_rounded,)]
+
+    def _get_attention_kv_cache_save_execution_time(self, batch: Batch) -> float:
+        # don't use round up to the nearest multiple of 8 here, because we want to
+        # predict the execution time for the exact number of tokens
+        num_tokens = sum(batch.num_tokens)
+
+        return self._predictions["attn_kv_cache_save"][(num_tokens,)]
+
+    def _get_attention_decode_execution_time(self, batch: Batch) -> float:
+        (
+            decode_batch_size,
+            decode_avg_kv_cache_size,
+        ) = self._get_batch_decode_attention_params(batch)
+        if decode_batch_size == 0:
+            return 0
+
+        return self._predictions["attn_decode"][
+            (decode_batch_size, decode_avg_kv_cache_size)
+        ] * (
+            1
+            + self._attention_decode_batching_overhead_fraction
+            * int(decode_batch_size > 1)
+        )
+
+    def _get_attention_prefill_execution_time(self, batch: Batch) -> float:
+        prefill_params = self._get_batch_prefill_attention_params(batch)
+
+        if len(prefill_params) == 0:
+            return 0
+
+        kv_cache_sizes, prefill_chunk_sizes = zip(*prefill_params)
+
+        agg_kv_cache_size = sum(kv_cache_sizes)
+        agg_prefill_chunk_size = sum([x**2 for x in prefill_chunk_sizes]) ** 0.5
+
+        return self._predictions["attn_prefill"][
+            (agg_kv_cache_size, round(agg_prefill_chunk_size) ** 2)
+        ] * (
+            1
+            + self._attention_prefill_batching_overhead_fraction
+            * int(len(prefill_params) > 1)
+        )
+
+    def _get_schedule_time(self, batch: Batch) -> float:
+        if self._config.skip_cpu_overhead_modeling:
+            return 0
+
+        return self._predictions["schedule"][(batch.size,)]
+
+    def _get_sampler_e2e_time(self, batch: Batch) -> float:
+        if self._config.skip_cpu_overhead_modeling:
+            return 0
+
+        return self._predictions["sampler_e2e"][(batch.size,)]
+
+    def _get_prepare_inputs_e2e_time(self, batch: Batch) -> float:
+        if self._config.skip_cpu_overhead_modeling:
+            return 0
+
+        return self._predictions["prepare_inputs_e2e"][(batch.size,)]
+
+    def _get_process_model_outputs_time(self, batch: Batch) -> float:
+        if self._config.skip_cpu_overhead_modeling:
+            return 0
+
+        return self._predictions["process_model_outputs"][(batch.size,)]
+
+    def _get_ray_comm_time(self, batch: Batch) -> float:
+        if self._config.skip_cpu_overhead_modeling:
+            return 0
+
+        return self._predictions["ray_comm_time"][(batch.size,)]
+
+    def to_dict(self) -> dict:
+        return {
+            "model_provider": str(self._config.get_type()),
+            "num_tensor_parallel_workers": self._replica_config.tensor_parallel_size,
+            "k_fold_cv_splits": self._config.k_fold_cv_splits,
+            "num_q_heads": self._model_config.num_q_heads,
+            "num_kv_heads": self._model_config.num_kv_heads,
+            "embedding_dim": self._model_config.embedding_dim,
+            "mlp_hidden_dim": self._model_config.mlp_hidden_dim,
+            "use_gated_mlp": self._model_config.use_gated_mlp,
+            "vocab_size": self._model_config.vocab_size,
+            "block_size": self._block_size,
+            "max_tokens": self._max_tokens,
+            "compute_input_file": self._compute_input_file,
+            "all_reduce_input_file": self._all_reduce_input_file,
+            "send_recv_input_file": self._send_recv_input_file,
+            "cpu_overhead_input_file": self._cpu_overhead_input_file,
+            "prediction_max_prefill_chunk_size": self._config.prediction_max_prefill_chunk_size,
+            "max_batch_size": self._config.prediction_max_batch_size,
+        }
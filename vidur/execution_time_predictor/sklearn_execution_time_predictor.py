@@ -1,13 +1,14 @@
 import hashlib
+import math
+import multiprocessing
 import os
-import pickle
 from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from itertools import product
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
-from fasteners import InterProcessReaderWriterLock
 from sklearn.base import BaseEstimator
 from sklearn.metrics import make_scorer
 from sklearn.model_selection import GridSearchCV
@@ -18,16 +19,60 @@ from vidur.config import (
     MetricsConfig,
     ReplicaConfig,
 )
-from vidur.entities import Batch
-from vidur.execution_time_predictor.base_execution_time_predictor import (
-    BaseExecutionTimePredictor,
+from vidur.entities import Batch, ExecutionTime
+from vidur.execution_time_predictor.model_store import (
+    ModelStore,
+    write_file_atomically,
+)
+from vidur.execution_time_predictor.profiling_data_execution_time_predictor import (
+    ModelTrainingJob,
+    ProfilingDataExecutionTimePredictor,
 )
 from vidur.logger import init_logger
 
 logger = init_logger(__name__)
 
-
-class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
+# models whose predictions are keyed by the (rounded) number of tokens in the batch
+TOKEN_MODEL_NAMES = [
+    "attn_pre_proj",
+    "attn_post_proj",
+    "mlp_up_proj",
+    "mlp_down_proj",
+    "mlp_act",
+    "attn_rope",
+    "attn_kv_cache_save",
+    "input_layernorm",
+    "post_attention_layernorm",
+    "add",
+    "send_recv",
+    "all_reduce",
+]
+# models whose predictions are keyed by the batch size
+BATCH_SIZE_MODEL_NAMES = [
+    "schedule",
+    "sampler_e2e",
+    "prepare_inputs_e2e",
+    "process_model_outputs",
+    "ray_comm_time",
+]
+# number of token counts / prefill chunk sizes predicted at once when the
+# prediction tables are filled on demand
+LAZY_PREDICTION_BLOCK_SIZE = 256
+
+
+def _fit_grid_search(
+    grid_search: GridSearchCV, X: pd.DataFrame, y: pd.Series
+) -> Tuple[BaseEstimator, Dict[str, Any], float]:
+    # module level, so that it can be sent to the training pool workers
+    grid_search.fit(X, y)
+    return (
+        grid_search.best_estimator_,
+        grid_search.best_params_,
+        grid_search.score(X, y),
+    )
+
+
+class SklearnExecutionTimePredictor(ProfilingDataExecutionTimePredictor):
     def __init__(
         self,
         predictor_config: BaseExecutionTimePredictorConfig,
@@ -42,231 +87,41 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
             metrics_config=metrics_config,
         )
         os.makedirs(self._cache_dir, exist_ok=True)
-
-        # These overheads are only for GQA models
-        self._attention_prefill_batching_overhead_fraction = (
-            (self._config.attention_prefill_batching_overhead_fraction)
-            if self._model_config.num_q_heads > self._model_config.num_kv_heads
-            else 0
-        )
-        self._attention_decode_batching_overhead_fraction = (
-            (self._config.attention_decode_batching_overhead_fraction)
-            if self._model_config.num_q_heads > self._model_config.num_kv_heads
-            else 0
-        )
-        if self._replica_scheduler_provider == "orca":
-            self._max_tokens = (
-                self._config.prediction_max_tokens_per_request
-                * self._config.prediction_max_batch_size
-            )
-        else:
-            self._max_tokens = self._config.prediction_max_tokens_per_request
-
-        num_workers = (
-            self._replica_config.num_pipeline_stages
-            * self._replica_config.tensor_parallel_size
+        self._model_store = ModelStore(f"{self._cache_dir}/models")
+        # model name -> hash of the training setup, set when the models are trained
+        self._model_hashes: Dict[str, str] = {}
+
+        # blocks of the prediction grid that are already predicted, only set when
+        # the tables are filled on demand
+        self._predicted_blocks: Optional[Set[Tuple]] = None
+        # last kv cache bucket of the attention prediction grid
+        self._max_kv_cache_bucket = (
+            self._config.prediction_max_tokens_per_request
+            // self._config.kv_cache_prediction_granularity
         )
-        devices_per_node = self._replica_config.node_config.num_devices_per_node
-        assert (
-            num_workers < devices_per_node or num_workers % devices_per_node == 0
-        ), "Number of workers should be less than devices per node or a multiple of devices per node"
+        self._warned_prefill_kv_cache_cap = False
+        # the models and prediction dicts are only needed to build the prediction
+        # tables, when those are already exported they are loaded lazily
+        self._init_predictions()
 
-        self._is_multi_node = num_workers > devices_per_node
+    def _init_predictions(self) -> None:
+        if self._load_prediction_tables():
+            return
 
-        (
-            self._compute_input_file,
-            self._attention_input_file,
-            self._all_reduce_input_file,
-            self._send_recv_input_file,
-            self._cpu_overhead_input_file,
-        ) = self._get_input_files()
+        if self._config.lazy_prediction:
+            self._init_lazy_prediction_tables()
+        else:
+            self._load_predictions()
+            self._build_prediction_tables()
+            self._store_prediction_tables()
 
+    def _load_predictions(self) -> None:
         self._models = self._train_models()
         self._predictions = self._predict_from_models()
 
-    def _get_input_files(self) -> Tuple[str, str, str, str, str]:
-        input_files = [
-            self._config.compute_input_file,
-            self._config.attention_input_file,
-            self._config.all_reduce_input_file,
-            self._config.send_recv_input_file,
-            self._config.cpu_overhead_input_file,
-        ]
-        for i in range(len(input_files)):
-            input_files[i] = (
-                input_files[i]
-                .replace("{DEVICE}", self._replica_config.device)
-                .replace("{MODEL}", self._model_config.get_name())
-                .replace("{NETWORK_DEVICE}", self._replica_config.network_device)
-            )
-
-        return tuple(input_files)
-
-    def _load_compute_df(self, file_path: str) -> pd.DataFrame:
-        df = self._read_input_file(file_path)
-        df = df.drop_duplicates()
-
-        logger.debug(f"Length of complete compute df: {len(df)} {file_path}")
-        logger.debug(f"self._num_q_heads: {self._model_config.num_q_heads}")
-        logger.debug(f"self._embedding_dim: {self._model_config.embedding_dim}")
-        logger.debug(f"self._mlp_hidden_dim: {self._model_config.mlp_hidden_dim}")
-        logger.debug(f"self._use_gated_mlp: {self._model_config.use_gated_mlp}")
-        logger.debug(f"self._vocab_size: {self._model_config.vocab_size}")
-        logger.debug(
-            f"self._num_tensor_parallel_workers: {self._replica_config.tensor_parallel_size}"
-        )
-
-        df = df[
-            (df["n_head"] == self._model_config.num_q_heads)
-            & (df["n_kv_head"] == self._model_config.num_kv_heads)
-            & (df["n_embd"] == self._model_config.embedding_dim)
-            & (df["n_expanded_embd"] == self._model_config.mlp_hidden_dim)
-            & (df["use_gated_mlp"] == self._model_config.use_gated_mlp)
-            & (df["vocab_size"] == self._model_config.vocab_size)
-            & (
-                df["num_tensor_parallel_workers"]
-                == self._replica_config.tensor_parallel_size
-            )
-        ]
-
-        for column in [
-            "time_stats.post_attention_layernorm.median",
-            "time_stats.add.median",
-            "time_stats.input_layernorm.median",
-        ]:
-            if column not in df.columns:
-                df[column] = 0
-            else:
-                df.fillna({column: 0}, inplace=True)
-        return df
-
-    def _load_attention_df(self, file_path: str) -> pd.DataFrame:
-        df = pd.read_csv(file_path)
-        df = df.drop_duplicates()
-
-        for column in [
-            "time_stats.attn_kv_cache_save.median",
-        ]:
-            if column not in df.columns:
-                df[column] = 0
-            else:
-                df.fillna({column: 0}, inplace=True)
-
-        return df[
-            (df["n_embd"] == self._model_config.embedding_dim)
-            & (df["n_q_head"] == self._model_config.num_q_heads)
-            & (df["n_kv_head"] == self._model_config.num_kv_heads)
-            & (df["block_size"] == self._block_size)
-            & (
-                df["num_tensor_parallel_workers"]
-                == self._replica_config.tensor_parallel_size
-            )
-        ]
-
-    def _load_all_reduce_df(self, file_path: str) -> pd.DataFrame:
-        df = self._read_input_file(file_path)
-        return df[
-            (df["num_workers"] == self._replica_config.tensor_parallel_size)
-            & (df["devices_per_node"] == self._replica_config.tensor_parallel_size)
-            & (df["collective"] == "all_reduce")
-        ]
-
-    def _load_send_recv_df(self, file_path: str) -> pd.DataFrame:
-        if self._is_multi_node:
-            devices_per_node = 1
-        else:
-            devices_per_node = 2
-
-        df = self._read_input_file(file_path)
-        filtered_df = df[
-            (df["collective"] == "send_recv")
-            & (df["devices_per_node"] == devices_per_node)
-        ]
-        return filtered_df
-
-    def _load_cpu_overhead_df(self, file_path: str) -> pd.DataFrame:
-        df = self._read_input_file(file_path)
-        filtered_df = df[
-            (df["model_name"] == self._model_config.get_name())
-            & (
-                df["tensor_parallel_degree"]
-                == self._replica_config.tensor_parallel_size
-            )
-        ]
-        return filtered_df
-
-    def _read_input_file(self, file_path: str) -> pd.DataFrame:
-        df = pd.read_csv(file_path)
-        df = df.drop_duplicates()
-        return df
-
-    def _get_compute_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_with_derived_features = df.copy()
-        return df_with_derived_features
-
-    def _get_attention_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_with_derived_features = df.copy()
-        df_with_derived_features["num_tokens"] = df_with_derived_features[
-            ["prefill_chunk_size", "batch_size"]
-        ].max(axis=1)
-        df_with_derived_features["is_decode"] = (
-            df_with_derived_features["prefill_chunk_size"] == 0
-        )
-        df_with_derived_features["prefill_chunk_size_squared"] = (
-            df_with_derived_features["prefill_chunk_size"] ** 2
-        )
-        return df_with_derived_features
-
-    def _get_all_reduce_df_with_derived_features(
-        self, df: pd.DataFrame
-    ) -> pd.DataFrame:
-        df_with_derived_features = df.copy()
-        # convert bytes to num tokens
-        # each token is of size 2 * h bytes
-        df_with_derived_features["num_tokens"] = (
-            df_with_derived_features["size"] / self._model_config.embedding_dim / 2
-        )
-        return df_with_derived_features
-
-    def _get_send_recv_df_with_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_with_derived_features = df.copy()
-        df_with_derived_features["num_tokens"] = (
-            df_with_derived_features["size"] / self._model_config.embedding_dim / 2
-        )
-        return df_with_derived_features
-
-    def _get_cpu_overhead_df_with_derived_features(
-        self, df: pd.DataFrame
-    ) -> pd.DataFrame:
-        df_with_derived_features = df.copy()
-        return df_with_derived_features
-
-    @staticmethod
-    def mean_absolute_percentage_error(y_true: np.array, y_pred: np.array) -> float:
-        y_true, y_pred = np.array(y_true), np.array(y_pred)
-        # Handling the case where y_true is 0 separately to avoid division by zero
-        zero_true_mask = y_true == 0
-        non_zero_true_mask = ~zero_true_mask
-
-        # For non-zero true values, calculate the absolute percentage error
-        error = np.zeros_like(y_true, dtype=float)  # using float instead of np.float
-        error[non_zero_true_mask] = (
-            np.abs(
-                (y_true[non_zero_true_mask] - y_pred[non_zero_true_mask])
-                / y_true[non_zero_true_mask]
-            )
-            * 100
-        )
-
-        # For zero true values, if prediction is also 0, error is 0, else it is 100
-        error[zero_true_mask] = np.where(y_pred[zero_true_mask] == 0, 0, 100)
-
-        # Return the mean of the absolute percentage errors
-        return np.mean(error)
-
     def _get_scorer(self) -> Any:
         return make_scorer(
-            SklearnExecutionTimePredictor.mean_absolute_percentage_error,
+            ProfilingDataExecutionTimePredictor.mean_absolute_percentage_error,
             greater_is_better=False,
         )
 
@@ -278,41 +133,24 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
     def _get_estimator(self) -> BaseEstimator:
         pass
 
-    def _get_model_hash(self, model_name: str, df: pd.DataFrame = None) -> str:
-        config_str = str(self.to_dict())
-
-        if df is None:
-            combined_str = f"{config_str}_{model_name}"
-        else:
-            df_hash_str = hashlib.md5(df.to_json().encode("utf-8")).hexdigest()
-            combined_str = f"{config_str}_{model_name}_{df_hash_str}"
-
-        return hashlib.md5(combined_str.encode("utf-8")).hexdigest()[0:8]
+    def _get_model_params(self) -> Dict[str, Any]:
+        return self._get_grid_search_params()
 
     def _load_model_from_cache(self, model_name: str, model_hash: str) -> BaseEstimator:
-        with InterProcessReaderWriterLock(
-            f"{self._cache_dir}/{model_hash}_model_lock.file"
-        ).read_lock():
-            if self._config.no_cache:
-                return
-            # check if model is in cache
-            cache_file = f"{self._cache_dir}/{model_name}_{model_hash}.pkl"
-            if not os.path.exists(cache_file):
-                return
+        if self._config.no_cache:
+            return
 
+        model = self._model_store.get(f"{model_name}_{model_hash}")
+        if model is not None:
             logger.debug(f"Found model {model_name} in cache")
-            model = pickle.load(open(cache_file, "rb"))
-            return model
+        return model
 
     def _store_model_in_cache(
-        self, model_name: str, model_hash: str, model: BaseEstimator
+        self, model_name: str, model_hash: str, model: BaseEstimator, **metadata
     ) -> None:
-        with InterProcessReaderWriterLock(
-            f"{self._cache_dir}/{model_hash}_model_lock.file"
-        ).write_lock():
-            # store model in cache
-            cache_file = f"{self._cache_dir}/{model_name}_{model_hash}.pkl"
-            pickle.dump(model, open(cache_file, "wb"), protocol=pickle.HIGHEST_PROTOCOL)
+        self._model_store.put(
+            f"{model_name}_{model_hash}", model, model_name=model_name, **metadata
+        )
 
     def _store_training_prediction_data(
         self,
@@ -334,97 +172,131 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
             index=False,
         )
 
-    def _train_model(
-        self,
-        model_name: str,
-        df: pd.DataFrame,
-        feature_cols: List[str],
-        target_col: str,
-    ) -> BaseEstimator:
-        if len(df) == 0:
-            raise Exception(f"Training data for model {model_name} is empty")
-
-        model_hash = self._get_model_hash(model_name, df)
-
-        cached_model = self._load_model_from_cache(model_name, model_hash)
-        if cached_model:
-            return cached_model
-
-        model = self._get_estimator()
-        grid_search_params = self._get_grid_search_params()
-
+    def _get_grid_search(self, df: pd.DataFrame, n_jobs: int) -> GridSearchCV:
         if len(df) < self._config.k_fold_cv_splits:
             cv = 2
         else:
             cv = self._config.k_fold_cv_splits
 
-        grid_search = GridSearchCV(
-            estimator=model,
-            param_grid=grid_search_params,
+        return GridSearchCV(
+            estimator=self._get_estimator(),
+            param_grid=self._get_grid_search_params(),
             scoring=self._get_scorer(),
             cv=cv,
-            n_jobs=self._config.num_training_job_threads,
+            n_jobs=n_jobs,
         )
 
-        # we don't create a train/test split, because we want to use all data for training
-        # and we don't care about overfitting, because we only want to predict execution time within the same domain
-        X, y = df[feature_cols], df[target_col]
+    def _get_num_training_processes(self, num_jobs: int) -> int:
+        # daemonic processes (e.g. multiprocessing.Pool workers) can't have children
+        if multiprocessing.current_process().daemon:
+            return 1
 
-        grid_search.fit(X, y)
-        score = grid_search.score(X, y)
+        num_processes = self._config.num_training_processes
+        if num_processes == -1:
+            num_processes = os.cpu_count() or 1
+        return max(1, min(num_processes, num_jobs))
 
-        logger.info(
-            f"Trained model {model_name} and found best parameters: {grid_search.best_params_} "
-            f"with mean absolute percentage error (MEAP) {-score}%"
-        )
+    def _run_training_jobs(
+        self, jobs: List[ModelTrainingJob]
+    ) -> Dict[str, BaseEstimator]:
+        models = {}
+        pending_jobs = []
+        for job in jobs:
+            self._model_hashes[job.model_name] = job.model_hash
+            model = self._load_model_from_cache(job.model_name, job.model_hash)
+            if model is None:
+                pending_jobs.append(job)
+            else:
+                models[job.model_name] = model
 
-        self._store_model_in_cache(model_name, model_hash, grid_search.best_estimator_)
+        if pending_jobs:
+            num_processes = self._get_num_training_processes(len(pending_jobs))
+            n_jobs = self._config.num_training_job_threads
+            if n_jobs == -1 and num_processes > 1:
+                # split the cores between the pool workers instead of oversubscribing
+                n_jobs = max(1, (os.cpu_count() or 1) // num_processes)
 
-        self._store_training_prediction_data(
-            model_name=model_name,
-            model_hash=model_hash,
-            df=df,
-            feature_cols=feature_cols,
-            target_col=target_col,
-            model=grid_search.best_estimator_,
+            logger.info(
+                f"Training {len(pending_jobs)} models on {num_processes} processes"
+            )
+
+            # we don't create a train/test split, because we want to use all data for training
+            # and we don't care about overfitting, because we only want to predict execution time within the same domain
+            fit_args = [
+                (
+                    self._get_grid_search(job.df, n_jobs),
+                    job.df[job.feature_cols],
+                    job.df[job.target_col],
+                )
+                for job in pending_jobs
+            ]
+            if num_processes > 1:
+                with ProcessPoolExecutor(num_processes) as pool:
+                    results = list(pool.map(_fit_grid_search, *zip(*fit_args)))
+            else:
+                results = [_fit_grid_search(*args) for args in fit_args]
+
+            for job, (model, best_params, score) in zip(pending_jobs, results):
+                logger.info(
+                    f"Trained model {job.model_name} and found best parameters: {best_params} "
+                    f"with mean absolute percentage error (MEAP) {-score}%"
+                )
+
+                self._store_model_in_cache(
+                    job.model_name,
+                    job.model_hash,
+                    model,
+                    best_params=best_params,
+                    mape=-score,
+                )
+                self._store_training_prediction_data(
+                    model_name=job.model_name,
+                    model_hash=job.model_hash,
+                    df=job.df,
+                    feature_cols=job.feature_cols,
+                    target_col=job.target_col,
+                    model=model,
+                )
+                models[job.model_name] = model
+
+        return {job.model_name: models[job.model_name] for job in jobs}
+
+    def _get_prediction_hash(self, model_name: str) -> str:
+        # the model hash covers to_dict, add the grid parameters that are not in it
+        prediction_str = (
+            f"{self._model_hashes[model_name]}"
+            f"_{self._config.prediction_max_tokens_per_request}"
+            f"_{self._config.kv_cache_prediction_granularity}"
         )
-        return grid_search.best_estimator_
+        return hashlib.md5(prediction_str.encode("utf-8")).hexdigest()[0:8]
 
     def _store_model_predication_cache(
         self, model_name: str, model_hash: str, predictions: Dict[Tuple, float]
     ) -> None:
-        with InterProcessReaderWriterLock(
-            f"{self._cache_dir}/{model_hash}_prediction_lock.file"
-        ).write_lock():
-            cache_file = f"{self._cache_dir}/{model_name}_{model_hash}_predictions.pkl"
-            pickle.dump(
-                predictions, open(cache_file, "wb"), protocol=pickle.HIGHEST_PROTOCOL
-            )
+        self._model_store.put(
+            f"{model_name}_{model_hash}_predictions",
+            predictions,
+            model_name=model_name,
+            num_predictions=len(predictions),
+        )
 
     def _load_model_predication_cache(
         self, model_name: str, model_hash: str
     ) -> Dict[Tuple, float]:
-        with InterProcessReaderWriterLock(
-            f"{self._cache_dir}/{model_hash}_prediction_lock.file"
-        ).read_lock():
-            if self._config.no_cache:
-                return
-            cache_file = f"{self._cache_dir}/{model_name}_{model_hash}_predictions.pkl"
-
-            if not os.path.exists(cache_file):
-                return
+        if self._config.no_cache:
+            return
 
+        predictions = self._model_store.get(f"{model_name}_{model_hash}_predictions")
+        if predictions is not None:
             logger.debug(f"Found model {model_name} predictions in cache")
-
-            predictions = pickle.load(open(cache_file, "rb"))
-            return predictions
+        return predictions
 
     def _get_model_prediction(
         self, model_name: str, model: BaseEstimator, X: pd.DataFrame
     ) -> Dict[Tuple, float]:
         X = X.copy()
 
-        model_hash = self._get_model_hash(model, df=None)
+        model_hash = self._get_prediction_hash(model_name)
 
         cached_predictions = self._load_model_predication_cache(model_name, model_hash)
         if cached_predictions:
@@ -448,143 +320,6 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
 
         return predictions
 
-    def _train_compute_models(self) -> Dict[str, BaseEstimator]:
-        compute_df = self._load_compute_df(self._compute_input_file)
-        compute_df = self._get_compute_df_with_derived_features(compute_df)
-
-        models = {}
-        model_names = [
-            "attn_pre_proj",
-            "attn_post_proj",
-            "mlp_up_proj",
-            "mlp_down_proj",
-            "mlp_act",
-            "input_layernorm",
-            "post_attention_layernorm",
-            "attn_rope",
-            "add",
-        ]
-
-        for model_name in model_names:
-            logger.debug(
-                f"Training model {model_name}, size of training data: {len(compute_df)}"
-            )
-            models[model_name] = self._train_model(
-                model_name=model_name,
-                df=compute_df,
-                feature_cols=["num_tokens"],
-                target_col=f"time_stats.{model_name}.median",
-            )
-
-        attention_df = self._load_attention_df(self._attention_input_file)
-        attention_df = self._get_attention_df_with_derived_features(attention_df)
-
-        model_names = [
-            "attn_kv_cache_save",
-        ]
-
-        for model_name in model_names:
-            models[model_name] = self._train_model(
-                model_name=model_name,
-                df=attention_df,
-                feature_cols=["num_tokens"],
-                target_col=f"time_stats.{model_name}.median",
-            )
-
-        if self._replica_config.num_pipeline_stages > 1:
-            send_recv_df = self._load_send_recv_df(self._send_recv_input_file)
-            send_recv_df = self._get_send_recv_df_with_derived_features(send_recv_df)
-
-            models["send_recv"] = self._train_model(
-                model_name="send_recv",
-                df=send_recv_df,
-                feature_cols=["num_tokens"],
-                target_col="time_stats.send_recv.median",
-            )
-
-        if self._replica_config.tensor_parallel_size > 1:
-            all_reduce_df = self._load_all_reduce_df(self._all_reduce_input_file)
-            all_reduce_df = self._get_all_reduce_df_with_derived_features(all_reduce_df)
-
-            models["all_reduce"] = self._train_model(
-                model_name="all_reduce",
-                df=all_reduce_df,
-                feature_cols=["num_tokens"],
-                target_col="time_stats.all_reduce.median",
-            )
-
-        return models
-
-    def _train_cpu_overhead_models(self) -> Dict[str, BaseEstimator]:
-        if self._config.skip_cpu_overhead_modeling:
-            return {}
-
-        models = {}
-        model_names = [
-            "schedule",
-            "sampler_e2e",
-            "prepare_inputs_e2e",
-            "process_model_outputs",
-            "ray_comm_time",
-        ]
-
-        cpu_overhead_df = self._load_cpu_overhead_df(self._cpu_overhead_input_file)
-        cpu_overhead_df = self._get_cpu_overhead_df_with_derived_features(
-            cpu_overhead_df
-        )
-
-        for model_name in model_names:
-            if model_name == "ray_comm_time":
-                target_col = "ray_comm_time_mean"
-            else:
-                target_col = f"{model_name}_median"
-
-            models[model_name] = self._train_model(
-                model_name=model_name,
-                df=cpu_overhead_df,
-                feature_cols=["batch_size"],
-                target_col=target_col,
-            )
-
-        return models
-
-    def _train_attention_layer_models(self) -> Dict[str, BaseEstimator]:
-        attention_df = self._load_attention_df(self._attention_input_file)
-        attention_df = self._get_attention_df_with_derived_features(attention_df)
-        prefill_df = attention_df[~attention_df["is_decode"]]
-        decode_df = attention_df[attention_df["is_decode"]]
-
-        models = {}
-
-        chunked_prefill_df = prefill_df[prefill_df["kv_cache_size"] > 0].copy()
-        chunked_prefill_df["total_prefill_tokens"] = (
-            chunked_prefill_df["kv_cache_size"]
-            + chunked_prefill_df["prefill_chunk_size"]
-        )
-
-        models["attn_prefill"] = self._train_model(
-            model_name="attn_prefill",
-            df=prefill_df,
-            feature_cols=["kv_cache_size", "prefill_chunk_size_squared"],
-            target_col="time_stats.attn_prefill.median",
-        )
-
-        models["attn_decode"] = self._train_model(
-            model_name="attn_decode",
-            df=decode_df,
-            feature_cols=["batch_size", "kv_cache_size"],
-            target_col="time_stats.attn_decode.median",
-        )
-
-        return models
-
-    def _train_models(self) -> Dict[str, BaseEstimator]:
-        models = self._train_compute_models()
-        models.update(self._train_cpu_overhead_models())
-        models.update(self._train_attention_layer_models())
-
-        return models
-
     def _predict_for_compute_models(self) -> Dict[str, Any]:
         predictions = {}
 
@@ -722,118 +457,380 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
 
         return predictions
 
-    def _get_batch_decode_attention_params(self, batch: Batch) -> Tuple[int, int]:
-        if hasattr(batch, "_decode_params"):
-            return batch._decode_params
+    @staticmethod
+    def _to_dense_table(
+        predictions: Dict[Tuple, float], key_to_index: Callable[[Tuple], Tuple]
+    ) -> np.ndarray:
+        # cells that are not covered by the prediction grid are left as NaN
+        indices = np.array([key_to_index(key) for key in predictions], dtype=np.int64)
+        table = np.full(tuple(indices.max(axis=0) + 1), np.nan)
+        table[tuple(indices.T)] = np.fromiter(
+            predictions.values(), dtype=np.float64, count=len(predictions)
+        )
+        return table
+
+    def _build_prediction_tables(self) -> None:
+        """
+        Materializes the prediction dicts into dense NumPy tables indexed by
+        num_tokens, batch_size and kv cache bucket, so that `get_execution_time`
+        prices a batch with a few array lookups instead of ~20 tuple-keyed dict lookups.
+        """
+        kv_granularity = self._config.kv_cache_prediction_granularity
+
+        # one column per model in TOKEN_MODEL_NAMES order, row index is the number
+        # of tokens; communication models that were not trained are left as NaN
+        token_tables = {
+            model_name: self._to_dense_table(
+                self._predictions[model_name], lambda key: key
+            )
+            for model_name in TOKEN_MODEL_NAMES
+            if model_name in self._predictions
+        }
+        num_rows = max(len(table) for table in token_tables.values())
+        self._token_table = np.full((num_rows, len(TOKEN_MODEL_NAMES)), np.nan)
+        for column, model_name in enumerate(TOKEN_MODEL_NAMES):
+            if model_name in token_tables:
+                table = token_tables[model_name]
+                self._token_table[: len(table), column] = table
+        self._kv_cache_save_column = TOKEN_MODEL_NAMES.index("attn_kv_cache_save")
+
+        # one column per model, row index is the batch size
+        if self._config.skip_cpu_overhead_modeling:
+            self._batch_size_table = None
+        else:
+            self._batch_size_table = np.stack(
+                [
+                    self._to_dense_table(self._predictions[model_name], lambda key: key)
+                    for model_name in BATCH_SIZE_MODEL_NAMES
+                ],
+                axis=1,
+            )
+
+        # (decode batch size, kv cache bucket)
+        self._attn_decode_table = self._to_dense_table(
+            self._predictions["attn_decode"],
+            lambda key: (key[0], key[1] // kv_granularity),
+        )
+        # (kv cache bucket, aggregate prefill chunk size)
+        self._attn_prefill_table = self._to_dense_table(
+            self._predictions["attn_prefill"],
+            lambda key: (key[0] // kv_granularity, math.isqrt(int(key[1]))),
+        )
 
-        decode_kv_cache_sizes = []
+    def _init_lazy_prediction_tables(self) -> None:
+        """
+        Allocates the prediction tables empty (NaN) and fills them in blocks as the
+        simulation asks for batch shapes, see `_predict_missing_blocks`. Start-up
+        only trains (or loads) the models, instead of predicting the whole grid.
+        """
+        self._models = self._train_models()
+        self._predicted_blocks = set()
 
-        for request in batch.requests:
-            if request._is_prefill_complete:
-                decode_kv_cache_sizes.append(request.num_processed_tokens)
+        # the token table can get very large (orca), its rows are added as needed
+        self._token_table = np.full((1, len(TOKEN_MODEL_NAMES)), np.nan)
+        self._kv_cache_save_column = TOKEN_MODEL_NAMES.index("attn_kv_cache_save")
 
-        if not decode_kv_cache_sizes:
-            batch._decode_params = (0, 0)
-            return batch._decode_params
+        if self._config.skip_cpu_overhead_modeling:
+            self._batch_size_table = None
+        else:
+            # small, predicted right away
+            batch_sizes = np.arange(1, self._config.prediction_max_batch_size + 1)
+            X = pd.DataFrame({"batch_size": batch_sizes})
+            self._batch_size_table = np.full(
+                (len(batch_sizes) + 1, len(BATCH_SIZE_MODEL_NAMES)), np.nan
+            )
+            for column, model_name in enumerate(BATCH_SIZE_MODEL_NAMES):
+                self._batch_size_table[1:, column] = self._models[model_name].predict(X)
 
-        decode_batch_size = len(decode_kv_cache_sizes)
-        decode_avg_kv_cache_size = int(np.mean(decode_kv_cache_sizes))
-        decode_avg_kv_cache_size = (
+        self._attn_decode_table = np.full(
+            (self._config.prediction_max_batch_size + 1, self._max_kv_cache_bucket + 1),
+            np.nan,
+        )
+        self._attn_prefill_table = np.full(
             (
-                decode_avg_kv_cache_size
-                + self._config.kv_cache_prediction_granularity
-                - 1
-            )
-            // self._config.kv_cache_prediction_granularity
-        ) * self._config.kv_cache_prediction_granularity
+                self._max_kv_cache_bucket + 1,
+                self._config.prediction_max_prefill_chunk_size + 1,
+            ),
+            np.nan,
+        )
+
+    def _predict_token_block(self, block: int) -> None:
+        start = max(1, block * LAZY_PREDICTION_BLOCK_SIZE)
+        end = min((block + 1) * LAZY_PREDICTION_BLOCK_SIZE, self._max_tokens + 1)
+        if start >= end:
+            return
+
+        if len(self._token_table) < end:
+            num_rows = min(max(end, 2 * len(self._token_table)), self._max_tokens + 1)
+            token_table = np.full((num_rows, len(TOKEN_MODEL_NAMES)), np.nan)
+            token_table[: len(self._token_table)] = self._token_table
+            self._token_table = token_table
+
+        X = pd.DataFrame({"num_tokens": np.arange(start, end)})
+        for column, model_name in enumerate(TOKEN_MODEL_NAMES):
+            if model_name in self._models:
+                self._token_table[start:end, column] = self._models[model_name].predict(
+                    X
+                )
 
-        batch._decode_params = (decode_batch_size, decode_avg_kv_cache_size)
+    def _predict_decode_row(self, batch_size: int) -> None:
+        if batch_size >= len(self._attn_decode_table):
+            return
 
-        return batch._decode_params
+        kv_cache_sizes = np.arange(
+            0,
+            self._config.prediction_max_tokens_per_request + 1,
+            self._config.kv_cache_prediction_granularity,
+        )
+        X = pd.DataFrame(
+            {
+                "batch_size": np.full(len(kv_cache_sizes), batch_size),
+                "kv_cache_size": kv_cache_sizes,
+            }
+        )
+        self._attn_decode_table[batch_size, : len(kv_cache_sizes)] = self._models[
+            "attn_decode"
+        ].predict(X)
 
-    def _get_batch_prefill_attention_params(
-        self, batch: Batch
-    ) -> List[Tuple[int, int]]:
-        if hasattr(batch, "_prefill_params"):
-            return batch._prefill_params
+    def _predict_prefill_block(self, kv_cache_bucket: int, block: int) -> None:
+        start = max(1, block * LAZY_PREDICTION_BLOCK_SIZE)
+        end = min(
+            (block + 1) * LAZY_PREDICTION_BLOCK_SIZE,
+            self._config.prediction_max_prefill_chunk_size + 1,
+        )
+        if kv_cache_bucket >= len(self._attn_prefill_table) or start >= end:
+            return
 
-        prefill_params = []
+        prefill_chunk_sizes = np.arange(start, end)
+        X = pd.DataFrame(
+            {
+                "kv_cache_size": np.full(
+                    len(prefill_chunk_sizes),
+                    kv_cache_bucket * self._config.kv_cache_prediction_granularity,
+                ),
+                "prefill_chunk_size_squared": prefill_chunk_sizes**2,
+            }
+        )
+        self._attn_prefill_table[kv_cache_bucket, start:end] = self._models[
+            "attn_prefill"
+        ].predict(X)
+
+    def _predict_missing_blocks(self, batch: Batch) -> None:
+        """
+        Makes sure the table cells `_get_execution_time_from_tables` reads for this
+        batch are predicted. Cells are predicted a block at a time with one
+        vectorized model call and kept, so every block is predicted only once.
+        """
+        blocks = [
+            ("token", batch._total_num_tokens_rounded // LAZY_PREDICTION_BLOCK_SIZE),
+            ("token", batch.total_num_tokens // LAZY_PREDICTION_BLOCK_SIZE),
+        ]
 
-        for request, num_tokens_to_process in zip(batch.requests, batch.num_tokens):
-            if request._is_prefill_complete:
-                continue
+        decode_batch_size, _ = self._get_batch_decode_attention_params(batch)
+        if decode_batch_size:
+            blocks.append(("decode", decode_batch_size))
 
-            prefill_chunk_size = num_tokens_to_process
-            kv_cache_size = (
+        prefill_key = self._get_batch_prefill_attention_key(batch)
+        if prefill_key is not None:
+            blocks.append(
                 (
-                    request.num_processed_tokens
-                    + self._config.kv_cache_prediction_granularity
-                    - 1
+                    "prefill",
+                    self._get_prefill_kv_cache_bucket(prefill_key[0]),
+                    prefill_key[1] // LAZY_PREDICTION_BLOCK_SIZE,
                 )
-                // self._config.kv_cache_prediction_granularity
-            ) * self._config.kv_cache_prediction_granularity
-
-            prefill_params.append((kv_cache_size, prefill_chunk_size))
-
-        batch._prefill_params = prefill_params
-
-        return prefill_params
-
-    def _get_attention_layer_pre_proj_execution_time(self, batch: Batch) -> float:
-        return self._predictions["attn_pre_proj"][(batch._total_num_tokens_rounded,)]
-
-    def _get_attention_layer_post_proj_execution_time(self, batch: Batch) -> float:
-        return self._predictions["attn_post_proj"][(batch._total_num_tokens_rounded,)]
+            )
 
-    def _get_mlp_layer_up_proj_execution_time(self, batch: Batch) -> float:
-        return self._predictions["mlp_up_proj"][(batch._total_num_tokens_rounded,)]
+        for block in blocks:
+            if block in self._predicted_blocks:
+                continue
+            self._predicted_blocks.add(block)
 
-    def _get_mlp_layer_down_proj_execution_time(self, batch: Batch) -> float:
-        return self._predictions["mlp_down_proj"][(batch._total_num_tokens_rounded,)]
+            if block[0] == "token":
+                self._predict_token_block(block[1])
+            elif block[0] == "decode":
+                self._predict_decode_row(block[1])
+            else:
+                self._predict_prefill_block(block[1], block[2])
 
-    def _get_mlp_layer_act_execution_time(self, batch: Batch) -> float:
-        return self._predictions["mlp_act"][(batch._total_num_tokens_rounded,)]
+    def _get_prediction_tables_hash(self) -> str:
+        # the input files are fingerprinted by size and mtime, so that refreshed
+        # profiling data invalidates the tables without having to read it first
+        input_files = [
+            self._compute_input_file,
+            self._attention_input_file,
+            self._all_reduce_input_file,
+            self._send_recv_input_file,
+            self._cpu_overhead_input_file,
+        ]
+        input_file_stats = [
+            (
+                (os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                if os.path.exists(path)
+                else None
+            )
+            for path in input_files
+        ]
+        tables_str = str(
+            {
+                **self.to_dict(),
+                "attention_input_file": self._attention_input_file,
+                "input_file_stats": input_file_stats,
+                # the send_recv profile rows depend on the node layout
+                "is_multi_node": self._is_multi_node,
+                "devices_per_node": self._replica_config.node_config.num_devices_per_node,
+                "num_pipeline_stages": self._replica_config.num_pipeline_stages,
+                "prediction_max_tokens_per_request": self._config.prediction_max_tokens_per_request,
+                "kv_cache_prediction_granularity": self._config.kv_cache_prediction_granularity,
+                "skip_cpu_overhead_modeling": self._config.skip_cpu_overhead_modeling,
+                "grid_search_params": self._get_grid_search_params(),
+            }
+        )
+        return hashlib.md5(tables_str.encode("utf-8")).hexdigest()[0:8]
 
-    def _get_attn_norm_layer_act_execution_time(self, batch: Batch) -> float:
-        return self._predictions["input_layernorm"][(batch._total_num_tokens_rounded,)]
+    def _get_prediction_tables(self) -> Dict[str, np.ndarray]:
+        tables = {
+            "token_table": self._token_table,
+            "attn_decode_table": self._attn_decode_table,
+            "attn_prefill_table": self._attn_prefill_table,
+        }
+        if self._batch_size_table is not None:
+            tables["batch_size_table"] = self._batch_size_table
+        return tables
+
+    def _store_prediction_tables(self) -> None:
+        """
+        Exports the dense prediction tables as .npy files, so that other simulator
+        processes can memory-map them instead of unpickling the prediction dicts.
+        Like the model store, every file is written atomically and writers of the
+        same hash write the same content, so neither side takes a lock.
+        """
+        if self._config.no_cache:
+            return
+
+        tables_hash = self._get_prediction_tables_hash()
+        for table_name, table in self._get_prediction_tables().items():
+            table_file = f"{self._cache_dir}/{table_name}_{tables_hash}.npy"
+            if os.path.exists(table_file):
+                continue
+            write_file_atomically(table_file, lambda f: np.save(f, table))
+
+    def _load_prediction_tables(self) -> bool:
+        """
+        Attaches to previously exported prediction tables. The files are memory-mapped
+        read-only, so all processes using the same tables share one physical copy.
+        """
+        if self._config.no_cache:
+            return False
+
+        tables_hash = self._get_prediction_tables_hash()
+        table_names = ["token_table", "attn_decode_table", "attn_prefill_table"]
+        if not self._config.skip_cpu_overhead_modeling:
+            table_names.append("batch_size_table")
+
+        # a table set is only used once all of its files are in place
+        table_files = {
+            table_name: f"{self._cache_dir}/{table_name}_{tables_hash}.npy"
+            for table_name in table_names
+        }
+        if not all(os.path.exists(path) for path in table_files.values()):
+            return False
 
-    def _get_mlp_norm_layer_act_execution_time(self, batch: Batch) -> float:
-        if not self._model_config.post_attn_norm:
-            return 0
+        logger.debug(f"Found prediction tables {tables_hash} in cache")
 
-        return self._predictions["post_attention_layernorm"][
-            (batch._total_num_tokens_rounded,)
-        ]
+        # plain ndarray views over the mapping, indexing np.memmap is slower
+        tables = {
+            table_name: np.asarray(np.load(path, mmap_mode="r"))
+            for table_name, path in table_files.items()
+        }
 
-    def _get_add_layer_act_execution_time(self, batch: Batch) -> float:
-        return self._predictions["add"][(batch._total_num_tokens_rounded,)]
+        self._token_table = tables["token_table"]
+        self._kv_cache_save_column = TOKEN_MODEL_NAMES.index("attn_kv_cache_save")
+        self._batch_size_table = tables.get("batch_size_table")
+        self._attn_decode_table = tables["attn_decode_table"]
+        self._attn_prefill_table = tables["attn_prefill_table"]
+        return True
 
-    def _get_tensor_parallel_communication_time(self, batch: Batch) -> float:
-        return (
-            self._predictions["all_reduce"][(batch._total_num_tokens_rounded,)]
-            + self._config.nccl_cpu_launch_overhead_ms
-            + self._config.nccl_cpu_skew_overhead_per_device_ms
-            * self._replica_config.tensor_parallel_size**1.25
-        )
+    def _get_execution_time(self, batch: Batch, pipeline_stage: int) -> ExecutionTime:
+        if self._predicted_blocks is not None:
+            self._predict_missing_blocks(batch)
 
-    def _get_pipeline_parallel_communication_time(self, batch: Batch) -> float:
         try:
-            return self._predictions["send_recv"][(batch._total_num_tokens_rounded,)]
-        except KeyError as e:
-            logger.error(f"Failed to get send_recv prediction for batch {batch}")
-            raise e
-
-    def _get_attention_rope_execution_time(self, batch: Batch) -> float:
-        return self._predictions["attn_rope"][(batch._total_num_tokens_rounded,)]
-
-    def _get_attention_kv_cache_save_execution_time(self, batch: Batch) -> float:
+            return self._get_execution_time_from_tables(batch, pipeline_stage)
+        except IndexError as e:
+            # the prediction dicts cover the same grid, a lookup there would
+            # only fail the same way after predicting the whole grid
+            logger.error(f"Batch {batch} is outside of the prediction grid")
+            raise KeyError(
+                f"No prediction for batch {batch.id}, its tokens, batch size or KV cache"
+                f" size exceed the prediction grid (up to {self._max_tokens} tokens)"
+            ) from e
+
+    def _get_execution_time_from_tables(
+        self, batch: Batch, pipeline_stage: int
+    ) -> ExecutionTime:
+        (
+            attn_pre_proj_time,
+            attn_post_proj_time,
+            mlp_up_proj_time,
+            mlp_down_proj_time,
+            mlp_act_time,
+            attn_rope_time,
+            _,
+            attn_norm_time,
+            mlp_norm_time,
+            add_time,
+            send_recv_time,
+            all_reduce_time,
+        ) = self._token_table[batch._total_num_tokens_rounded].tolist()
         # don't use round up to the nearest multiple of 8 here, because we want to
         # predict the execution time for the exact number of tokens
-        num_tokens = sum(batch.num_tokens)
+        kv_cache_save_time = self._token_table[
+            batch.total_num_tokens, self._kv_cache_save_column
+        ]
+
+        if self._batch_size_table is None:
+            cpu_overhead_times = [0] * len(BATCH_SIZE_MODEL_NAMES)
+        else:
+            cpu_overhead_times = self._batch_size_table[batch.size].tolist()
+
+        if pipeline_stage == self._replica_config.num_pipeline_stages - 1:
+            pipeline_parallel_communication_time = 0
+        else:
+            pipeline_parallel_communication_time = send_recv_time
 
-        return self._predictions["attn_kv_cache_save"][(num_tokens,)]
+        if self._replica_config.tensor_parallel_size == 1:
+            tensor_parallel_communication_time = 0
+        else:
+            tensor_parallel_communication_time = (
+                all_reduce_time
+                + self._config.nccl_cpu_launch_overhead_ms
+                + self._config.nccl_cpu_skew_overhead_per_device_ms
+                * self._replica_config.tensor_parallel_size**1.25
+            )
 
-    def _get_attention_decode_execution_time(self, batch: Batch) -> float:
+        if not self._model_config.post_attn_norm:
+            mlp_norm_time = 0
+
+        return ExecutionTime(
+            self._num_layers_per_pipeline_stage,
+            attn_rope_time,
+            kv_cache_save_time,
+            self._get_attention_decode_execution_time_from_table(batch),
+            self._get_attention_prefill_execution_time_from_table(batch),
+            attn_pre_proj_time,
+            attn_post_proj_time,
+            mlp_up_proj_time,
+            mlp_down_proj_time,
+            mlp_act_time,
+            attn_norm_time,
+            mlp_norm_time,
+            add_time,
+            tensor_parallel_communication_time,
+            pipeline_parallel_communication_time,
+            *cpu_overhead_times,
+        )
+
+    def _get_attention_decode_execution_time_from_table(self, batch: Batch) -> float:
         (
             decode_batch_size,
             decode_avg_kv_cache_size,
@@ -841,80 +838,45 @@ class SklearnExecutionTimePredictor(BaseExecutionTimePredictor):
         if decode_batch_size == 0:
             return 0
 
-        return self._predictions["attn_decode"][
-            (decode_batch_size, decode_avg_kv_cache_size)
+        return self._attn_decode_table[
+            decode_batch_size,
+            decode_avg_kv_cache_size // self._config.kv_cache_prediction_granularity,
         ] * (
             1
             + self._attention_decode_batching_overhead_fraction
             * int(decode_batch_size > 1)
         )
 
-    def _get_attention_prefill_execution_time(self, batch: Batch) -> float:
-        prefill_params = self._get_batch_prefill_attention_params(batch)
-
-        if len(prefill_params) == 0:
-            return 0
-
-        kv_cache_sizes, prefill_chunk_sizes = zip(*prefill_params)
-
-        agg_kv_cache_size = sum(kv_cache_sizes)
-        agg_prefill_chunk_size = sum([x**2 for x in prefill_chunk_sizes]) ** 0.5
-
-        return self._predictions["attn_prefill"][
-            (agg_kv_cache_size, round(agg_prefill_chunk_size) ** 2)
-        ] * (
-            1
-            + self._attention_prefill_batching_overhead_fraction
-            * int(len(prefill_params) > 1)
-        )
-
-    def _get_schedule_time(self, batch: Batch) -> float:
-        if self._config.skip_cpu_overhead_modeling:
-            return 0
-
-        return self._predictions["schedule"][(batch.size,)]
-
-    def _get_sampler_e2e_time(self, batch: Batch) -> float:
-        if self._config.skip_cpu_overhead_modeling:
-            return 0
-
-        return self._predictions["sampler_e2e"][(batch.size,)]
-
-    def _get_prepare_inputs_e2e_time(self, batch: Batch) -> float:
-        if self._config.skip_cpu_overhead_modeling:
-            return 0
-
-        return self._predictions["prepare_inputs_e2e"][(batch.size,)]
-
-    def _get_process_model_outputs_time(self, batch: Batch) -> float:
-        if self._config.skip_cpu_overhead_modeling:
-            return 0
-
-        return self._predictions["process_model_outputs"][(batch.size,)]
+    def _get_attention_prefill_execution_time_from_table(self, batch: Batch) -> float:
+        prefill_key = self._get_batch_prefill_attention_key(batch)
 
-    def _get_ray_comm_time(self, batch: Batch) -> float:
-        if self._config.skip_cpu_overhead_modeling:
+        if prefill_key is None:
             return 0
 
-        return self._predictions["ray_comm_time"][(batch.size,)]
-
-    def to_dict(self) -> dict:
-        return {
-            "model_provider": str(self._config.get_type()),
-            "num_tensor_parallel_workers": self._replica_config.tensor_parallel_size,
-            "k_fold_cv_splits": self._config.k_fold_cv_splits,
-            "num_q_heads": self._model_config.num_q_heads,
-            "num_kv_heads": self._model_config.num_kv_heads,
-            "embedding_dim": self._model_config.embedding_dim,
-            "mlp_hidden_dim": self._model_config.mlp_hidden_dim,
-            "use_gated_mlp": self._model_config.use_gated_mlp,
-            "vocab_size": self._model_config.vocab_size,
-            "block_size": self._block_size,
-            "max_tokens": self._max_tokens,
-            "compute_input_file": self._compute_input_file,
-            "all_reduce_input_file": self._all_reduce_input_file,
-            "send_recv_input_file": self._send_recv_input_file,
-            "cpu_overhead_input_file": self._cpu_overhead_input_file,
-            "prediction_max_prefill_chunk_size": self._config.prediction_max_prefill_chunk_size,
-            "max_batch_size": self._config.prediction_max_batch_size,
-        }
+        agg_kv_cache_size, agg_prefill_chunk_size, is_batched = prefill_key
+
+        return self._attn_prefill_table[
+            self._get_prefill_kv_cache_bucket(agg_kv_cache_size),
+            agg_prefill_chunk_size,
+        ] * (1 + self._attention_prefill_batching_overhead_fraction * int(is_batched))
+
+    def _get_prefill_kv_cache_bucket(self, agg_kv_cache_size: int) -> int:
+        """
+        The kv cache sizes of all the prefills in a batch are summed up, which can
+        exceed the per request grid, e.g. when many prefills hit cached prefixes.
+        Such batches are priced at the last kv cache bucket of the grid.
+        """
+        kv_cache_bucket = (
+            agg_kv_cache_size // self._config.kv_cache_prediction_granularity
+        )
+        if kv_cache_bucket <= self._max_kv_cache_bucket:
+            return kv_cache_bucket
+
+        if not self._warned_prefill_kv_cache_cap:
+            self._warned_prefill_kv_cache_cap = True
+            logger.warning(
+                f"Aggregate prefill kv cache size {agg_kv_cache_size} exceeds the"
+                f" prediction grid (up to {self._config.prediction_max_tokens_per_request}"
+                " tokens), capping it to the grid for this and later batches"
+            )
+        return self._max_kv_cache_bucket
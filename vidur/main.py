@@ -1,4 +1,5 @@
 from vidur.config import SimulationConfig
+from vidur.sharded_simulator import ShardedSimulator
 from vidur.simulator import Simulator
 from vidur.utils.random import set_seeds
 
@@ -8,7 +9,10 @@ def main() -> None:
 
     set_seeds(config.seed)
 
-    simulator = Simulator(config)
+    if config.num_shards > 1:
+        simulator = ShardedSimulator(config)
+    else:
+        simulator = Simulator(config)
     simulator.run()
 
 
@@ -42,6 +42,10 @@ class CDFSketch:
         data = self._last_data + delta
         self.put(data)
 
+    # merge the datapoints of another sketch, e.g. of a simulation shard
+    def merge(self, other: "CDFSketch") -> None:
+        self._sketch.merge(other._sketch)
+
     def print_distribution_stats(self, plot_name: str) -> None:
         if self._sketch._count == 0:
             return
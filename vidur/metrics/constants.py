@@ -67,6 +67,7 @@ class RequestMetricsHistogram(enum.Enum):
     REQUEST_DECODE_TOKENS = "request_num_decode_tokens"
     REQUEST_PD_RATIO = "request_pd_ratio"
     REQUEST_NUM_RESTARTS = "request_num_restarts"
+    REQUEST_NUM_CACHED_TOKENS = "request_num_cached_tokens"
 
 
 class BatchMetricsCountDistribution(enum.Enum):
@@ -80,6 +81,12 @@ class BatchMetricsTimeDistribution(enum.Enum):
     BATCH_EXECUTION_TIME = "batch_execution_time"
 
 
+class SwapMetricsDistribution(enum.Enum):
+    SWAP_IN_TIME = "swap_in_time"
+    SWAP_OUT_TIME = "swap_out_time"
+    SWAP_BANDWIDTH = "swap_bandwidth"
+
+
 class RequestCompletionMetricsTimeSeries(enum.Enum):
     REQUEST_ARRIVAL = "request_arrival"
     REQUEST_COMPLETION = "request_completion"
@@ -1,4 +1,3 @@
-from collections import defaultdict
 from typing import Optional
 
 import numpy as np
@@ -12,6 +11,8 @@ logger = init_logger(__name__)
 
 
 class DataSeries:
+    _INITIAL_CAPACITY = 64
+
     def __init__(
         self,
         x_name: str,
@@ -20,8 +21,14 @@ class DataSeries:
         save_table_to_wandb: bool = True,
         save_plots: bool = True,
     ) -> None:
-        # metrics are a data series of two-dimensional (x, y) datapoints
-        self._data_series = []
+        # metrics are a data series of two-dimensional (x, y) datapoints, stored
+        # column-wise in float64 arrays that double in size when full
+        self._data_x = np.empty(self._INITIAL_CAPACITY)
+        self._data_y = np.empty(self._INITIAL_CAPACITY)
+        self._num_datapoints = 0
+        # integer columns are restored as integers when converted to a dataframe
+        self._is_x_integer = True
+        self._is_y_integer = True
         # column names of x, y datatpoints for data collection
         self._x_name = x_name
         self._y_name = y_name
@@ -37,17 +44,32 @@ class DataSeries:
     def consolidate(
         self,
     ):
-        res = defaultdict(list)
-        for x, y in self._data_series:
-            res[x].append(y)
-        self._data_series = [(x, sum(y) / len(y)) for x, y in res.items()]
+        # average the y datapoints of every distinct x, sorted by x
+        if self._num_datapoints == 0:
+            self._last_data_y = 0
+            return
+
+        data_x, inverse = np.unique(
+            self._data_x[: self._num_datapoints], return_inverse=True
+        )
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=self._data_y[: self._num_datapoints])
 
-        # sort by x
-        self._data_series = sorted(self._data_series, key=lambda x: x[0])
-        self._last_data_y = self._data_series[-1][1] if len(self._data_series) else 0
+        self._data_x = data_x
+        self._data_y = sums / counts
+        self._num_datapoints = len(data_x)
+        self._is_y_integer = False
+        self._last_data_y = self._data_y[-1].item()
 
     def __len__(self):
-        return len(self._data_series)
+        return self._num_datapoints
+
+    def __getstate__(self) -> dict:
+        # checkpoints only store the filled part of the columns
+        state = self.__dict__.copy()
+        state["_data_x"] = self._data_x[: self._num_datapoints]
+        state["_data_y"] = self._data_y[: self._num_datapoints]
+        return state
 
     @property
     def _metric_name(self) -> str:
@@ -56,7 +78,74 @@ class DataSeries:
     # add a new x, y datapoint
     def put(self, data_x: float, data_y: float) -> None:
         self._last_data_y = data_y
-        self._data_series.append((data_x, data_y))
+
+        if self._num_datapoints == len(self._data_x):
+            self._grow()
+
+        self._data_x[self._num_datapoints] = data_x
+        self._data_y[self._num_datapoints] = data_y
+        self._num_datapoints += 1
+
+        if self._is_x_integer and not isinstance(data_x, (int, np.integer)):
+            self._is_x_integer = False
+        if self._is_y_integer and not isinstance(data_y, (int, np.integer)):
+            self._is_y_integer = False
+
+    def _grow(self) -> None:
+        capacity = max(2 * len(self._data_x), self._INITIAL_CAPACITY)
+        for name in ("_data_x", "_data_y"):
+            data = np.empty(capacity)
+            data[: self._num_datapoints] = getattr(self, name)[: self._num_datapoints]
+            setattr(self, name, data)
+
+    # append the datapoints of another series, e.g. of a simulation shard
+    def extend(self, other: "DataSeries", x_offset: float = 0, start: int = 0) -> None:
+        num_datapoints = other._num_datapoints - start
+        if num_datapoints <= 0:
+            return
+
+        while self._num_datapoints + num_datapoints > len(self._data_x):
+            self._grow()
+
+        end = self._num_datapoints + num_datapoints
+        self._data_x[self._num_datapoints : end] = (
+            other._data_x[start : other._num_datapoints] + x_offset
+        )
+        self._data_y[self._num_datapoints : end] = other._data_y[
+            start : other._num_datapoints
+        ]
+        self._num_datapoints = end
+        self._is_x_integer = (
+            self._is_x_integer
+            and other._is_x_integer
+            and isinstance(x_offset, (int, np.integer))
+        )
+        self._is_y_integer = self._is_y_integer and other._is_y_integer
+        self._last_data_y = other._last_data_y
+
+    # append a series whose y datapoints are running totals (put_delta), the
+    # totals are recomputed over the datapoints of both series in x order
+    def extend_cumulative(self, other: "DataSeries", start: int = 0) -> None:
+        num_datapoints = self._num_datapoints
+        deltas = np.diff(self._data_y[:num_datapoints], prepend=0)
+        other_deltas = np.diff(other._data_y[: other._num_datapoints], prepend=0)
+
+        self.extend(other, start=start)
+        self._data_y[num_datapoints : self._num_datapoints] = other_deltas[start:]
+        self._data_y[:num_datapoints] = deltas
+        self.sort()
+        np.cumsum(
+            self._data_y[: self._num_datapoints],
+            out=self._data_y[: self._num_datapoints],
+        )
+        if self._num_datapoints:
+            self._last_data_y = self._data_y[self._num_datapoints - 1].item()
+
+    # stable sort of the datapoints by x
+    def sort(self) -> None:
+        order = np.argsort(self._data_x[: self._num_datapoints], kind="stable")
+        self._data_x[: self._num_datapoints] = self._data_x[order]
+        self._data_y[: self._num_datapoints] = self._data_y[order]
 
     # get most recently collected y datapoint
     def _peek_y(self):
@@ -64,7 +153,20 @@ class DataSeries:
 
     # convert list of x, y datapoints to a pandas dataframe
     def _to_df(self):
-        return pd.DataFrame(self._data_series, columns=[self._x_name, self._y_name])
+        if self._num_datapoints == 0:
+            return pd.DataFrame([], columns=[self._x_name, self._y_name])
+
+        # astype always copies, the dataframe never aliases the buffers
+        return pd.DataFrame(
+            {
+                self._x_name: self._data_x[: self._num_datapoints].astype(
+                    np.int64 if self._is_x_integer else np.float64
+                ),
+                self._y_name: self._data_y[: self._num_datapoints].astype(
+                    np.int64 if self._is_y_integer else np.float64
+                ),
+            }
+        )
 
     # add a new x, y datapoint as an incremental (delta) update to
     # recently collected y datapoint
@@ -76,7 +178,7 @@ class DataSeries:
     def print_series_stats(
         self, df: pd.DataFrame, plot_name: str, x_name: str = None, y_name: str = None
     ) -> None:
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
         if x_name is None:
             x_name = self._x_name
@@ -103,7 +205,7 @@ class DataSeries:
     def print_distribution_stats(
         self, df: pd.DataFrame, plot_name: str, y_name: str = None
     ) -> None:
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
 
         if y_name is None:
@@ -155,7 +257,7 @@ class DataSeries:
         y_cumsum: bool = True,
     ) -> None:
 
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
 
         if y_axis_label is None:
@@ -212,7 +314,7 @@ class DataSeries:
         self._save_df(df, path, plot_name)
 
     def plot_cdf(self, path: str, plot_name: str, y_axis_label: str = None) -> None:
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
 
         if y_axis_label is None:
@@ -256,7 +358,7 @@ class DataSeries:
         self._save_df(df, path, plot_name)
 
     def plot_histogram(self, path: str, plot_name: str) -> None:
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
 
         df = self._to_df()
@@ -295,7 +397,7 @@ class DataSeries:
             fig.write_image(f"{path}/{plot_name}.png")
 
     def plot_differential(self, path: str, plot_name: str) -> None:
-        if len(self._data_series) == 0:
+        if len(self) == 0:
             return
 
         df = self._to_df()
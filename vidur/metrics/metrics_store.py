@@ -1,5 +1,6 @@
 import os
-from functools import reduce
+from functools import reduce, wraps
+from types import MethodType
 from typing import Dict, List
 from vidur.types.replica_scheduler_type import ReplicaSchedulerType
 
@@ -19,17 +20,20 @@ from vidur.metrics.constants import (
     RequestCompletionMetricsTimeSeries,
     RequestMetricsHistogram,
     RequestMetricsTimeDistributions,
+    SwapMetricsDistribution,
     TokenCompletionMetricsTimeSeries,
     TokenMetricsTimeDistribution,
 )
 from vidur.metrics.data_series import DataSeries
 from vidur.metrics.series_average_meter import SeriesAverageMeter
+from vidur.scheduler.utils.block_allocator import BlockAllocator
 from vidur.utils.mfu_calculator import MFUCalculator
 
 logger = init_logger(__name__)
 
 
 def if_write_metrics(func):
+    @wraps(func)
     def wrapper(self, *args, **kwargs):
         if self._config.write_metrics:
             return func(self, *args, **kwargs)
@@ -37,11 +41,28 @@ def if_write_metrics(func):
     return wrapper
 
 
+def _noop(*args, **kwargs) -> None:
+    pass
+
+
+_EVENT_HANDLER_NAMES = (
+    "on_request_arrival",
+    "on_batch_end",
+    "on_replica_schedule",
+    "on_replica_stage_schedule",
+    "on_batch_stage_end",
+    "on_block_allocator_update",
+)
+
 REQUEST_ID_STR = "Request Id"
 COUNT_STR = "Count"
 TIME_STR = "Time (sec)"
 BATCH_ID_STR = "Batch Id"
 MEMORY_USAGE_STR = "Memory Usage (%)"
+FREE_BLOCKS_STR = "Free Blocks"
+LARGEST_FREE_RUN_STR = "Largest Free Block Run"
+BLOCK_ALLOCATIONS_STR = "Block Allocations"
+SWAP_BANDWIDTH_STR = "Bandwidth (GB/s)"
 BUSY_TIME_PERCENT = "Busy Time (%)"
 UTILIZATION_STR = "Utilization (%)"
 OPERATION_STR = "Operation"
@@ -84,8 +105,17 @@ class MetricsStore:
                 self._config.store_plots,
             )
 
+        # cached tokens are only recorded with prefix caching
+        self._enable_prefix_caching = (
+            self._simulation_config.cluster_config.replica_scheduler_config.enable_prefix_caching
+        )
         self._request_metrics_histogram: Dict[RequestMetricsHistogram, DataSeries] = {}
         for metric_name in RequestMetricsHistogram:
+            if (
+                metric_name == RequestMetricsHistogram.REQUEST_NUM_CACHED_TOKENS
+                and not self._enable_prefix_caching
+            ):
+                continue
             self._request_metrics_histogram[metric_name] = DataSeries(
                 REQUEST_ID_STR,
                 metric_name.value,
@@ -135,6 +165,15 @@ class MetricsStore:
                 self._config.store_plots,
             )
 
+        # KV cache swaps of the batches, with the swap preemption mode
+        self._swap_metrics_distribution: Dict[SwapMetricsDistribution, CDFSketch] = {}
+        for metric_name in SwapMetricsDistribution:
+            self._swap_metrics_distribution[metric_name] = CDFSketch(
+                metric_name.value,
+                self._config.save_table_to_wandb,
+                self._config.store_plots,
+            )
+
         # Initialise completion metrics
         self._request_completion_metrics_time_series: Dict[
             RequestCompletionMetricsTimeSeries, DataSeries
@@ -235,6 +274,33 @@ class MetricsStore:
                 )
                 self._replica_mfu[replica_idx][stage_idx].put(0, 0)
 
+        # per replica KV cache block metrics, only recorded with the block allocator
+        self._replica_free_blocks: List[DataSeries] = []
+        self._replica_largest_free_run: List[DataSeries] = []
+        self._replica_block_allocations: List[DataSeries] = []
+        if (
+            self._simulation_config.cluster_config.replica_scheduler_config.enable_block_allocator
+        ):
+            for series_list, y_name in (
+                (self._replica_free_blocks, FREE_BLOCKS_STR),
+                (self._replica_largest_free_run, LARGEST_FREE_RUN_STR),
+                (self._replica_block_allocations, BLOCK_ALLOCATIONS_STR),
+            ):
+                for _ in range(self._num_replicas):
+                    series_list.append(
+                        DataSeries(
+                            TIME_STR,
+                            y_name,
+                            self._config.subsamples,
+                            self._config.save_table_to_wandb,
+                            self._config.store_plots,
+                        )
+                    )
+
+        # copies of the result csvs and plots, kept per run: parallel sweep runs
+        # would race on a shared ./results_plot
+        self._results_plot_dir = f"{self._config.output_dir}/results_plot"
+
         self._init_wandb()
 
         # 获取 replica_scheduler_type 的值（整数值）
@@ -252,6 +318,46 @@ class MetricsStore:
         )
         self._throughput_metric.put(0, 0)  # 初始化 throughput
 
+        self._bind_event_handlers()
+
+    def __getstate__(self) -> dict:
+        # the bound handlers are rebuilt from the config when a checkpoint is loaded
+        state = self.__dict__.copy()
+        for handler_name in _EVENT_HANDLER_NAMES:
+            state.pop(handler_name, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._bind_event_handlers()
+
+    def _bind_event_handlers(self) -> None:
+        """
+        Resolves the enabled metrics once. Handlers of disabled metrics are replaced
+        with no-ops and enabled ones are bound without the if_write_metrics check,
+        so the event loop pays nothing for metrics that are turned off.
+        """
+        config = self._config
+        handlers_enabled = {
+            "on_request_arrival": config.store_request_metrics,
+            "on_batch_end": (
+                config.store_request_metrics
+                or config.store_token_completion_metrics
+                or config.store_utilization_metrics
+                or config.store_batch_metrics
+            ),
+            "on_replica_schedule": config.store_utilization_metrics,
+            "on_replica_stage_schedule": config.store_utilization_metrics,
+            "on_batch_stage_end": config.store_utilization_metrics,
+            "on_block_allocator_update": config.store_utilization_metrics,
+        }
+
+        for handler_name, is_enabled in handlers_enabled.items():
+            if config.write_metrics and is_enabled:
+                handler = getattr(MetricsStore, handler_name).__wrapped__
+                setattr(self, handler_name, MethodType(handler, self))
+            else:
+                setattr(self, handler_name, _noop)
 
     def _init_wandb(self):
         if (
@@ -399,12 +505,12 @@ class MetricsStore:
             file_name="request_metrics"+f"_{self._scheduler_name.lower()}",
         )
 
-        os.makedirs("./results_plot", exist_ok=True)
+        os.makedirs(self._results_plot_dir, exist_ok=True)
 
         self._save_as_csv(
             dataseries_list=all_request_metrics,
             key_to_join=REQUEST_ID_STR,
-            base_path="./results_plot/",
+            base_path=self._results_plot_dir,
             file_name="request_metrics"+f"_{self._scheduler_name.lower()}",
         )
 
@@ -419,13 +525,13 @@ class MetricsStore:
 
         throughput_file_name = f"throughput_{self._scheduler_name.lower()}"
 
-        os.makedirs("./results_plot", exist_ok=True)
+        os.makedirs(self._results_plot_dir, exist_ok=True)
 
         self._throughput_metric.plot_step(base_plot_path, throughput_file_name, TIME_STR,y_cumsum=False)
         self._save_as_csv([self._throughput_metric], TIME_STR, self._config.output_dir, throughput_file_name)
 
-        self._throughput_metric.plot_step("./results_plot/", throughput_file_name, TIME_STR,y_cumsum=False)
-        self._save_as_csv([self._throughput_metric], TIME_STR, "./results_plot/", throughput_file_name)
+        self._throughput_metric.plot_step(self._results_plot_dir, throughput_file_name, TIME_STR,y_cumsum=False)
+        self._save_as_csv([self._throughput_metric], TIME_STR, self._results_plot_dir, throughput_file_name)
 
     def _store_batch_metrics(self, base_plot_path: str):
         if not self._config.store_batch_metrics:
@@ -442,6 +548,17 @@ class MetricsStore:
         for dataseries in self._batch_metrics_count_distribution.values():
             dataseries.plot_cdf(base_plot_path, dataseries._metric_name+f"_{self._scheduler_name.lower()}", COUNT_STR)
 
+        for metric_name, sketch in self._swap_metrics_distribution.items():
+            sketch.plot_cdf(
+                base_plot_path,
+                metric_name.value,
+                (
+                    SWAP_BANDWIDTH_STR
+                    if metric_name == SwapMetricsDistribution.SWAP_BANDWIDTH
+                    else TIME_STR
+                ),
+            )
+
         if not self._config.keep_individual_batch_metrics:
             return
 
@@ -482,7 +599,7 @@ class MetricsStore:
 
             self._scheduler_name = ReplicaSchedulerType(self._replica_scheduler_type).name
             
-            os.makedirs("./results_plot", exist_ok=True)
+            os.makedirs(self._results_plot_dir, exist_ok=True)
 
             for dataseries in self._request_completion_metrics_time_series.values():
                 dataseries.plot_step(
@@ -491,7 +608,7 @@ class MetricsStore:
 
             for dataseries in self._request_completion_metrics_time_series.values():
                 dataseries.plot_step(
-                    "./results_plot/", f"{dataseries._y_name}_time_series"+f"_{self._scheduler_name.lower()}", COUNT_STR
+                    self._results_plot_dir, f"{dataseries._y_name}_time_series"+f"_{self._scheduler_name.lower()}", COUNT_STR
                 )
 
         if not self._config.store_token_completion_metrics:
@@ -523,6 +640,121 @@ class MetricsStore:
                     base_plot_path,
                 )
 
+        for replica_idx in range(len(self._replica_free_blocks)):
+            self._replica_free_blocks[replica_idx].plot_step(
+                base_plot_path, f"replica_{replica_idx + 1}_free_blocks", y_cumsum=False
+            )
+            self._replica_largest_free_run[replica_idx].plot_step(
+                base_plot_path,
+                f"replica_{replica_idx + 1}_largest_free_block_run",
+                y_cumsum=False,
+            )
+            # the allocations are counted cumulatively, the differential is the rate
+            self._replica_block_allocations[replica_idx].plot_differential(
+                base_plot_path, f"replica_{replica_idx + 1}_block_allocations_per_second"
+            )
+
+    def merge_shard(
+        self, shard: "MetricsStore", replica_ids: List[int], batch_id_offset: int
+    ) -> None:
+        """
+        Adds the metrics of a simulation shard that simulated `replica_ids`, see
+        ShardedSimulator. Arrival side metrics (arrival time series, request size
+        and inter arrival histograms) are recorded by this store for all requests,
+        a shard only sees its own arrivals. The batch ids of the shard are shifted
+        by `batch_id_offset` to keep them unique across shards.
+        """
+        for metric_name, dataseries in self._request_metrics_time_distributions.items():
+            dataseries.extend(shard._request_metrics_time_distributions[metric_name])
+        for metric_name in (
+            RequestMetricsHistogram.REQUEST_NUM_RESTARTS,
+            RequestMetricsHistogram.REQUEST_NUM_CACHED_TOKENS,
+        ):
+            if metric_name not in self._request_metrics_histogram:
+                continue
+            self._request_metrics_histogram[metric_name].extend(
+                shard._request_metrics_histogram[metric_name]
+            )
+
+        for metric_name, sketch in self._token_metrics_time_distribution.items():
+            sketch.merge(shard._token_metrics_time_distribution[metric_name])
+
+        for sketches, shard_sketches in (
+            (self._batch_metrics_count_distribution, shard._batch_metrics_count_distribution),
+            (self._batch_metrics_time_distribution, shard._batch_metrics_time_distribution),
+            (self._swap_metrics_distribution, shard._swap_metrics_distribution),
+            (self._operation_metrics, shard._operation_metrics),
+            (self._cpu_operation_metrics, shard._cpu_operation_metrics),
+        ):
+            for metric_name, sketch in sketches.items():
+                sketch.merge(shard_sketches[metric_name])
+
+        for per_batch, shard_per_batch in (
+            (
+                self._batch_metrics_count_distribution_per_batch,
+                shard._batch_metrics_count_distribution_per_batch,
+            ),
+            (
+                self._batch_metrics_time_distribution_per_batch,
+                shard._batch_metrics_time_distribution_per_batch,
+            ),
+            (self._operation_metrics_per_batch, shard._operation_metrics_per_batch),
+            (
+                self._cpu_operation_metrics_per_batch,
+                shard._cpu_operation_metrics_per_batch,
+            ),
+        ):
+            for metric_name, dataseries in per_batch.items():
+                dataseries.extend(shard_per_batch[metric_name], x_offset=batch_id_offset)
+
+        self._request_completion_metrics_time_series[
+            RequestCompletionMetricsTimeSeries.REQUEST_COMPLETION
+        ].extend(
+            shard._request_completion_metrics_time_series[
+                RequestCompletionMetricsTimeSeries.REQUEST_COMPLETION
+            ]
+        )
+        for metric_name, dataseries in self._token_completion_metrics_time_series.items():
+            dataseries.extend(shard._token_completion_metrics_time_series[metric_name])
+
+        # skip the (0, 0) datapoint every store starts with
+        self._throughput_metric.extend_cumulative(shard._throughput_metric, start=1)
+
+        for replica_id in replica_ids:
+            # replica metrics are indexed like in the event handlers
+            self._replica_memory_usage[replica_id - 1] = shard._replica_memory_usage[
+                replica_id - 1
+            ]
+            self._replica_busy_time[replica_id - 1] = shard._replica_busy_time[
+                replica_id - 1
+            ]
+            self._replica_mfu[replica_id - 1] = shard._replica_mfu[replica_id - 1]
+            for series_list, shard_series_list in (
+                (self._replica_free_blocks, shard._replica_free_blocks),
+                (self._replica_largest_free_run, shard._replica_largest_free_run),
+                (self._replica_block_allocations, shard._replica_block_allocations),
+            ):
+                if series_list:
+                    series_list[replica_id - 1] = shard_series_list[replica_id - 1]
+
+    def sort_merged_shards(self) -> None:
+        """
+        Sorts the merged series, the time series by time (their plots accumulate
+        in order) and the per request metrics by request id.
+        """
+        for dataseries in self._request_metrics_time_distributions.values():
+            dataseries.sort()
+        self._request_metrics_histogram[RequestMetricsHistogram.REQUEST_NUM_RESTARTS].sort()
+        if self._enable_prefix_caching:
+            self._request_metrics_histogram[
+                RequestMetricsHistogram.REQUEST_NUM_CACHED_TOKENS
+            ].sort()
+        self._request_completion_metrics_time_series[
+            RequestCompletionMetricsTimeSeries.REQUEST_COMPLETION
+        ].sort()
+        for dataseries in self._token_completion_metrics_time_series.values():
+            dataseries.sort()
+
     @if_write_metrics
     def plot(self) -> None:
         dir_plot_path = f"{self._config.output_dir}/plots"
@@ -628,6 +860,10 @@ class MetricsStore:
         self._request_metrics_histogram[
             RequestMetricsHistogram.REQUEST_NUM_RESTARTS
         ].put(request.id, request.num_restarts)
+        if self._enable_prefix_caching:
+            self._request_metrics_histogram[
+                RequestMetricsHistogram.REQUEST_NUM_CACHED_TOKENS
+            ].put(request.id, request.num_cached_tokens)
 
     def _update_per_token_execution_times(
         self, time: float, request: Request, batch: Batch
@@ -692,14 +928,16 @@ class MetricsStore:
         ) or (self._config.max_batch_index and batch.id > self._config.max_batch_index):
             return
 
-        for request in batch.completed_requests:
-            self._on_request_end(time, request)
+        if self._config.store_request_metrics:
+            for request in batch.completed_requests:
+                self._on_request_end(time, request)
 
         if self._config.store_utilization_metrics:
             self._replica_memory_usage[replica_id - 1].put(time, memory_usage_percent)
 
-        for request in batch.requests:
-            self._update_per_token_execution_times(time, request, batch)
+        if self._config.store_token_completion_metrics:
+            for request in batch.requests:
+                self._update_per_token_execution_times(time, request, batch)
 
         if not self._config.store_batch_metrics:
             return
@@ -709,6 +947,8 @@ class MetricsStore:
             batch.id,
             time - batch.scheduled_at,
         )
+        if batch.swap_time:
+            self._on_batch_swap(batch)
         self._push_metric(
             BatchMetricsCountDistribution.BATCH_NUM_TOKENS,
             batch.id,
@@ -728,6 +968,26 @@ class MetricsStore:
             BatchMetricsCountDistribution.BATCH_SIZE, batch.id, batch.size
         )
 
+    def _on_batch_swap(self, batch: Batch) -> None:
+        for num_bytes, swap_time, time_metric in (
+            (batch.swap_in_bytes, batch.swap_in_time, SwapMetricsDistribution.SWAP_IN_TIME),
+            (
+                batch.swap_out_bytes,
+                batch.swap_out_time,
+                SwapMetricsDistribution.SWAP_OUT_TIME,
+            ),
+        ):
+            if not num_bytes:
+                continue
+            self._swap_metrics_distribution[time_metric].put(swap_time)
+            self._swap_metrics_distribution[SwapMetricsDistribution.SWAP_BANDWIDTH].put(
+                num_bytes / swap_time / 1e9
+            )
+
+    def on_throughput_update(self, time: float, num_requests_in_batch: int) -> None:
+        # 累计 throughput，和其他指标的开关无关，总是记录
+        self._throughput_metric.put_delta(time, num_requests_in_batch)
+
     @if_write_metrics
     def on_replica_schedule(
         self, time: float, replica_id: int, memory_usage_percent: int
@@ -737,6 +997,19 @@ class MetricsStore:
 
         self._replica_memory_usage[replica_id - 1].put(time, memory_usage_percent)
 
+    @if_write_metrics
+    def on_block_allocator_update(
+        self, time: float, replica_id: int, block_allocator: BlockAllocator
+    ) -> None:
+        replica_idx = replica_id - 1
+        self._replica_free_blocks[replica_idx].put(time, block_allocator.num_free_blocks)
+        self._replica_largest_free_run[replica_idx].put(
+            time, block_allocator.get_largest_free_run()
+        )
+        self._replica_block_allocations[replica_idx].put(
+            time, block_allocator.num_allocations
+        )
+
     @if_write_metrics
     def on_replica_stage_schedule(
         self,
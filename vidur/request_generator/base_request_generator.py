@@ -1,6 +1,6 @@
 import json
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
 
 from vidur.config import BaseRequestGeneratorConfig
 from vidur.entities import Request
@@ -18,3 +18,13 @@ class BaseRequestGenerator(ABC):
     def generate(self) -> List[Request]:
         requests = self.generate_requests()
         return requests
+
+    def generate_iter(self) -> Iterator[Request]:
+        """
+        Yields the requests in arrival order. Generators that can produce requests
+        one at a time override this, by default the full list is generated and
+        sorted (stable, so requests arriving together keep their order).
+        """
+        requests = self.generate()
+        requests.sort(key=lambda x: x.arrived_at)
+        return iter(requests)
@@ -1,12 +1,21 @@
+import random
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from vidur.config import BaseRequestIntervalGeneratorConfig
 
 
 class BaseRequestIntervalGenerator(ABC):
 
-    def __init__(self, config: BaseRequestIntervalGeneratorConfig):
+    def __init__(
+        self,
+        config: BaseRequestIntervalGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
         self.config = config
+        # the request generator passes its own generator, so that the intervals
+        # and lengths come from one stream, separate from the simulation's
+        self.rng = rng or random.Random(config.seed)
 
     @abstractmethod
     def get_next_inter_request_time(self) -> float:
@@ -1,13 +1,21 @@
+import random
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Optional, Tuple
 
 from vidur.config import BaseRequestLengthGeneratorConfig
 
 
 class BaseRequestLengthGenerator(ABC):
 
-    def __init__(self, config: BaseRequestLengthGeneratorConfig):
+    def __init__(
+        self,
+        config: BaseRequestLengthGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
         self.config = config
+        # the request generator passes its own generator, so that the intervals
+        # and lengths come from one stream, separate from the simulation's
+        self.rng = rng or random.Random(config.seed)
 
     @abstractmethod
     def get_next_num_tokens(self) -> Tuple[float, float]:
@@ -1,5 +1,5 @@
 from vidur.request_generator.base_request_generator import BaseRequestGenerator
-from typing import List  # 新增导入
+from typing import Iterator, List  # 新增导入
 from vidur.entities import Request  # 确保 Request 类已更新，包含 prompt_type 和 current_stage
 import random
 import json
@@ -14,16 +14,18 @@ class CustomPromptGenerator(BaseRequestGenerator):
 
         # 如果 config.prompt_types 是 JSON 字符串，则解析它
         self.prompt_types = self.config.prompt_types
+        # 请求用自己的随机数生成器，不占用模拟用的全局 random (例如 random 全局调度器)
+        self.rng = random.Random(self.config.seed)
     def _generate_next_request(self, last_arrived_at: float) -> Request:
         # 选择一个 prompt 类型，例如基于到达率选择
-        prompt_type_info = random.choices(
+        prompt_type_info = self.rng.choices(
             self.prompt_types,
             weights=[pt["arrival_rate"] for pt in self.prompt_types],
             k=1
         )[0]
         
         prompt_type = prompt_type_info["type"]
-        inter_request_time = random.expovariate(sum(pt["arrival_rate"] for pt in self.prompt_types))  # 示例：指数分布
+        inter_request_time = self.rng.expovariate(sum(pt["arrival_rate"] for pt in self.prompt_types))  # 示例：指数分布
         arrived_at = last_arrived_at + inter_request_time
 
         # 创建 Request 时传递 prompt_type
@@ -31,7 +33,10 @@ class CustomPromptGenerator(BaseRequestGenerator):
             arrived_at=arrived_at,
             num_prefill_tokens=prompt_type_info["prefill"],
             num_decode_tokens=prompt_type_info["decode"],
-            prompt_type=prompt_type
+            prompt_type=prompt_type,
+            # 可选: 同一类型的请求共享前 prefix_tokens 个 prompt token (例如 system prompt)
+            prefix_id=prompt_type_info.get("prefix_id"),
+            num_prefix_tokens=prompt_type_info.get("prefix_tokens", 0),
         )
 
     def _generate_requests(self) -> List[Request]:
@@ -56,9 +61,31 @@ class CustomPromptGenerator(BaseRequestGenerator):
 
     def generate_requests(self) -> List[Request]:
         # 调用内部方法生成请求列表
+        self.rng.seed(self.config.seed)
         requests = self._generate_requests()
         # 对请求排序或根据时间截断
         requests.sort(key=lambda x: x.arrived_at)
         if self.config.duration is not None:
             requests = [r for r in requests if r.arrived_at < self.config.duration]
-        return requests
\ No newline at end of file
+        return requests
+
+    def generate_iter(self) -> Iterator[Request]:
+        # 逐个生成请求，供模拟器按到达顺序懒加载；到达间隔非负，请求天然有序
+        if self.config.duration is None and self.config.num_requests is None:
+            return
+
+        self.rng.seed(self.config.seed)
+        current_time = 0
+        num_requests = 0
+
+        while True:
+            if self.config.duration is None and num_requests == self.config.num_requests:
+                return
+
+            req = self._generate_next_request(current_time)
+            if self.config.duration is not None and req.arrived_at >= self.config.duration:
+                return
+
+            current_time = req.arrived_at
+            num_requests += 1
+            yield req
@@ -1,4 +1,5 @@
-from scipy.stats import gamma
+import random
+from typing import Optional
 
 from vidur.config import GammaRequestIntervalGeneratorConfig
 from vidur.request_generator.base_request_interval_generator import (
@@ -8,8 +9,12 @@ from vidur.request_generator.base_request_interval_generator import (
 
 class GammaRequestIntervalGenerator(BaseRequestIntervalGenerator):
 
-    def __init__(self, config: GammaRequestIntervalGeneratorConfig):
-        super().__init__(config)
+    def __init__(
+        self,
+        config: GammaRequestIntervalGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
+        super().__init__(config, rng)
 
         cv = self.config.cv
         self.qps = self.config.qps
@@ -17,4 +22,4 @@ class GammaRequestIntervalGenerator(BaseRequestIntervalGenerator):
 
     def get_next_inter_request_time(self) -> float:
         gamma_scale = 1.0 / (self.qps * self.gamma_shape)
-        return gamma.rvs(self.gamma_shape, scale=gamma_scale)
+        return self.rng.gammavariate(self.gamma_shape, gamma_scale)
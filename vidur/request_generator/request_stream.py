@@ -0,0 +1,97 @@
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from vidur.entities import Request
+
+
+class RequestStream:
+    """
+    Pulls requests lazily from a request generator iterator, `chunk_size` requests
+    at a time. The generators draw from their own random generators, not from the
+    global `random` module the simulation uses, so the requests are the same as
+    when they are generated up front and the simulation's draws (e.g. the random
+    global scheduler) are independent of the workload.
+    """
+
+    def __init__(self, requests: Iterator[Request], chunk_size: int = 1024) -> None:
+        self._requests = requests
+        self._chunk_size = max(1, chunk_size)
+        self._buffer: Deque[Request] = deque()
+        self._num_generated = 0
+        self._num_requests = 0
+        self._last_arrived_at = float("-inf")
+        self._is_exhausted = False
+
+    @property
+    def num_requests(self) -> int:
+        return self._num_requests
+
+    def _fill_buffer(self, num_requests: Optional[int] = None) -> None:
+        num_buffered = len(self._buffer)
+        self._buffer.extend(islice(self._requests, num_requests or self._chunk_size))
+
+        self._num_generated += len(self._buffer) - num_buffered
+        if len(self._buffer) == num_buffered:
+            self._is_exhausted = True
+
+    def get_state(self) -> Dict[str, Any]:
+        """Position of the stream, for simulator checkpoints."""
+        return {
+            "num_generated": self._num_generated,
+            "buffer": list(self._buffer),
+            "num_requests": self._num_requests,
+            "last_arrived_at": self._last_arrived_at,
+            "is_exhausted": self._is_exhausted,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Moves a fresh stream (over a freshly created generator) to a checkpointed
+        position. Generators cannot be pickled, so the generator is replayed up to
+        the requests it had produced, which leaves it (and its random state) where
+        the checkpointed one was; the buffered requests come from the checkpoint.
+        """
+        num_generated = state["num_generated"]
+        while self._num_generated < num_generated and not self._is_exhausted:
+            self._buffer.clear()
+            self._fill_buffer(
+                min(self._chunk_size, num_generated - self._num_generated)
+            )
+
+        if self._num_generated != num_generated:
+            raise ValueError(
+                f"Request generator produced {self._num_generated} requests, the"
+                f" checkpoint expects {num_generated}"
+            )
+
+        self._buffer = deque(state["buffer"])
+        self._num_requests = state["num_requests"]
+        self._last_arrived_at = state["last_arrived_at"]
+        self._is_exhausted = state["is_exhausted"]
+
+    def next(self) -> Optional[Tuple[int, Request]]:
+        """
+        Returns the next (arrival index, request) pair, or None once the generator
+        is exhausted.
+        """
+        if not self._buffer and not self._is_exhausted:
+            self._fill_buffer()
+
+        if not self._buffer:
+            return None
+
+        request = self._buffer.popleft()
+        # requests are injected into the event queue one at a time, an earlier
+        # arrival after a later one would be handled out of order
+        if request.arrived_at < self._last_arrived_at:
+            raise ValueError(
+                f"Request {request.id} arrives at {request.arrived_at}, before the"
+                f" previous request at {self._last_arrived_at}, request generators"
+                " must yield requests in arrival order"
+            )
+        self._last_arrived_at = request.arrived_at
+
+        arrival_index = self._num_requests
+        self._num_requests += 1
+        return arrival_index, request
@@ -1,4 +1,5 @@
-from typing import List
+import random
+from typing import Iterator, List
 
 from vidur.config import SyntheticRequestGeneratorConfig
 from vidur.entities import Request
@@ -10,7 +11,6 @@ from vidur.request_generator.request_length_generator_registry import (
     RequestLengthGeneratorRegistry,
 )
 from vidur.types import RequestIntervalGeneratorType
-from vidur.utils.random import set_seeds
 
 
 class SyntheticRequestGenerator(BaseRequestGenerator):
@@ -18,13 +18,18 @@ class SyntheticRequestGenerator(BaseRequestGenerator):
     def __init__(self, config: SyntheticRequestGeneratorConfig):
         super().__init__(config)
 
+        # the length and interval generators draw from this generator, the global
+        # `random` module is left to the simulation (e.g. the random global scheduler)
+        self.rng = random.Random(self.config.seed)
         self.request_length_generator = RequestLengthGeneratorRegistry.get(
             self.config.length_generator_config.get_type(),
             self.config.length_generator_config,
+            self.rng,
         )
         self.request_interval_generator = RequestIntervalGeneratorRegistry.get(
             self.config.interval_generator_config.get_type(),
             self.config.interval_generator_config,
+            self.rng,
         )
 
     def _generate_next_request(self, last_arrived_at: float) -> Request:
@@ -80,7 +85,7 @@ class SyntheticRequestGenerator(BaseRequestGenerator):
 
         return requests
 
-    def generate_requests(self) -> List[Request]:
+    def _check_config(self) -> None:
         assert (
             self.config.duration
             or self.config.num_requests
@@ -88,7 +93,10 @@ class SyntheticRequestGenerator(BaseRequestGenerator):
             == RequestIntervalGeneratorType.TRACE
         )
 
-        set_seeds(self.config.seed)
+    def generate_requests(self) -> List[Request]:
+        self._check_config()
+
+        self.rng.seed(self.config.seed)
 
         requests = self._generate_requests()
 
@@ -103,3 +111,42 @@ class SyntheticRequestGenerator(BaseRequestGenerator):
             ]
 
         return requests
+
+    def generate_iter(self) -> Iterator[Request]:
+        # trace intervals come from an unsorted trace and can be negative, those
+        # requests have to be generated and sorted up front
+        if (
+            self.config.interval_generator_config.get_type()
+            == RequestIntervalGeneratorType.TRACE
+        ):
+            yield from super().generate_iter()
+            return
+
+        self._check_config()
+
+        self.rng.seed(self.config.seed)
+
+        current_time = 0
+        num_requests = 0
+
+        # same order of precedence as _generate_requests, the inter-request times
+        # are non-negative so the requests come out sorted
+        while True:
+            if (
+                self.config.duration is None
+                and num_requests == self.config.num_requests
+            ):
+                return
+
+            request = self._generate_next_request(current_time)
+            if request is None:
+                return
+            if (
+                self.config.duration is not None
+                and request.arrived_at >= self.config.duration
+            ):
+                return
+
+            current_time = request.arrived_at
+            num_requests += 1
+            yield request
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Iterator, List
 
 import pandas as pd
 
@@ -13,7 +13,8 @@ logger = logging.getLogger(__name__)
 class TraceReplayRequestGenerator(BaseRequestGenerator):
     """
     Reads a trace csv file containing request arrival time, its prompt and completion token values to generate
-    inter-request times, number of tokens.
+    inter-request times, number of tokens. Optional `prefix_id` and `num_prefix_tokens` columns mark requests
+    whose first prompt tokens are shared (e.g. a system prompt), rows without a prefix id have no shared prefix.
     """
 
     def __init__(self, config: TraceRequestGeneratorConfig):
@@ -61,6 +62,25 @@ class TraceReplayRequestGenerator(BaseRequestGenerator):
             <= config.max_tokens
         )
 
+        has_prefix_ids = "prefix_id" in self.trace_df.columns
+        has_prefix_tokens = "num_prefix_tokens" in self.trace_df.columns
+        if has_prefix_ids != has_prefix_tokens:
+            raise ValueError(
+                f"Trace file {config.trace_file} must have both the prefix_id and the"
+                " num_prefix_tokens columns or neither of them"
+            )
+
+        self._has_prefixes = has_prefix_ids
+        if self._has_prefixes:
+            # the prefix is scaled with the prompt and never longer than it
+            num_prefix_tokens = (
+                self.trace_df["num_prefix_tokens"].fillna(0)
+                * config.prefill_scale_factor
+            ).astype(int)
+            self.trace_df["num_prefix_tokens"] = num_prefix_tokens.clip(
+                lower=0, upper=self.trace_df["num_prefill_tokens"]
+            )
+
         # rescale the time to change QPS
         self.trace_df["arrived_at"] = (
             self.trace_df["arrived_at"] * config.time_scale_factor
@@ -77,16 +97,32 @@ class TraceReplayRequestGenerator(BaseRequestGenerator):
             f"Prompt/decode token ratio stats\n:{pd_ratio.describe(percentiles=[0.25, 0.5, 0.75, 0.9, 0.95, 0.99])}"
         )
 
+    def _create_request(self, row: pd.Series) -> Request:
+        prefix_id = None
+        num_prefix_tokens = 0
+        if self._has_prefixes and not pd.isna(row["prefix_id"]):
+            prefix_id = int(row["prefix_id"])
+            num_prefix_tokens = int(row["num_prefix_tokens"])
+
+        return Request(
+            arrived_at=row["arrived_at"],
+            num_prefill_tokens=row["num_prefill_tokens"],
+            num_decode_tokens=row["num_decode_tokens"],
+            prefix_id=prefix_id,
+            num_prefix_tokens=num_prefix_tokens,
+        )
+
     def generate_requests(self) -> List[Request]:
         requests = []
 
         for _, row in self.trace_df.iterrows():
-            request = Request(
-                arrived_at=row["arrived_at"],
-                num_prefill_tokens=row["num_prefill_tokens"],
-                num_decode_tokens=row["num_decode_tokens"],
-            )
-
-            requests.append(request)
+            requests.append(self._create_request(row))
 
         return requests
+
+    def generate_iter(self) -> Iterator[Request]:
+        # the trace rows are not necessarily sorted, requests are created in arrival
+        # order (and numbered that way) only when they are pulled
+        trace_df = self.trace_df.sort_values("arrived_at", kind="stable")
+        for _, row in trace_df.iterrows():
+            yield self._create_request(row)
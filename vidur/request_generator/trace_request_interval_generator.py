@@ -1,4 +1,6 @@
 import logging
+import random
+from typing import Optional
 
 import pandas as pd
 
@@ -16,8 +18,12 @@ class TraceRequestIntervalGenerator(BaseRequestIntervalGenerator):
     inter-request times, number of tokens.
     """
 
-    def __init__(self, config: TraceRequestIntervalGeneratorConfig):
-        super().__init__(config)
+    def __init__(
+        self,
+        config: TraceRequestIntervalGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
+        super().__init__(config, rng)
 
         # load into a pd dataframe
         self.trace_df = pd.read_csv(config.trace_file)
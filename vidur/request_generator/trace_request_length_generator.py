@@ -1,5 +1,6 @@
 import logging
-from typing import Tuple
+import random
+from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -14,8 +15,12 @@ logger = logging.getLogger(__name__)
 
 class TraceRequestLengthGenerator(BaseRequestLengthGenerator):
 
-    def __init__(self, config: TraceRequestLengthGeneratorConfig):
-        super().__init__(config)
+    def __init__(
+        self,
+        config: TraceRequestLengthGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
+        super().__init__(config, rng)
 
         self.trace_df = pd.read_csv(config.trace_file)
 
@@ -1,5 +1,4 @@
 import math
-import random
 from typing import Tuple
 
 from vidur.request_generator.base_request_length_generator import (
@@ -10,7 +9,7 @@ from vidur.request_generator.base_request_length_generator import (
 class UniformRequestLengthGenerator(BaseRequestLengthGenerator):
 
     def get_next_num_tokens(self) -> Tuple[float, float]:
-        total_tokens = random.uniform(
+        total_tokens = self.rng.uniform(
             self.config.min_tokens,
             self.config.max_tokens,
         )
@@ -1,4 +1,5 @@
-from typing import Tuple
+import random
+from typing import Optional, Tuple
 
 from vidur.config import ZipfRequestLengthGeneratorConfig
 from vidur.request_generator.base_request_length_generator import (
@@ -9,8 +10,12 @@ from vidur.utils.zipf_generator import ZipfGenerator
 
 class ZipfRequestLengthGenerator(BaseRequestLengthGenerator):
 
-    def __init__(self, config: ZipfRequestLengthGeneratorConfig):
-        super().__init__(config)
+    def __init__(
+        self,
+        config: ZipfRequestLengthGeneratorConfig,
+        rng: Optional[random.Random] = None,
+    ):
+        super().__init__(config, rng)
 
         self.zipf_generator = ZipfGenerator(
             config.min_tokens,
@@ -1,28 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
 
 from vidur.config import SimulationConfig
-from vidur.entities import Replica, Request
-from vidur.execution_time_predictor import ExecutionTimePredictorRegistry
+from vidur.entities import Batch, Replica, Request
+from vidur.execution_time_predictor import (
+    BaseExecutionTimePredictor,
+    ExecutionTimePredictorRegistry,
+)
 from vidur.scheduler.replica_scheduler.replica_scheduler_registry import (
     ReplicaSchedulerRegistry,
 )
 
 
 class BaseGlobalScheduler(ABC):
-    def __init__(self, config: SimulationConfig, replicas: Dict[int, Replica]):
+    def __init__(
+        self,
+        config: SimulationConfig,
+        replicas: Dict[int, Replica],
+        execution_time_predictor: Optional[BaseExecutionTimePredictor] = None,
+    ):
         self._config = config
         self._replicas = replicas
 
         self._num_replicas = len(self._replicas)
 
-        execution_time_predictor = ExecutionTimePredictorRegistry.get(
-            config.execution_time_predictor_config.get_type(),
-            predictor_config=config.execution_time_predictor_config,
-            replica_config=config.cluster_config.replica_config,
-            replica_scheduler_config=config.cluster_config.replica_scheduler_config,
-            metrics_config=config.metrics_config,
-        )
+        # an already loaded predictor can be passed in and shared across simulations
+        if execution_time_predictor is None:
+            execution_time_predictor = ExecutionTimePredictorRegistry.get(
+                config.execution_time_predictor_config.get_type(),
+                predictor_config=config.execution_time_predictor_config,
+                replica_config=config.cluster_config.replica_config,
+                replica_scheduler_config=config.cluster_config.replica_scheduler_config,
+                metrics_config=config.metrics_config,
+            )
+        self._execution_time_predictor = execution_time_predictor
         self._replica_schedulers = {
             replica_id: ReplicaSchedulerRegistry.get(
                 config.cluster_config.replica_scheduler_config.get_type(),
@@ -31,17 +43,45 @@ class BaseGlobalScheduler(ABC):
                 request_generator_config=config.request_generator_config,
                 replica=replica,
                 num_stages=replica.num_pipeline_stages,
-                execution_time_predictor=execution_time_predictor,
+                execution_time_predictor=self._execution_time_predictor,
             )
             for replica_id, replica in replicas.items()
         }
-        self._request_queue = []
+        # kept in arrival order by add_request, schedulers pop from the left
+        self._request_queue: Deque[Request] = deque()
 
-    def sort_requests(self) -> None:
-        self._request_queue.sort(key=lambda request: request._arrived_at)
+    @classmethod
+    def is_stateless(cls) -> bool:
+        """
+        Whether the replica of a request only depends on the requests scheduled
+        before it and not on the state of the replicas, i.e. requests can be
+        assigned up front by calling `schedule` once per request in arrival order.
+        """
+        return False
+
+    @property
+    def execution_time_predictor(self) -> BaseExecutionTimePredictor:
+        return self._execution_time_predictor
 
     def add_request(self, request: Request) -> None:
-        self._request_queue.append(request)
+        queue = self._request_queue
+        # requests arrive in time order, an out of order request is inserted
+        # after the queued requests that arrived at the same time or before it
+        if queue and request._arrived_at < queue[-1]._arrived_at:
+            index = len(queue) - 1
+            while index > 0 and queue[index - 1]._arrived_at > request._arrived_at:
+                index -= 1
+            queue.insert(index, request)
+        else:
+            queue.append(request)
+
+    def on_replica_schedule(self, replica_id: int, batches: List[Batch]) -> None:
+        """Called after a replica scheduler formed `batches` (possibly none)."""
+        pass
+
+    def on_batch_end(self, replica_id: int, batch: Batch) -> None:
+        """Called after a replica scheduler processed the end of a batch."""
+        pass
 
     def get_replica_scheduler(self, replica_id: int):
         return self._replica_schedulers[replica_id]
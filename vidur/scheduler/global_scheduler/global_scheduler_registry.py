@@ -1,10 +1,19 @@
+from vidur.scheduler.global_scheduler.kv_aware_global_scheduler import (
+    KvAwareGlobalScheduler,
+)
 from vidur.scheduler.global_scheduler.lor_global_scheduler import LORGlobalScheduler
+from vidur.scheduler.global_scheduler.power_of_two_global_scheduler import (
+    PowerOfTwoGlobalScheduler,
+)
 from vidur.scheduler.global_scheduler.random_global_scheduler import (
     RandomGlobalScheduler,
 )
 from vidur.scheduler.global_scheduler.round_robin_global_scheduler import (
     RoundRobinGlobalScheduler,
 )
+from vidur.scheduler.global_scheduler.token_load_global_scheduler import (
+    TokenLoadGlobalScheduler,
+)
 from vidur.types import GlobalSchedulerType
 from vidur.utils.base_registry import BaseRegistry
 
@@ -20,3 +29,10 @@ GlobalSchedulerRegistry.register(
     GlobalSchedulerType.ROUND_ROBIN, RoundRobinGlobalScheduler
 )
 GlobalSchedulerRegistry.register(GlobalSchedulerType.LOR, LORGlobalScheduler)
+GlobalSchedulerRegistry.register(
+    GlobalSchedulerType.TOKEN_LOAD, TokenLoadGlobalScheduler
+)
+GlobalSchedulerRegistry.register(GlobalSchedulerType.KV_AWARE, KvAwareGlobalScheduler)
+GlobalSchedulerRegistry.register(
+    GlobalSchedulerType.POWER_OF_TWO, PowerOfTwoGlobalScheduler
+)
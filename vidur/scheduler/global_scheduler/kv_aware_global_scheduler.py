@@ -0,0 +1,45 @@
+from math import ceil
+from typing import List
+
+from vidur.entities import Batch, Request
+from vidur.scheduler.global_scheduler.lor_global_scheduler import LORGlobalScheduler
+
+
+class KvAwareGlobalScheduler(LORGlobalScheduler):
+    """
+    Routes every request to the replica with the most free KV cache blocks. The
+    blocks in use are the blocks allocated on the replica (its `_allocation_map`)
+    plus the prefill blocks of the requests sent to it that it has not admitted
+    yet (or that it restarted), so a burst of requests is spread before any of
+    them is allocated.
+    """
+
+    def _get_load_measure(self) -> str:
+        return "allocated_blocks"
+
+    def _tracks_request_loads(self) -> bool:
+        return True
+
+    def _get_replica_load(self, replica_id: int) -> int:
+        return (
+            self._replica_schedulers[replica_id].num_allocated_blocks
+            + self._tracked_loads[replica_id]
+        )
+
+    def _get_request_load(self, request: Request) -> int:
+        return ceil(request.num_prefill_tokens / self._block_size)
+
+    def on_replica_schedule(self, replica_id: int, batches: List[Batch]) -> None:
+        super().on_replica_schedule(replica_id, batches)
+
+        # requests restarted by a recompute preemption gave their blocks back and
+        # wait for the blocks of a new prefill, count them like unadmitted requests
+        for request in self._replica_schedulers[replica_id].restarted_requests:
+            self._set_request_load(
+                replica_id, request.id, self._get_request_load(request)
+            )
+
+        # admitted requests are counted in the allocated blocks from now on
+        for batch in batches:
+            for request in batch.requests:
+                self._set_request_load(replica_id, request.id, 0)
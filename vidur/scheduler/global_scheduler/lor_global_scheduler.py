@@ -1,30 +1,123 @@
-from typing import List, Tuple
+from math import ceil
+from typing import Dict, List, Set, Tuple
 
-from vidur.entities import Request
+from vidur.entities import Batch, Request
 from vidur.scheduler.global_scheduler.base_global_scheduler import BaseGlobalScheduler
+from vidur.scheduler.utils.indexed_min_heap import IndexedMinHeap
+
+TOKEN_LOAD_MEASURES = ("outstanding_tokens", "outstanding_decode_tokens")
 
 
 class LORGlobalScheduler(BaseGlobalScheduler):
     """
     Least outstanding requests (LOR) global scheduler.
+
+    Every request goes to the replica with the lowest load, ties go to the
+    lowest replica id. The loads are kept in an indexed min-heap: a replica is
+    only re-read after its scheduler ran or one of its batches ended, so a
+    dispatch costs O(log R) instead of a scan over all replicas.
+
+    The load is measured by `load_measure`: the requests waiting in the replica
+    queue, the (decode) tokens not yet processed of the requests sent to the
+    replica, or the KV cache blocks allocated on the replica. Within one schedule
+    call the load of a replica grows with every request sent to it by the amount
+    the request adds once queued (one request, its remaining tokens, the blocks
+    of its prefill).
     """
 
-    def schedule(self) -> List[Tuple[int, Request]]:
-        self.sort_requests()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
 
-        request_mapping = []
-        # keep a map of replica_id -> replica_scheduler
-        # this is used to find the replica with the least outstanding requests
-        pending_requests_map = {
-            replica_scheduler.replica_id: replica_scheduler.num_pending_requests
-            for replica_scheduler in self._replica_schedulers.values()
+        self._load_measure = self._get_load_measure()
+        self._block_size = self._config.cluster_config.replica_scheduler_config.block_size
+
+        # loads that are not read from the replica schedulers but summed up
+        # here per request: request id -> load of the request, and the totals
+        self._request_loads: Dict[int, int] = {}
+        self._tracked_loads: Dict[int, int] = {
+            replica_id: 0 for replica_id in self._replica_schedulers
         }
 
-        # using a very simple implementation here, to keep wiring simple
+        self._replica_loads = IndexedMinHeap()
+        # replicas whose load may have changed since it was last read
+        self._stale_replica_ids: Set[int] = set(self._replica_schedulers)
+
+    def _get_load_measure(self) -> str:
+        return self._config.cluster_config.global_scheduler_config.load_measure
+
+    def _tracks_request_loads(self) -> bool:
+        return self._load_measure in TOKEN_LOAD_MEASURES
+
+    def _get_remaining_tokens(self, request: Request) -> int:
+        if request.completed:
+            return 0
+        if self._load_measure == "outstanding_decode_tokens":
+            return request.num_decode_tokens - request.num_processed_decode_tokens
+        return request.total_tokens - request.num_processed_tokens
+
+    def _get_replica_load(self, replica_id: int) -> int:
+        if self._tracks_request_loads():
+            return self._tracked_loads[replica_id]
+
+        replica_scheduler = self._replica_schedulers[replica_id]
+        if self._load_measure == "allocated_blocks":
+            return replica_scheduler.num_allocated_blocks
+        return replica_scheduler.num_pending_requests
+
+    def _get_request_load(self, request: Request) -> int:
+        if self._load_measure in TOKEN_LOAD_MEASURES:
+            return self._get_remaining_tokens(request)
+        if self._load_measure == "allocated_blocks":
+            return ceil(request.num_prefill_tokens / self._block_size)
+        return 1
+
+    def _set_request_load(self, replica_id: int, request_id: int, load: int) -> None:
+        self._tracked_loads[replica_id] += load - self._request_loads.pop(request_id, 0)
+        if load:
+            self._request_loads[request_id] = load
+
+    def on_replica_schedule(self, replica_id: int, batches: List[Batch]) -> None:
+        self._stale_replica_ids.add(replica_id)
+
+    def on_batch_end(self, replica_id: int, batch: Batch) -> None:
+        self._stale_replica_ids.add(replica_id)
+
+        if self._load_measure not in TOKEN_LOAD_MEASURES:
+            return
+
+        # a restarted request is recounted the next time one of its batches ends
+        for request in batch.requests:
+            self._set_request_load(
+                replica_id, request.id, self._get_remaining_tokens(request)
+            )
+
+    def _refresh_replica_loads(self) -> None:
+        for replica_id in self._stale_replica_ids:
+            self._replica_loads.set_priority(
+                replica_id, self._get_replica_load(replica_id)
+            )
+        self._stale_replica_ids.clear()
+
+    def _select_replica(self) -> int:
+        return self._replica_loads.peek()
+
+    def schedule(self) -> List[Tuple[int, Request]]:
+        self._refresh_replica_loads()
+
+        request_mapping = []
         while self._request_queue:
-            request = self._request_queue.pop(0)
-            replica_id = min(pending_requests_map.items(), key=lambda x: x[1])[0]
-            pending_requests_map[replica_id] += 1
+            request = self._request_queue.popleft()
+            replica_id = self._select_replica()
+            request_load = self._get_request_load(request)
+
+            if self._tracks_request_loads():
+                self._set_request_load(replica_id, request.id, request_load)
+
+            self._replica_loads.set_priority(
+                replica_id, self._replica_loads.get_priority(replica_id) + request_load
+            )
+            # re-read once the replica scheduler has queued the request
+            self._stale_replica_ids.add(replica_id)
             request_mapping.append((replica_id, request))
 
         return request_mapping
@@ -0,0 +1,36 @@
+from random import randint
+
+from vidur.scheduler.global_scheduler.lor_global_scheduler import LORGlobalScheduler
+
+
+class PowerOfTwoGlobalScheduler(LORGlobalScheduler):
+    """
+    Power of two choices: every request samples two distinct replicas uniformly
+    at random and goes to the one with the lower load (`load_measure`, as in the
+    LOR scheduler), ties go to the lower replica id. Close to least loaded
+    routing, but without herding bursts of requests onto the single least
+    loaded replica.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._replica_ids = list(self._replica_schedulers)
+
+    def _select_replica(self) -> int:
+        num_replicas = len(self._replica_ids)
+        if num_replicas == 1:
+            return self._replica_ids[0]
+
+        first = randint(0, num_replicas - 1)
+        second = randint(0, num_replicas - 2)
+        if second >= first:
+            second += 1
+
+        return min(
+            self._replica_ids[first],
+            self._replica_ids[second],
+            key=lambda replica_id: (
+                self._replica_loads.get_priority(replica_id),
+                replica_id,
+            ),
+        )
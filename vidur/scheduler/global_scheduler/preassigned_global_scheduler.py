@@ -0,0 +1,24 @@
+from typing import Dict, List, Tuple
+
+from vidur.entities import Request
+from vidur.scheduler.global_scheduler.base_global_scheduler import BaseGlobalScheduler
+
+
+class PreassignedGlobalScheduler(BaseGlobalScheduler):
+    """
+    Sends every request to the replica it was assigned up front, used by the
+    shards of a sharded simulation. Not a configurable scheduler type.
+    """
+
+    def __init__(self, *args, replica_assignment: Dict[int, int], **kwargs):
+        super().__init__(*args, **kwargs)
+        # request id -> replica id
+        self._replica_assignment = replica_assignment
+
+    def schedule(self) -> List[Tuple[int, Request]]:
+        request_mapping = [
+            (self._replica_assignment[request.id], request)
+            for request in self._request_queue
+        ]
+        self._request_queue.clear()
+        return request_mapping
@@ -6,12 +6,14 @@ from vidur.scheduler.global_scheduler.base_global_scheduler import BaseGlobalSch
 
 
 class RandomGlobalScheduler(BaseGlobalScheduler):
-    def schedule(self) -> List[Tuple[int, Request]]:
-        self.sort_requests()
+    @classmethod
+    def is_stateless(cls) -> bool:
+        return True
 
+    def schedule(self) -> List[Tuple[int, Request]]:
         request_mapping = []
         while self._request_queue:
-            request = self._request_queue.pop(0)
+            request = self._request_queue.popleft()
             replica_id = randint(1, self._num_replicas) - 1
             request_mapping.append((replica_id, request))
         return request_mapping
@@ -9,12 +9,14 @@ class RoundRobinGlobalScheduler(BaseGlobalScheduler):
         super().__init__(*args, **kwargs)
         self._request_counter = 0
 
-    def schedule(self) -> List[Tuple[int, Request]]:
-        self.sort_requests()
+    @classmethod
+    def is_stateless(cls) -> bool:
+        return True
 
+    def schedule(self) -> List[Tuple[int, Request]]:
         request_mapping = []
         while self._request_queue:
-            request = self._request_queue.pop(0)
+            request = self._request_queue.popleft()
             replica_id = self._request_counter % self._num_replicas
             self._request_counter += 1
             request_mapping.append((replica_id, request))
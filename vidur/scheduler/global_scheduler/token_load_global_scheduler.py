@@ -0,0 +1,14 @@
+from vidur.scheduler.global_scheduler.lor_global_scheduler import LORGlobalScheduler
+
+
+class TokenLoadGlobalScheduler(LORGlobalScheduler):
+    """
+    Routes every request to the replica with the least predicted remaining work,
+    the decode tokens still to be generated for the requests sent to it. The
+    decode length of a request stands in for the prediction of an output length
+    predictor; unlike the number of queued requests it tells a replica that runs
+    a few long generations from one that runs many short ones.
+    """
+
+    def _get_load_measure(self) -> str:
+        return "outstanding_decode_tokens"
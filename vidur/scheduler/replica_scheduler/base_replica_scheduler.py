@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List
+from math import ceil
+from typing import Dict, List, Tuple
 
 from vidur.config import (
     BaseReplicaSchedulerConfig,
@@ -10,7 +11,10 @@ from vidur.entities import Batch, Replica, Request
 from vidur.execution_time_predictor import BaseExecutionTimePredictor
 from vidur.logger import init_logger
 from vidur.scheduler.replica_stage_scheduler import ReplicaStageScheduler
+from vidur.scheduler.utils.block_allocator import BlockAllocator
 from vidur.scheduler.utils.memory_planner import MemoryPlanner
+from vidur.scheduler.utils.prefix_cache import PrefixCache
+from vidur.scheduler.utils.request_queue import RequestQueue
 
 logger = init_logger(__name__)
 
@@ -50,10 +54,55 @@ class BaseReplicaScheduler(ABC):
             f"Obtained max batch size of {self._max_batch_size} for replica {self._replica_id}"
         )
 
-        self._request_queue = []
+        self._request_queue = RequestQueue()
         self._num_allocated_blocks = 0
         self._allocation_map = {}
 
+        # blocks of shared prefixes are allocated by the prefix cache, they are
+        # counted in _num_allocated_blocks but not in _allocation_map
+        self._prefix_cache = (
+            PrefixCache() if self._config.enable_prefix_caching else None
+        )
+        # request id -> (prefix id, number of prefix blocks) the request references
+        self._request_prefixes: Dict[int, Tuple[int, int]] = {}
+
+        # block ids of every request (and cached prefix), only tracked with the
+        # block allocator, the block counts above stay the source of truth
+        self._block_allocator = (
+            BlockAllocator(int(self._config.num_blocks))
+            if self._config.enable_block_allocator
+            else None
+        )
+        self._block_tables: Dict[int, List[int]] = {}
+        self._prefix_block_tables: Dict[int, List[int]] = {}
+
+        # swap preemption: KV cache blocks of preempted requests kept in CPU memory
+        self._execution_time_predictor = execution_time_predictor
+        self._kv_cache_block_bytes = memory_planner.get_kv_cache_memory_per_block_per_device(
+            self._config.block_size
+        )
+        self._num_swap_space_blocks = (
+            int(self._config.swap_space_gb * 1024**3 // self._kv_cache_block_bytes)
+            if self._config.preemption_mode == "swap"
+            else 0
+        )
+        self._swapped_requests = RequestQueue()
+        # request id -> number of its blocks in CPU memory
+        self._swapped_blocks: Dict[int, int] = {}
+        self._num_swapped_blocks = 0
+        # blocks moved since the last batch was scheduled, the next batch waits
+        # for the transfers
+        self._num_pending_swap_in_blocks = 0
+        self._num_pending_swap_out_blocks = 0
+
+        # per device totals of the swaps
+        self._swap_in_bytes = 0
+        self._swap_out_bytes = 0
+        self._swap_time = 0
+        # requests restarted by the last on_schedule call, they wait in the
+        # request queue to be prefilled again
+        self._restarted_requests: List[Request] = []
+
         self._replica_stage_schedulers = {
             stage_id: ReplicaStageScheduler(
                 replica.id,
@@ -68,7 +117,7 @@ class BaseReplicaScheduler(ABC):
 
     @property
     def num_pending_requests(self) -> int:
-        return len(self._request_queue)
+        return len(self._request_queue) + len(self._swapped_requests)
 
     @property
     def replica_id(self) -> int:
@@ -86,24 +135,61 @@ class BaseReplicaScheduler(ABC):
         return (
             self.num_pending_requests == 0
             and len(self._allocation_map) == 0
+            and not self._swapped_requests
             and all(
                 stage_scheduler.is_empty()
                 for stage_scheduler in self._replica_stage_schedulers.values()
             )
         )
 
+    @property
+    def prefix_cache(self) -> PrefixCache:
+        return self._prefix_cache
+
+    @property
+    def block_allocator(self) -> BlockAllocator:
+        return self._block_allocator
+
+    @property
+    def swap_in_bytes(self) -> int:
+        return self._swap_in_bytes
+
+    @property
+    def swap_out_bytes(self) -> int:
+        return self._swap_out_bytes
+
+    @property
+    def swap_time(self) -> float:
+        return self._swap_time
+
+    @property
+    def restarted_requests(self) -> List[Request]:
+        return self._restarted_requests
+
+    def get_block_table(self, request_id: int) -> List[int]:
+        """Block ids of a request, its shared prefix blocks not included."""
+        return self._block_tables[request_id]
+
     def _get_request_next_num_tokens(self, request: Request) -> int:
         assert not request.completed
 
         if request.is_prefill_complete:
             return 1
 
-        return request.num_prefill_tokens
+        num_tokens = request.num_prefill_tokens - request.num_processed_tokens
+        if request.id not in self._allocation_map:
+            num_tokens -= self._get_num_cached_prefix_tokens(request)
+        return num_tokens
 
     def add_request(self, request: Request) -> None:
         self._request_queue.append(request)
         self.num_arrival_requests += 1
 
+    def drain_pending_requests(self) -> List[Request]:
+        requests = list(self._request_queue)
+        self._request_queue.clear()
+        return requests
+
     def get_replica_stage_scheduler(self, stage_id: int):
         return self._replica_stage_schedulers[stage_id]
 
@@ -119,16 +205,185 @@ class BaseReplicaScheduler(ABC):
 
         assert self._num_allocated_blocks <= self._config.num_blocks
 
+        if self._prefix_cache is not None:
+            # unreferenced prefix blocks only live in the free blocks
+            for prefix_id in self._prefix_cache.evict(
+                self._config.num_blocks - self._num_allocated_blocks
+            ):
+                if self._block_allocator is not None:
+                    self._block_allocator.free(self._prefix_block_tables.pop(prefix_id))
+
+        if self._block_allocator is not None:
+            self._block_tables.setdefault(request_id, []).extend(
+                self._block_allocator.allocate(num_blocks)
+            )
+
+    def _get_num_prefix_blocks(self, request: Request) -> int:
+        if self._prefix_cache is None or request.prefix_id is None:
+            return 0
+        # only full blocks are shared, and the last prompt token is always
+        # computed to get the logits of the first decode token
+        num_prefix_tokens = min(
+            request.num_prefix_tokens, request.num_prefill_tokens - 1
+        )
+        return num_prefix_tokens // self._config.block_size
+
+    def _get_num_cached_prefix_tokens(self, request: Request) -> int:
+        num_prefix_blocks = self._get_num_prefix_blocks(request)
+        if not num_prefix_blocks:
+            return 0
+        return (
+            self._prefix_cache.get_num_cached_blocks(request.prefix_id, num_prefix_blocks)
+            * self._config.block_size
+        )
+
+    def get_num_prefill_blocks(self, request: Request) -> int:
+        """Blocks that `allocate_prefill` allocates for a new request."""
+        num_blocks = ceil(request.num_prefill_tokens / self._config.block_size)
+        num_prefix_blocks = self._get_num_prefix_blocks(request)
+        if not num_prefix_blocks:
+            return num_blocks
+
+        return (
+            num_blocks
+            - num_prefix_blocks
+            + self._prefix_cache.get_num_new_blocks(request.prefix_id, num_prefix_blocks)
+        )
+
+    def allocate_prefill(self, request: Request) -> None:
+        """
+        Allocates the blocks for the prompt of a new request. With prefix caching
+        the blocks of its prefix are shared with the other requests with the same
+        prefix id, and the cached prefix tokens are marked as processed.
+        """
+        num_blocks = ceil(request.num_prefill_tokens / self._config.block_size)
+        num_prefix_blocks = self._get_num_prefix_blocks(request)
+
+        num_added_prefix_blocks = 0
+
+        if num_prefix_blocks:
+            num_added_prefix_blocks = max(
+                num_prefix_blocks - self._prefix_cache.get_num_blocks(request.prefix_id),
+                0,
+            )
+            self._num_allocated_blocks += self._prefix_cache.get_num_new_blocks(
+                request.prefix_id, num_prefix_blocks
+            )
+            num_cached_blocks = self._prefix_cache.acquire(
+                request.prefix_id, num_prefix_blocks
+            )
+            self._request_prefixes[request.id] = (request.prefix_id, num_prefix_blocks)
+            if num_cached_blocks:
+                request.on_prefix_cache_hit(num_cached_blocks * self._config.block_size)
+
+        self.allocate(request.id, num_blocks - num_prefix_blocks)
+
+        # after allocate, which evicts the prefixes the new blocks displace
+        if self._block_allocator is not None and num_added_prefix_blocks:
+            self._prefix_block_tables.setdefault(request.prefix_id, []).extend(
+                self._block_allocator.allocate(num_added_prefix_blocks)
+            )
+
+    def _mark_prefixes_computed(self, batch: Batch) -> None:
+        if not self._request_prefixes:
+            return
+
+        for request in batch.requests:
+            if request.id not in self._request_prefixes:
+                continue
+            prefix_id, num_prefix_blocks = self._request_prefixes[request.id]
+            self._prefix_cache.mark_computed(
+                prefix_id,
+                min(
+                    request.num_processed_tokens // self._config.block_size,
+                    num_prefix_blocks,
+                ),
+            )
+
+    def get_num_reserved_tokens(self, request_id: int) -> int:
+        """Tokens that fit in the blocks of a request, its prefix blocks included."""
+        num_blocks = self._allocation_map[request_id]
+        if self._request_prefixes and request_id in self._request_prefixes:
+            num_blocks += self._request_prefixes[request_id][1]
+        return num_blocks * self._config.block_size
+
     def free(self, *request_ids: List[int]) -> None:
         for request_id in request_ids:
             num_blocks = self._allocation_map.pop(request_id)
             self._num_allocated_blocks -= num_blocks
 
+            if self._block_allocator is not None:
+                self._block_allocator.free(self._block_tables.pop(request_id))
+
+            if self._prefix_cache is not None and request_id in self._request_prefixes:
+                prefix_id, _ = self._request_prefixes.pop(request_id)
+                self._num_allocated_blocks -= self._prefix_cache.release(prefix_id)
+
         assert self._num_allocated_blocks >= 0
 
     def free_batch(self, batch: Batch) -> None:
         self.free(*batch.request_ids)
 
+    def is_swapped(self, request_id: int) -> bool:
+        return request_id in self._swapped_blocks
+
+    def get_num_swapped_blocks(self, request_id: int) -> int:
+        return self._swapped_blocks[request_id]
+
+    def _can_swap_out(self, request: Request) -> bool:
+        num_blocks = self.get_num_reserved_tokens(request.id) // self._config.block_size
+        return self._num_swapped_blocks + num_blocks <= self._num_swap_space_blocks
+
+    def swap_out(self, request: Request) -> None:
+        """
+        Moves all blocks of a request to CPU memory, its shared prefix blocks
+        included, and queues it to be swapped back in.
+        """
+        num_blocks = self.get_num_reserved_tokens(request.id) // self._config.block_size
+        self.free(request.id)
+
+        self._swapped_blocks[request.id] = num_blocks
+        self._num_swapped_blocks += num_blocks
+        self._num_pending_swap_out_blocks += num_blocks
+        self._swapped_requests.append(request)
+
+    def swap_in(self, request: Request) -> None:
+        # the prefix blocks come back as blocks of the request
+        num_blocks = self._swapped_blocks.pop(request.id)
+        self._num_swapped_blocks -= num_blocks
+        self._num_pending_swap_in_blocks += num_blocks
+        self.allocate(request.id, num_blocks)
+
+    def preempt(self, request: Request) -> None:
+        """
+        Swaps out a request that has to give up its blocks if the swap space
+        has room for them, otherwise it is restarted and prefilled again.
+        """
+        if self._can_swap_out(request):
+            self.swap_out(request)
+            return
+
+        request.restart()
+        self.free(request.id)
+        self._request_queue.appendleft(request)
+        self._restarted_requests.append(request)
+
+    def _set_batch_swaps(self, batch: Batch) -> None:
+        swap_in_bytes = self._num_pending_swap_in_blocks * self._kv_cache_block_bytes
+        swap_out_bytes = self._num_pending_swap_out_blocks * self._kv_cache_block_bytes
+        batch.set_swaps(
+            swap_in_bytes,
+            self._execution_time_predictor.get_swap_time(swap_in_bytes),
+            swap_out_bytes,
+            self._execution_time_predictor.get_swap_time(swap_out_bytes),
+        )
+
+        self._swap_in_bytes += swap_in_bytes
+        self._swap_out_bytes += swap_out_bytes
+        self._swap_time += batch.swap_time
+        self._num_pending_swap_in_blocks = 0
+        self._num_pending_swap_out_blocks = 0
+
     @abstractmethod
     def on_batch_end(self, batch: Batch) -> None:
         pass
@@ -138,11 +393,14 @@ class BaseReplicaScheduler(ABC):
         pass
 
     def on_schedule(self) -> List[Batch]:
+        self._restarted_requests = []
         scheduled_batches = []
         while self._num_running_batches < self._num_stages:
             batch = self._get_next_batch()
             if not batch:
                 break
+            if self._num_pending_swap_in_blocks or self._num_pending_swap_out_blocks:
+                self._set_batch_swaps(batch)
             scheduled_batches.append(batch)
             self._num_running_batches += 1
         return scheduled_batches
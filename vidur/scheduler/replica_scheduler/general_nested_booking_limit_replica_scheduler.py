@@ -1,5 +1,6 @@
+from collections import deque
 from math import ceil
-from typing import List, Dict, Tuple
+from typing import Deque, List, Dict, Tuple
 from vidur.entities.batch import Batch, Request
 from vidur.scheduler.replica_scheduler.base_replica_scheduler import BaseReplicaScheduler
 
@@ -36,9 +37,50 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         # 1. nested_booking_limits: 一个字典 mapping 全局 stage index -> 每个 stage 的 limit
         # 2. segments: 一个列表，每个元素记录该 segment 的起始、结束 stage 及每个 stage 的 limit（便于后续判断启动条件）
         self.nested_booking_limits, self.segments = self.calculate_nested_booking_limits()
-    
+
+        # 按 stage 维护的等待队列索引: stage -> deque, 队内顺序即请求进入等待队列的顺序,
+        # 与原先每次遍历 _request_queue 分组得到的顺序一致
+        self._stage_queues: Dict[int, Deque[Request]] = {}
+        self._num_queued_requests = 0
+        # 每个 segment 中处于 (start, end] 阶段的等待请求数, 即该 segment 已被占用的 limit
+        self._segment_occupancy: List[int] = [0] * len(self.segments)
+        self._stage_to_segment: Dict[int, int] = {
+            stage: seg_idx
+            for seg_idx, seg in enumerate(self.segments)
+            for stage in range(seg["start"] + 1, seg["end"] + 1)
+        }
+
+    @property
+    def num_pending_requests(self) -> int:
+        return self._num_queued_requests
+
+    def _enqueue_request(self, request: Request) -> None:
+        stage = request.current_stage
+        if stage not in self._stage_queues:
+            self._stage_queues[stage] = deque()
+        self._stage_queues[stage].append(request)
+        self._num_queued_requests += 1
+        seg_idx = self._stage_to_segment.get(stage)
+        if seg_idx is not None:
+            self._segment_occupancy[seg_idx] += 1
+
+    def _dequeue_request(self, stage: int) -> Request:
+        request = self._stage_queues[stage].popleft()
+        self._num_queued_requests -= 1
+        seg_idx = self._stage_to_segment.get(stage)
+        if seg_idx is not None:
+            self._segment_occupancy[seg_idx] -= 1
+        return request
+
+    def drain_pending_requests(self) -> List[Request]:
+        requests = [req for queue in self._stage_queues.values() for req in queue]
+        self._stage_queues.clear()
+        self._num_queued_requests = 0
+        self._segment_occupancy = [0] * len(self.segments)
+        return requests
+
     def add_request(self, request: Request) -> None:
-        self._request_queue.append(request)
+        self._enqueue_request(request)
         self.num_arrival_requests += 1
 
         #prompt_type = request.prompt_type  # 假设 request 具有 prompt_type 属性
@@ -50,7 +92,7 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         if self.num_arrival_requests == self.total_num_requests:
             self.all_requests_arrived = True
             print(f"计划到达个数:{self.total_num_requests}=已到达个数:{self.num_arrival_requests}")
-            print("当最后一个request到达时, scheduler里面还剩下的request的数目是:", len(self._request_queue))
+            print("当最后一个request到达时, scheduler里面还剩下的request的数目是:", self.num_pending_requests)
 
             # total_throughput = 0
             # for prompt_type, count in self.request_count_per_type.items():
@@ -166,18 +208,11 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
             (2) 如果所有 segment 的起始阶段都不满足预设条件, 则执行强制清空队列的逻辑
                 打印相关信息, 释放已分配资源, 并清空 _request_queue, 最后返回 None
         """
-        # 将上次未完成的（preempted）请求重新归入队列
+        # 将上次未完成的（preempted）请求重新归入队列, 按其 current_stage 放入对应的 stage 队列
         for req in self._preempted_requests:
-            if req not in self._request_queue:
-                self._request_queue.append(req)
+            self._enqueue_request(req)
         self._preempted_requests.clear()
 
-        # 按请求的 current_stage 将请求分组
-        grouped_requests: Dict[int, List[Request]] = {}
-        for req in self._request_queue:
-            stage = getattr(req, 'current_stage', 0)
-            grouped_requests.setdefault(stage, []).append(req)
-
         selected_requests: List[Request] = []
         selected_num_tokens: List[int] = []
 
@@ -187,14 +222,12 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         # required 是第一个限制, 是之前严格的booking limit限制
         required = self.nested_booking_limits.get(firts_seg_start, 0)
         # occupied 是当前在这个segment但不在初始位置的请求的数目, 也是已经被占用的limit
-        occupied = sum(1 for req in self._request_queue 
-                   if getattr(req, 'current_stage', 0) > first_segment["start"]
-                   and getattr(req, 'current_stage', 0)<= first_segment["end"])
+        occupied = self._segment_occupancy[0]
         # limit_for_this_segment 是这个segment的limit 
         limit_for_this_segment = first_segment["seg_total_limit"]
         # remain 是剩余的limit 
         remain = limit_for_this_segment - occupied
-        stage_0_num = len(grouped_requests.get(firts_seg_start, []))
+        stage_0_num = len(self._stage_queues.get(firts_seg_start, ()))
         #print(f"\nlimit_for_first_segment={limit_for_this_segment},  occupied={occupied},  remain={remain},  required_limit={required},  stage_0_num={stage_0_num}")
 
         #
@@ -210,20 +243,17 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
             # 原有逻辑：依次检查各个 segment，要求前一个 segment 必须满足条件才能启动后续 segment
             # 现在修改成了: 要么所有请求还没有到达, 要么已经全部到达但是第一个segment满足了
             seg_num = 0
-            for seg in self.segments:
+            for seg_idx, seg in enumerate(self.segments):
                 seg_num += 1
                 seg_start = seg["start"]
                 required = self.nested_booking_limits.get(seg_start, 0)
-                occupied = sum(1 for req in self._request_queue 
-                    if getattr(req, 'current_stage', 0) > seg["start"]
-                    and getattr(req, 'current_stage', 0) <= seg["end"])
+                # 已被选中的请求在出队时已从计数中扣除, 与原先扫描剩余队列的结果一致
+                occupied = self._segment_occupancy[seg_idx]
                 limit_for_this_segment = seg["seg_total_limit"]
                 # print(limit_for_this_segment)
                 remain = limit_for_this_segment - occupied
-                # print(f"start={seg_start}, end={seg["end"]}, required={required}, occupied={occupied}, remain={remain}, limit_for_this_segment={limit_for_this_segment}, start_num={len(grouped_requests.get(seg_start, []))}")
-                # if seg == self.segments[-1] and len(grouped_requests.get(seg_start, [])) >= min(required, remain):
-                #     print(f"一共启动了{seg_num}个segment")
-                if len(grouped_requests.get(seg_start, [])) < min(required, remain):
+                # print(f"start={seg_start}, end={seg["end"]}, required={required}, occupied={occupied}, remain={remain}, limit_for_this_segment={limit_for_this_segment}, start_num={len(self._stage_queues.get(seg_start, ()))}")
+                if len(self._stage_queues.get(seg_start, ())) < min(required, remain):
                     # 如果该 segment 的起始阶段请求数不够，则不启动后续 segment
                     #print(f"一共启动了{seg_num-1}个segment")
                     break
@@ -237,56 +267,26 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                         limit = min(remain, required)
                     else:
                         limit = self.nested_booking_limits.get(stage, 0)
-                    #if stage == 0:
-                    #    limit -= int(limit*0.4)
-                        #print("CAUTION! STAGE 0!!!")
                     #print(f"stage={stage}, limit={limit}, allocated_blocks = {self._config.num_blocks -  self.num_allocated_blocks}")
-                    group = grouped_requests.get(stage, [])
-                    for _ in range(limit):
-                        if not group:
-                            break
-                        req = group.pop(0)
-                        if req in self._request_queue:
-                            self._request_queue.remove(req)
+                    group = self._stage_queues.get(stage)
+                    if not group:
+                        continue
+                    # 被选中的请求推进到下一 stage 后不再留在等待队列中,
+                    # 直到 on_batch_end 之后才按新的 stage 重新入队, 因此同一批次内不会被重复选中
+                    for _ in range(min(limit, len(group))):
+                        req = self._dequeue_request(stage)
                         self._allocate_request(req)
                         req.advance_stage()
                         selected_requests.append(req)
                         next_num = self._get_request_next_num_tokens(req)
                         selected_num_tokens.append(next_num)
         else: 
-            # # 新逻辑：所有请求已到达
-            # found_segment = False  # 标记是否有至少一个 segment 的起始阶段满足 booking limit
-            # for seg in self.segments:
-            #     seg_start = seg["start"]
-            #     required = self.nested_booking_limits.get(seg_start, 0)
-            #     if len(grouped_requests.get(seg_start, [])) >= required:
-            #         # 如果该 segment 的起始阶段满足预设条件，则进行调度
-            #         found_segment = True
-            #         for stage in range(seg["start"], seg["end"] + 1):
-            #             limit = self.nested_booking_limits.get(stage, 0)
-            #             group = grouped_requests.get(stage, [])
-            #             for _ in range(limit):
-            #                 if not group:
-            #                     break
-            #                 req = group.pop(0)
-            #                 if req in self._request_queue:
-            #                     self._request_queue.remove(req)
-            #                 self._allocate_request(req)
-            #                 req.advance_stage()
-            #                 selected_requests.append(req)
-            #                 next_num = self._get_request_next_num_tokens(req)
-            #                 selected_num_tokens.append(next_num)
-            #     # 对于不满足条件的 segment，不进行处理break
-
-            # if not found_segment:
-            #     # 如果所有 segment 的起始阶段都不满足 booking limit，则执行强制清空队列逻辑
                 print("所有请求已到达, 但是第一个segment不够, 所以都不能运行了 ,强制清除队列")
-                print("此时scheduler里面还剩下的request的数目是:", len(self._request_queue))
-                for req in self._request_queue:
+                print("此时scheduler里面还剩下的request的数目是:", self.num_pending_requests)
+                for req in self.drain_pending_requests():
                     if req.id in self._allocation_map:
                         self.free(req.id)
-                self._request_queue.clear()
-                print("已经强制清空, 此时scheduler里面还剩下的request的数目是:", len(self._request_queue))
+                print("已经强制清空, 此时scheduler里面还剩下的request的数目是:", self.num_pending_requests)
                 return None
 
         if selected_requests:
@@ -310,7 +310,7 @@ class GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         """
         判断队列和 preempted 请求是否均为空。
         """
-        return not self._request_queue and not self._preempted_requests
+        return not self._num_queued_requests and not self._preempted_requests
 
 
     # def _get_next_batch(self) -> Batch:
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Tuple
 
 import numpy as np
 
@@ -6,13 +6,14 @@ from vidur.entities.batch import Batch, Request
 from vidur.scheduler.replica_scheduler.base_replica_scheduler import (
     BaseReplicaScheduler,
 )
+from vidur.scheduler.utils.request_queue import RequestQueue
 
 
 class LightLLMReplicaScheduler(BaseReplicaScheduler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self._preempted_requests: List[Request] = []
+        self._preempted_requests = RequestQueue()
         self._num_running_batches = 0
         self._max_micro_batch_size = self._config.batch_size_cap // self._num_stages
         assert (
@@ -80,7 +81,7 @@ class LightLLMReplicaScheduler(BaseReplicaScheduler):
         ]
 
         while self._request_queue:
-            request = self._request_queue[0]
+            request = self._request_queue.peek()
 
             next_num_tokens = self._get_request_next_num_tokens(request)
 
@@ -96,7 +97,7 @@ class LightLLMReplicaScheduler(BaseReplicaScheduler):
             if not self._can_allocate_request(request):
                 break
 
-            request = self._request_queue.pop(0)
+            request = self._request_queue.popleft()
 
             self._allocate_request(request)
             requests.append(request)
@@ -116,7 +117,7 @@ class LightLLMReplicaScheduler(BaseReplicaScheduler):
         while self._preempted_requests:
             assert len(requests) < self._max_micro_batch_size
 
-            request = self._preempted_requests.pop(0)
+            request = self._preempted_requests.popleft()
 
             assert self.can_allocate(1)
             self._allocate_request(request)
@@ -1,11 +1,12 @@
 from math import ceil
 from typing import List, Set, Tuple, Dict
 from math import ceil
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Sequence, Tuple, Set
 from vidur.entities.batch import Batch, Request
 from vidur.scheduler.replica_scheduler.base_replica_scheduler import (
     BaseReplicaScheduler,
 )
+from vidur.scheduler.utils.request_table import RequestTable
 
 class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
     def __init__(self, *args, **kwargs):
@@ -28,6 +29,8 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
             print("会在最后强制清空队列")
         self.all_requests_arrived = False
         self.num_arrival_requests = 0 # 记录到达的请求数
+        # 可选: 用 NumPy 列存储排队请求的字段, 分组和计数走向量化操作
+        self._request_table = RequestTable() if self._config.use_request_table else None
 
         # 假设在此处初始化 prompt_types 信息，包括 type 和 arrival_rate 等
         # 示例数据，实际应从配置或其他地方获取
@@ -48,6 +51,8 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
 
     def add_request(self, request: Request) -> None:
         self._request_queue.append(request)
+        if self._request_table is not None:
+            self._request_table.enqueue(request)
         self.num_arrival_requests += 1
 
         prompt_type = request.prompt_type  # 假设 request 具有 prompt_type 属性
@@ -76,6 +81,8 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         for request in batch.requests:
             if request.completed:
                 self.free(request.id)
+                if self._request_table is not None:
+                    self._request_table.remove(request.id)
             else:
                 self._preempted_requests.append(request)
 
@@ -138,24 +145,46 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         # 这里得到的是每个type分到的total_limit
         return booking_limits_per_type
 
+    def drain_pending_requests(self) -> List[Request]:
+        requests = super().drain_pending_requests()
+        if self._request_table is not None:
+            for req in requests:
+                self._request_table.remove(req.id)
+        return requests
+
+    def _group_requests(self) -> Dict[Tuple[str, int], Sequence[Request]]:
+        if self._request_table is not None:
+            return self._request_table.group_queued_by_prompt_type_and_stage()
+
+        grouped_requests: Dict[Tuple[str, int], List[Request]] = {}
+        for req in self._request_queue:
+            key = (getattr(req, 'prompt_type', 'default'), getattr(req, 'current_stage', 0))
+            grouped_requests.setdefault(key, []).append(req)
+        return grouped_requests
+
     def _get_next_batch(self) -> Batch:
         # 先把上次未完成的请求重新加入主队列
         for req in self._preempted_requests:
-            if req not in self._request_queue:
+            if req.id not in self._request_queue:
                 self._request_queue.append(req)
+                if self._request_table is not None:
+                    self._request_table.enqueue(req)
         self._preempted_requests.clear()
 
         # 1. 将请求按 (prompt_type, current_stage) 分组
-        grouped_requests: Dict[Tuple[str, int], List[Request]] = {}
-        for req in self._request_queue:
-            key = (getattr(req, 'prompt_type', 'default'), getattr(req, 'current_stage', 0))
-            grouped_requests.setdefault(key, []).append(req)
+        grouped_requests = self._group_requests()
 
         # 2. 为每种类型、每个阶段分配 booking limit，以及 needed_2
         prompt_stage_count = {pt["type"]: pt["decode"] + 1 for pt in self.prompt_types} # 为每种类型、每个阶段分配 booking limit
         booking_limit: Dict[Tuple[str, int], int] = {} # 存储每个 ptype 的 needed_1
         total_available_limits: Dict[str, int] = {}  # 存储每个 ptype 的 needed_2
 
+        # 每个 ptype 中 stage > 0 的排队请求数, 直接从分组结果累加, 不再逐个 type 扫描队列
+        occupied_per_type: Dict[str, int] = {}
+        for (ptype, stage), group in grouped_requests.items():
+            if stage > 0:
+                occupied_per_type[ptype] = occupied_per_type.get(ptype, 0) + len(group)
+
         # 计算 booking_limit 和 needed_2
         for ptype, limit in self.booking_limits_per_type.items():
             # ptype是type的名称， limit是这个type的总的limit
@@ -166,9 +195,7 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                 # 实际上每个stage的limit是一样的
             # 计算 needed_2
             # 总 limit - 被占用的 stage > 0 的请求数目
-            occupied = sum(1 for req in self._request_queue 
-                   if getattr(req, 'prompt_type', 'default') == ptype 
-                   and getattr(req, 'current_stage', 0) > 0)
+            occupied = occupied_per_type.get(ptype, 0)
             needed_2 = int(limit - occupied)
             total_available_limits[ptype] = needed_2  # 保存 needed_2
 
@@ -207,6 +234,8 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                 for req in self._request_queue:
                     if req.id in self._allocation_map:
                         self.free(req.id)
+                    if self._request_table is not None:
+                        self._request_table.remove(req.id)
                 self._request_queue.clear()
                 print("已经强制清空, 此时scheduler里面还剩下的request的数目是:", len(self._request_queue))
                 return None
@@ -229,12 +258,11 @@ class ModifiedBookingLimitReplicaScheduler(BaseReplicaScheduler):
             else:
                 limit = len(group)
 
-            for _ in range(limit):
-                if not group:
-                    break
-                req = group.pop(0)
-                if req in self._request_queue:
-                    self._request_queue.remove(req)
+            for req in group[:max(limit, 0)]:
+                if req.id in self._request_queue:
+                    self._request_queue.remove(req.id)
+                    if self._request_table is not None:
+                        self._request_table.dequeue(req.id)
                 self._allocate_request(req)
                 # 推进请求阶段
                 req.advance_stage()
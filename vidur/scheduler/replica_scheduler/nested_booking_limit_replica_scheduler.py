@@ -133,7 +133,7 @@ class NestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
         """
         # 先将上次未完成的请求归回队列
         for req in self._preempted_requests:
-            if req not in self._request_queue:
+            if req.id not in self._request_queue:
                 self._request_queue.append(req)
         self._preempted_requests.clear()
         
@@ -222,8 +222,8 @@ class NestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                     if len(forced_selected_requests) > total_limit:
                         break
                     # 如果请求还在队列中，则移除它
-                    if req in self._request_queue:
-                        self._request_queue.remove(req)
+                    if req.id in self._request_queue:
+                        self._request_queue.remove(req.id)
                     self._allocate_request(req)
                     req.advance_stage()
                     print(f"Force-scheduled request {req.id} to stage {req.current_stage}")
@@ -278,8 +278,8 @@ class NestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                 if not group:
                     break
                 req = group.pop(0)
-                if req in self._request_queue:
-                    self._request_queue.remove(req)
+                if req.id in self._request_queue:
+                    self._request_queue.remove(req.id)
                 self._allocate_request(req)
                 req.advance_stage()
                 selected_requests.append(req)
@@ -296,8 +296,8 @@ class NestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                     if not group:
                         break
                     req = group.pop(0)
-                    if req in self._request_queue:
-                        self._request_queue.remove(req)
+                    if req.id in self._request_queue:
+                        self._request_queue.remove(req.id)
                     self._allocate_request(req)
                     req.advance_stage()
                     selected_requests.append(req)
@@ -318,8 +318,8 @@ class NestedBookingLimitReplicaScheduler(BaseReplicaScheduler):
                     if not group:
                         break
                     req = group.pop(0)
-                    if req in self._request_queue:
-                        self._request_queue.remove(req)
+                    if req.id in self._request_queue:
+                        self._request_queue.remove(req.id)
                     self._allocate_request(req)
                     req.advance_stage()
                     selected_requests.append(req)
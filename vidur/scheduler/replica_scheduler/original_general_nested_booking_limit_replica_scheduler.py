@@ -150,7 +150,7 @@ class Original_GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaSchedule
         """
         # 将上次未完成的（preempted）请求重新归入队列
         for req in self._preempted_requests:
-            if req not in self._request_queue:
+            if req.id not in self._request_queue:
                 self._request_queue.append(req)
         self._preempted_requests.clear()
 
@@ -181,8 +181,8 @@ class Original_GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaSchedule
                         if not group:
                             break
                         req = group.pop(0)
-                        if req in self._request_queue:
-                            self._request_queue.remove(req)
+                        if req.id in self._request_queue:
+                            self._request_queue.remove(req.id)
                         self._allocate_request(req)
                         req.advance_stage()
                         selected_requests.append(req)
@@ -204,8 +204,8 @@ class Original_GeneralizedNestedBookingLimitReplicaScheduler(BaseReplicaSchedule
                             if not group:
                                 break
                             req = group.pop(0)
-                            if req in self._request_queue:
-                                self._request_queue.remove(req)
+                            if req.id in self._request_queue:
+                                self._request_queue.remove(req.id)
                             self._allocate_request(req)
                             req.advance_stage()
                             selected_requests.append(req)
@@ -1,9 +1,8 @@
-from math import ceil
-
 from vidur.entities.batch import Batch, Request
 from vidur.scheduler.replica_scheduler.base_replica_scheduler import (
     BaseReplicaScheduler,
 )
+from vidur.scheduler.utils.request_queue import RequestQueue
 
 
 class SarathiReplicaScheduler(BaseReplicaScheduler):
@@ -12,7 +11,7 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
 
         # sarathi config
         self._num_running_batches = 0
-        self._preempted_requests = []
+        self._preempted_requests = RequestQueue()
         # For vLLM and its derivatives, we only need to set a loose max batch size
         # Memory requirements are handled explicitly by the scheduler
         self._max_micro_batch_size = self._config.batch_size_cap // self._num_stages
@@ -21,11 +20,19 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
         )
 
     def _can_allocate_request(self, request: Request) -> bool:
+        if self.is_swapped(request.id):
+            # the swapped out blocks and a block for the next token
+            num_required_blocks = self.get_num_swapped_blocks(request.id) + 1
+            return (
+                self._config.num_blocks
+                - self._num_allocated_blocks
+                - num_required_blocks
+                >= self._watermark_blocks
+            )
+
         if request.id not in self._allocation_map:
             # new request
-            num_required_blocks = ceil(
-                request.num_prefill_tokens / self._config.block_size
-            )
+            num_required_blocks = self.get_num_prefill_blocks(request)
             return (
                 self._config.num_blocks
                 - self._num_allocated_blocks
@@ -37,15 +44,15 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
         return self._config.num_blocks - self._num_allocated_blocks >= 1
 
     def _allocate_request(self, request: Request) -> None:
+        if self.is_swapped(request.id):
+            self.swap_in(request)
+
         if request.id not in self._allocation_map:
             # new request
-            num_required_blocks = ceil(
-                request.num_prefill_tokens / self._config.block_size
-            )
-            self.allocate(request.id, num_required_blocks)
+            self.allocate_prefill(request)
             return
 
-        num_tokens_reserved = self._allocation_map[request.id] * self._config.block_size
+        num_tokens_reserved = self.get_num_reserved_tokens(request.id)
         num_tokens_required = max(0, request.num_processed_tokens - num_tokens_reserved)
 
         assert (
@@ -59,6 +66,7 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
 
     def on_batch_end(self, batch: Batch) -> None:
         self._num_running_batches -= 1
+        self._mark_prefixes_computed(batch)
 
         for request in batch.requests:
             if request.completed:
@@ -74,8 +82,12 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
         if request.is_prefill_complete:
             return 1
 
+        num_remaining_tokens = request.num_prefill_tokens - request.num_processed_tokens
+        if request.id not in self._allocation_map:
+            num_remaining_tokens -= self._get_num_cached_prefix_tokens(request)
+
         next_num_tokens = min(
-            request.num_prefill_tokens - request.num_processed_tokens,
+            num_remaining_tokens,
             self._config.chunk_size - num_batch_tokens,
         )
 
@@ -90,6 +102,7 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
         running_prefills = []
         contains_prefill = False
         num_batch_tokens = 0
+        preempted = False
 
         # preempted requests could contain multiple requests which have
         # partial prefills completed, so we need to be careful
@@ -97,7 +110,7 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
             if len(requests) == self._max_micro_batch_size:
                 break
 
-            request = self._preempted_requests.pop(0)
+            request = self._preempted_requests.popleft()
 
             if not request.is_prefill_complete:
                 running_prefills.append(request)
@@ -112,15 +125,12 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
                 continue
 
             while not self._can_allocate_request(request):
+                preempted = True
                 if self._preempted_requests:
-                    victim_request = self._preempted_requests.pop(-1)
-                    victim_request.restart()
-                    self.free(victim_request.id)
-                    self._request_queue = [victim_request] + self._request_queue
+                    victim_request = self._preempted_requests.pop()
+                    self.preempt(victim_request)
                 else:
-                    request.restart()
-                    self.free(request.id)
-                    self._request_queue = [request] + self._request_queue
+                    self.preempt(request)
                     break
             else:
                 self._allocate_request(request)
@@ -129,6 +139,37 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
                 requests.append(request)
                 num_tokens.append(next_num_tokens)
 
+        # swapped out requests resume once no running request had to be preempted,
+        # the ones with a partial prefill continue with the running prefills
+        while self._swapped_requests and not preempted:
+            if len(self._allocation_map) == self._config.batch_size_cap:
+                break
+
+            if len(requests) == self._max_micro_batch_size:
+                break
+
+            if not self._can_allocate_request(self._swapped_requests.peek()):
+                break
+
+            request = self._swapped_requests.popleft()
+            self._allocate_request(request)
+
+            if not request.is_prefill_complete:
+                running_prefills.append(request)
+                continue
+
+            next_num_tokens = self._get_request_next_num_tokens(
+                request, contains_prefill, num_batch_tokens
+            )
+
+            if next_num_tokens == 0:
+                skipped_requests.append(request)
+                continue
+
+            num_batch_tokens += next_num_tokens
+            requests.append(request)
+            num_tokens.append(next_num_tokens)
+
         for request in running_prefills:
             assert not request.is_prefill_complete
 
@@ -147,30 +188,30 @@ class SarathiReplicaScheduler(BaseReplicaScheduler):
 
         # re-add the skipped requests, but make sure that we add them to the
         # front of the queue so that they are scheduled first and we maintain FIFO ordering
-        self._preempted_requests = skipped_requests + self._preempted_requests
-        self._preempted_requests = sorted(
-            self._preempted_requests, key=lambda req: req.arrived_at
-        )
+        for request in reversed(skipped_requests):
+            self._preempted_requests.appendleft(request)
+        self._preempted_requests.sort(key=lambda req: req.arrived_at)
         skipped_requests = []
 
-        while self._request_queue:
+        # like vLLM, new requests only start once no request is swapped out
+        while self._request_queue and not self._swapped_requests:
             if len(self._allocation_map) == self._config.batch_size_cap:
                 break
 
             if len(requests) == self._max_micro_batch_size:
                 break
 
-            if not self._can_allocate_request(self._request_queue[0]):
+            if not self._can_allocate_request(self._request_queue.peek()):
                 break
 
             next_num_tokens = self._get_request_next_num_tokens(
-                self._request_queue[0], contains_prefill, num_batch_tokens
+                self._request_queue.peek(), contains_prefill, num_batch_tokens
             )
 
             if next_num_tokens == 0:
                 break
 
-            request = self._request_queue.pop(0)
+            request = self._request_queue.popleft()
 
             self._allocate_request(request)
 
@@ -1,17 +1,15 @@
-from math import ceil
-from typing import List
-
 from vidur.entities.batch import Batch, Request
 from vidur.scheduler.replica_scheduler.base_replica_scheduler import (
     BaseReplicaScheduler,
 )
+from vidur.scheduler.utils.request_queue import RequestQueue
 
 
 class VLLMReplicaScheduler(BaseReplicaScheduler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self._preempted_requests: List[Request] = []
+        self._preempted_requests = RequestQueue()
         self._num_running_batches = 0
         # For vLLM and its derivatives, we only need to set a loose max batch size
         # Memory requirements are handled explicitly by the scheduler
@@ -22,6 +20,7 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
 
     def on_batch_end(self, batch: Batch) -> None:
         self._num_running_batches -= 1
+        self._mark_prefixes_computed(batch)
 
         for request in batch.requests:
             if request.completed:
@@ -30,11 +29,19 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
                 self._preempted_requests.append(request)
 
     def _can_allocate_request(self, request: Request) -> bool:
+        if self.is_swapped(request.id):
+            # the swapped out blocks and a block for the next token
+            num_required_blocks = self.get_num_swapped_blocks(request.id) + 1
+            return (
+                self._config.num_blocks
+                - self._num_allocated_blocks
+                - num_required_blocks
+                >= self._watermark_blocks
+            )
+
         if request.id not in self._allocation_map:
             # new request
-            num_required_blocks = ceil(
-                (request.num_prefill_tokens) / self._config.block_size
-            )
+            num_required_blocks = self.get_num_prefill_blocks(request)
             return (
                 self._config.num_blocks
                 - self._num_allocated_blocks
@@ -46,15 +53,15 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
         return self._config.num_blocks - self._num_allocated_blocks >= 1
 
     def _allocate_request(self, request: Request) -> None:
+        if self.is_swapped(request.id):
+            self.swap_in(request)
+
         if request.id not in self._allocation_map:
             # new request
-            num_required_blocks = ceil(
-                (request.num_prefill_tokens) / self._config.block_size
-            )
-            self.allocate(request.id, num_required_blocks)
+            self.allocate_prefill(request)
             return
 
-        num_tokens_reserved = self._allocation_map[request.id] * self._config.block_size
+        num_tokens_reserved = self.get_num_reserved_tokens(request.id)
         num_tokens_required = max(0, request.num_processed_tokens - num_tokens_reserved)
         assert (
             num_tokens_required == 0 or num_tokens_required == 1
@@ -69,9 +76,11 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
         requests = []
         num_tokens = []
         num_batch_tokens = 0
+        preempted = False
 
-        while self._request_queue:
-            request = self._request_queue[0]
+        # like vLLM, new requests only start once no request is swapped out
+        while self._request_queue and not self._swapped_requests:
+            request = self._request_queue.peek()
 
             next_num_tokens = self._get_request_next_num_tokens(request)
 
@@ -89,7 +98,7 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
             if len(requests) == self._max_micro_batch_size:
                 break
 
-            request = self._request_queue.pop(0)
+            request = self._request_queue.popleft()
 
             self._allocate_request(request)
             requests.append(request)
@@ -106,18 +115,15 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
             if len(requests) == self._max_micro_batch_size:
                 break
 
-            request = self._preempted_requests.pop(0)
+            request = self._preempted_requests.popleft()
 
             while not self._can_allocate_request(request):
+                preempted = True
                 if self._preempted_requests:
-                    victim_request = self._preempted_requests.pop(-1)
-                    victim_request.restart()
-                    self.free(victim_request.id)
-                    self._request_queue = [victim_request] + self._request_queue
+                    victim_request = self._preempted_requests.pop()
+                    self.preempt(victim_request)
                 else:
-                    request.restart()
-                    self.free(request.id)
-                    self._request_queue = [request] + self._request_queue
+                    self.preempt(request)
                     break
             else:
                 self._allocate_request(request)
@@ -125,6 +131,22 @@ class VLLMReplicaScheduler(BaseReplicaScheduler):
                 requests.append(request)
                 num_tokens.append(next_num_tokens)
 
+        # swapped out requests resume once no running request had to be preempted
+        while self._swapped_requests and not preempted:
+            if len(self._allocation_map) == self._config.batch_size_cap:
+                break
+
+            if len(requests) == self._max_micro_batch_size:
+                break
+
+            if not self._can_allocate_request(self._swapped_requests.peek()):
+                break
+
+            request = self._swapped_requests.popleft()
+            self._allocate_request(request)
+            requests.append(request)
+            num_tokens.append(self._get_request_next_num_tokens(request))
+
         if not requests:
             return
 
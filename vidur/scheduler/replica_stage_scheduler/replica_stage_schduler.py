@@ -43,7 +43,8 @@ class ReplicaStageScheduler:
             batch,
             self._stage_id,
         )
-        total_execution_time = execution_time.total_time
+        # every stage swaps the KV cache of its own layers before running the batch
+        total_execution_time = execution_time.total_time + batch.swap_time
         model_execution_time = execution_time.model_time
         batch_stage = BatchStage(
             batch.id,
@@ -0,0 +1,60 @@
+from typing import List
+
+import numpy as np
+
+
+class BlockAllocator:
+    """
+    Hands out KV cache block ids from a free list, like the block allocator of
+    vLLM's block manager. Allocating and freeing cost O(1) per block; recently
+    freed blocks are reused first, so the free blocks scatter over the cache as
+    requests of different lengths come and go.
+
+    A boolean map of the free blocks is kept next to the free list to measure
+    the fragmentation (the longest run of contiguous free blocks) on demand.
+    """
+
+    def __init__(self, num_blocks: int) -> None:
+        self._num_blocks = num_blocks
+        # popped from the end, the lowest block ids are handed out first
+        self._free_blocks: List[int] = list(range(num_blocks - 1, -1, -1))
+        self._is_free = np.ones(num_blocks, dtype=bool)
+        # blocks handed out since the start of the simulation
+        self.num_allocations = 0
+
+    @property
+    def num_blocks(self) -> int:
+        return self._num_blocks
+
+    @property
+    def num_free_blocks(self) -> int:
+        return len(self._free_blocks)
+
+    def allocate(self, num_blocks: int) -> List[int]:
+        assert num_blocks <= len(self._free_blocks), (
+            f"Cannot allocate {num_blocks} blocks,"
+            f" only {len(self._free_blocks)} blocks are free"
+        )
+        if num_blocks == 0:
+            return []
+
+        blocks = self._free_blocks[-num_blocks:]
+        del self._free_blocks[-num_blocks:]
+        self._is_free[blocks] = False
+        self.num_allocations += num_blocks
+        return blocks
+
+    def free(self, blocks: List[int]) -> None:
+        assert not self._is_free[blocks].any(), (
+            f"Cannot free blocks {[block for block in blocks if self._is_free[block]]},"
+            " they are already free"
+        )
+        self._free_blocks.extend(blocks)
+        self._is_free[blocks] = True
+
+    def get_largest_free_run(self) -> int:
+        # run boundaries are where the padded free map flips
+        edges = np.diff(self._is_free, prepend=False, append=False).nonzero()[0]
+        if len(edges) == 0:
+            return 0
+        return int((edges[1::2] - edges[::2]).max())
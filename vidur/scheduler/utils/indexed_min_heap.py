@@ -0,0 +1,72 @@
+from typing import Dict, Hashable, List, Tuple
+
+
+class IndexedMinHeap:
+    """
+    Binary min-heap of keys ordered by (priority, key), with the position of
+    every key indexed so that the priority of any key can be changed in
+    O(log n). Ties on the priority go to the smallest key.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, Hashable]] = []
+        # key -> index of its entry in _heap
+        self._positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def get_priority(self, key: Hashable) -> float:
+        return self._heap[self._positions[key]][0]
+
+    def peek(self) -> Hashable:
+        return self._heap[0][1]
+
+    def set_priority(self, key: Hashable, priority: float) -> None:
+        """Inserts `key`, or moves it to its place for the new `priority`."""
+        position = self._positions.get(key)
+        if position is None:
+            self._heap.append((priority, key))
+            self._positions[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            return
+
+        old_priority = self._heap[position][0]
+        self._heap[position] = (priority, key)
+        if priority < old_priority:
+            self._sift_up(position)
+        elif priority > old_priority:
+            self._sift_down(position)
+
+    def _move(self, entry: Tuple[float, Hashable], position: int) -> None:
+        self._heap[position] = entry
+        self._positions[entry[1]] = position
+
+    def _sift_up(self, position: int) -> None:
+        entry = self._heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            if not entry < self._heap[parent]:
+                break
+            self._move(self._heap[parent], position)
+            position = parent
+        self._move(entry, position)
+
+    def _sift_down(self, position: int) -> None:
+        heap = self._heap
+        entry = heap[position]
+        size = len(heap)
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            self._move(heap[child], position)
+            position = child
+        self._move(entry, position)
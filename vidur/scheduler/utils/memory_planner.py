@@ -17,6 +17,17 @@ class MemoryPlanner:
             * self._replica.max_request_tokens
         )
 
+    def get_kv_cache_memory_per_block_per_device(self, block_size: int) -> int:
+        # every device of a pipeline stage only holds the layers of its stage
+        return (
+            2  # 2 bytes per float
+            * 2  # one for key, one for value
+            * self._replica.attention_head_dim
+            * self._replica.kv_heads_per_tensor_parallel_worker
+            * block_size
+            * self._replica.num_layers_per_pipeline_stage
+        )
+
     def _get_parameter_memory_per_device(self) -> int:
         return 2 * self._param_counter.get_num_parameters_per_device()
 
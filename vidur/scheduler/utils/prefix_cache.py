@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Dict, List
+
+
+class _PrefixEntry:
+    __slots__ = ("num_blocks", "num_computed_blocks", "ref_count")
+
+    def __init__(self) -> None:
+        self.num_blocks = 0
+        # blocks whose KV cache has been computed, the rest is still being
+        # prefilled by the request that added them
+        self.num_computed_blocks = 0
+        self.ref_count = 0
+
+
+class PrefixCache:
+    """
+    Ref-counted KV cache blocks of shared prompt prefixes, indexed by prefix id.
+
+    The blocks of a prefix are shared by all running requests with that prefix
+    id and count as allocated while any of them holds a reference, only blocks
+    that a request has finished prefilling are reused without recomputation.
+    Once the last reference is released the blocks keep their contents but
+    count as free: they are reused by the next request with the prefix, or
+    evicted in least recently used order as soon as the free blocks are needed
+    for other allocations.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[int, _PrefixEntry] = {}
+        # prefix ids without references, least recently used first
+        self._evictable: "OrderedDict[int, None]" = OrderedDict()
+        self._num_referenced_blocks = 0
+        self._num_evictable_blocks = 0
+
+        self.num_hit_blocks = 0
+        self.num_miss_blocks = 0
+
+    @property
+    def num_referenced_blocks(self) -> int:
+        return self._num_referenced_blocks
+
+    @property
+    def num_evictable_blocks(self) -> int:
+        return self._num_evictable_blocks
+
+    def get_num_blocks(self, prefix_id: int) -> int:
+        entry = self._entries.get(prefix_id)
+        return entry.num_blocks if entry else 0
+
+    def get_num_cached_blocks(self, prefix_id: int, num_blocks: int) -> int:
+        """How many of the first `num_blocks` blocks of the prefix are cached."""
+        entry = self._entries.get(prefix_id)
+        return min(entry.num_computed_blocks, num_blocks) if entry else 0
+
+    def get_num_new_blocks(self, prefix_id: int, num_blocks: int) -> int:
+        """
+        Blocks that become allocated when a request acquires the first
+        `num_blocks` blocks of the prefix: the ones it adds to the prefix and,
+        if the prefix has no references, the cached ones it revives.
+        """
+        entry = self._entries.get(prefix_id)
+        if entry is None:
+            return num_blocks
+        num_allocated_blocks = entry.num_blocks if entry.ref_count else 0
+        return max(entry.num_blocks, num_blocks) - num_allocated_blocks
+
+    def acquire(self, prefix_id: int, num_blocks: int) -> int:
+        """
+        References the first `num_blocks` blocks of the prefix, extending the
+        prefix if it has fewer cached blocks. Returns the number of cached blocks
+        the request reuses.
+        """
+        entry = self._entries.get(prefix_id)
+        if entry is None:
+            entry = self._entries[prefix_id] = _PrefixEntry()
+
+        num_cached_blocks = min(entry.num_computed_blocks, num_blocks)
+        num_new_blocks = self.get_num_new_blocks(prefix_id, num_blocks)
+
+        if entry.ref_count == 0 and prefix_id in self._evictable:
+            del self._evictable[prefix_id]
+            self._num_evictable_blocks -= entry.num_blocks
+
+        entry.num_blocks = max(entry.num_blocks, num_blocks)
+        entry.ref_count += 1
+        self._num_referenced_blocks += num_new_blocks
+
+        self.num_hit_blocks += num_cached_blocks
+        self.num_miss_blocks += num_blocks - num_cached_blocks
+        return num_cached_blocks
+
+    def mark_computed(self, prefix_id: int, num_blocks: int) -> None:
+        entry = self._entries[prefix_id]
+        entry.num_computed_blocks = max(entry.num_computed_blocks, num_blocks)
+
+    def release(self, prefix_id: int) -> int:
+        """Drops a reference, returns the number of blocks that became free."""
+        entry = self._entries[prefix_id]
+        entry.ref_count -= 1
+        if entry.ref_count:
+            return 0
+
+        self._num_referenced_blocks -= entry.num_blocks
+        self._num_evictable_blocks += entry.num_blocks
+        self._evictable[prefix_id] = None
+        return entry.num_blocks
+
+    def evict(self, num_free_blocks: int) -> List[int]:
+        """
+        Evicts unreferenced prefixes until they fit in `num_free_blocks`,
+        returns the evicted prefix ids.
+        """
+        evicted_prefix_ids = []
+        while self._num_evictable_blocks > num_free_blocks:
+            prefix_id, _ = self._evictable.popitem(last=False)
+            self._num_evictable_blocks -= self._entries.pop(prefix_id).num_blocks
+            evicted_prefix_ids.append(prefix_id)
+        return evicted_prefix_ids
@@ -0,0 +1,105 @@
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, Tuple
+
+from vidur.entities import Request
+
+
+class RequestQueue:
+    """
+    FIFO queue of requests indexed by request id.
+
+    Push / pop at both ends, membership tests and removal by request id are all
+    O(1) (amortized). Removed requests are left in the underlying deque as stale
+    entries and discarded lazily once they reach either end of the queue, or when
+    they outnumber the live entries.
+    """
+
+    _COMPACTION_THRESHOLD = 64
+
+    def __init__(self, requests: Iterable[Request] = ()) -> None:
+        self._queue: Deque[Tuple[int, Request]] = deque()
+        # request id -> token of the live entry of the request in _queue
+        self._entries: Dict[int, int] = {}
+        self._next_token = 0
+        self._num_stale = 0
+
+        for request in requests:
+            self.append(request)
+
+    def _new_entry(self, request: Request) -> Tuple[int, Request]:
+        assert request.id not in self._entries, f"Request {request.id} already queued"
+
+        token = self._next_token
+        self._next_token += 1
+        self._entries[request.id] = token
+        return token, request
+
+    def _is_live(self, entry: Tuple[int, Request]) -> bool:
+        token, request = entry
+        return self._entries.get(request.id) == token
+
+    def _discard_stale_front(self) -> None:
+        while self._num_stale and self._queue and not self._is_live(self._queue[0]):
+            self._queue.popleft()
+            self._num_stale -= 1
+
+    def _discard_stale_back(self) -> None:
+        while self._num_stale and self._queue and not self._is_live(self._queue[-1]):
+            self._queue.pop()
+            self._num_stale -= 1
+
+    def append(self, request: Request) -> None:
+        self._queue.append(self._new_entry(request))
+
+    def appendleft(self, request: Request) -> None:
+        self._queue.appendleft(self._new_entry(request))
+
+    def popleft(self) -> Request:
+        self._discard_stale_front()
+        _, request = self._queue.popleft()
+        del self._entries[request.id]
+        return request
+
+    def pop(self) -> Request:
+        self._discard_stale_back()
+        _, request = self._queue.pop()
+        del self._entries[request.id]
+        return request
+
+    def peek(self) -> Request:
+        self._discard_stale_front()
+        return self._queue[0][1]
+
+    def remove(self, request_id: int) -> None:
+        del self._entries[request_id]
+        self._num_stale += 1
+
+        if self._num_stale > max(len(self._entries), self._COMPACTION_THRESHOLD):
+            self._queue = deque(entry for entry in self._queue if self._is_live(entry))
+            self._num_stale = 0
+
+    def sort(self, key: Callable[[Request], float]) -> None:
+        # stable, same semantics as list.sort
+        requests = sorted(self, key=key)
+        self.clear()
+        for request in requests:
+            self.append(request)
+
+    def clear(self) -> None:
+        self._queue.clear()
+        self._entries.clear()
+        self._num_stale = 0
+
+    def __contains__(self, request_id: int) -> bool:
+        return request_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __iter__(self) -> Iterator[Request]:
+        for entry in self._queue:
+            if self._is_live(entry):
+                yield entry[1]
@@ -0,0 +1,189 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vidur.entities import Request
+
+
+class RequestGroup(Sequence):
+    """Rows of one group of queued requests in FIFO order, read as Request objects."""
+
+    def __init__(self, table: "RequestTable", rows: np.ndarray) -> None:
+        self._table = table
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._table._requests[row] for row in self._rows[index].tolist()]
+        return self._table._requests[self._rows[index]]
+
+    def __iter__(self) -> Iterator[Request]:
+        requests = self._table._requests
+        for row in self._rows.tolist():
+            yield requests[row]
+
+
+class RequestTable:
+    """
+    Struct-of-arrays copy of the request fields the booking-limit schedulers
+    group the queue by every iteration (prompt type and current stage), kept in
+    NumPy columns so that queued requests can be grouped and counted with
+    vectorized operations instead of Python loops over the queue.
+
+    The Request objects stay the source of truth, a row is a snapshot refreshed
+    whenever the request (re)enters the queue; queued requests are not running so
+    their fields do not change until they are dequeued. Rows are looked up by
+    request id and recycled once a request is removed, so the columns only grow
+    to the number of requests that are live on the replica at the same time.
+    """
+
+    _INITIAL_CAPACITY = 256
+
+    def __init__(self) -> None:
+        capacity = self._INITIAL_CAPACITY
+        self.request_id = np.full(capacity, -1, dtype=np.int64)
+        self.current_stage = np.zeros(capacity, dtype=np.int64)
+        self.prompt_type = np.zeros(capacity, dtype=np.int64)
+        self.is_queued = np.zeros(capacity, dtype=bool)
+        # FIFO position of queued rows, from a counter bumped on every enqueue
+        self.queue_position = np.zeros(capacity, dtype=np.int64)
+
+        self._requests: List[Optional[Request]] = [None] * capacity
+        self._rows: Dict[int, int] = {}
+        self._free_rows: List[int] = list(range(capacity - 1, -1, -1))
+        self._next_queue_position = 0
+        self._num_queued = 0
+
+        self._prompt_type_codes: Dict[str, int] = {}
+        self._prompt_types: List[str] = []
+
+    @property
+    def num_queued(self) -> int:
+        return self._num_queued
+
+    def __contains__(self, request_id: int) -> bool:
+        return request_id in self._rows
+
+    def get_prompt_type_code(self, prompt_type: str) -> int:
+        code = self._prompt_type_codes.get(prompt_type)
+        if code is None:
+            code = len(self._prompt_types)
+            self._prompt_type_codes[prompt_type] = code
+            self._prompt_types.append(prompt_type)
+        return code
+
+    def get_prompt_type(self, code: int) -> str:
+        return self._prompt_types[code]
+
+    def _grow(self) -> None:
+        capacity = len(self.request_id)
+        for name in (
+            "request_id",
+            "current_stage",
+            "prompt_type",
+            "is_queued",
+            "queue_position",
+        ):
+            column = getattr(self, name)
+            grown = np.zeros(2 * capacity, dtype=column.dtype)
+            grown[:capacity] = column
+            setattr(self, name, grown)
+        self.request_id[capacity:] = -1
+
+        self._requests.extend([None] * capacity)
+        self._free_rows.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def _get_row(self, request: Request) -> int:
+        row = self._rows.get(request.id)
+        if row is not None:
+            return row
+
+        if not self._free_rows:
+            self._grow()
+        row = self._free_rows.pop()
+        self._rows[request.id] = row
+        self._requests[row] = request
+        self.request_id[row] = request.id
+        return row
+
+    def enqueue(self, request: Request) -> None:
+        row = self._get_row(request)
+        assert not self.is_queued[row], f"Request {request.id} already queued"
+
+        self.current_stage[row] = request.current_stage
+        self.prompt_type[row] = self.get_prompt_type_code(request.prompt_type)
+        self.is_queued[row] = True
+        self.queue_position[row] = self._next_queue_position
+        self._next_queue_position += 1
+        self._num_queued += 1
+
+    def dequeue(self, request_id: int) -> None:
+        row = self._rows[request_id]
+        assert self.is_queued[row], f"Request {request_id} is not queued"
+
+        self.is_queued[row] = False
+        self._num_queued -= 1
+
+    def clear_queue(self) -> None:
+        self.is_queued[:] = False
+        self._num_queued = 0
+
+    def remove(self, request_id: int) -> None:
+        row = self._rows.pop(request_id, None)
+        if row is None:
+            return
+
+        if self.is_queued[row]:
+            self.is_queued[row] = False
+            self._num_queued -= 1
+        self.request_id[row] = -1
+        self._requests[row] = None
+        self._free_rows.append(row)
+
+    def get_queued_rows(self) -> np.ndarray:
+        """Rows of the queued requests in FIFO order."""
+        rows = np.flatnonzero(self.is_queued)
+        return rows[np.argsort(self.queue_position[rows], kind="stable")]
+
+    def group_rows(
+        self, rows: np.ndarray, keys: np.ndarray
+    ) -> List[Tuple[int, RequestGroup]]:
+        """
+        Groups `rows` (in FIFO order) by `keys`, returns (key, group) pairs with
+        the groups ordered by first appearance in `rows` and FIFO order within each
+        group, i.e. the order of a dict filled by a loop over the queue.
+        """
+        if not len(rows):
+            return []
+
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:], [len(rows)]))
+
+        sorted_rows = rows[order]
+        groups = []
+        # order[start] is the FIFO index of the group's first request
+        for group_index in np.argsort(order[starts], kind="stable").tolist():
+            start, end = starts[group_index], ends[group_index]
+            groups.append(
+                (
+                    int(sorted_keys[start]),
+                    RequestGroup(self, sorted_rows[start:end]),
+                )
+            )
+        return groups
+
+    def group_queued_by_prompt_type_and_stage(
+        self,
+    ) -> Dict[Tuple[str, int], RequestGroup]:
+        rows = self.get_queued_rows()
+        keys = (self.prompt_type[rows] << 32) | self.current_stage[rows]
+        return {
+            (self.get_prompt_type(key >> 32), key & 0xFFFFFFFF): group
+            for key, group in self.group_rows(rows, keys)
+        }
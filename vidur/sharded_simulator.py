@@ -0,0 +1,216 @@
+import atexit
+import copy
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from vidur.config import SimulationConfig
+from vidur.entities import Batch, Cluster, Replica, Request
+from vidur.execution_time_predictor import BaseExecutionTimePredictor
+from vidur.logger import init_logger
+from vidur.metrics import MetricsStore
+from vidur.scheduler import GlobalSchedulerRegistry
+from vidur.simulator import Simulator
+from vidur.sweep import generate_requests, get_execution_time_predictor
+from vidur.utils.random import set_seeds
+
+logger = init_logger(__name__)
+
+# Filled by the parent before forking the shard processes, the shards read the
+# requests, their assignment and the loaded predictor copy-on-write.
+_shard_context: Dict[str, object] = {}
+
+
+@dataclass
+class ShardResult:
+    shard_id: int
+    replica_ids: List[int]
+    metric_store: MetricsStore
+    num_batches: int
+    time: float
+    wall_time: float
+
+
+def _get_shard_config(config: SimulationConfig, shard_id: int) -> SimulationConfig:
+    # traces, profiles and checkpoints of a shard go to its own directories
+    config = copy.deepcopy(config)
+    config.metrics_config.output_dir = f"{config.metrics_config.output_dir}/shard_{shard_id}"
+    os.makedirs(config.metrics_config.output_dir, exist_ok=True)
+
+    checkpoint_config = config.checkpoint_config
+    checkpoint_config.output_dir = f"{checkpoint_config.output_dir}/shard_{shard_id}"
+    if checkpoint_config.resume_from:
+        checkpoint_config.resume_from = f"{checkpoint_config.resume_from}/shard_{shard_id}"
+
+    return config
+
+
+def _run_shard(shard_id: int) -> ShardResult:
+    start_time = time.perf_counter()
+
+    config: SimulationConfig = _shard_context["config"]
+    replica_ids = _shard_context["shard_replica_ids"][shard_id]
+    replica_assignment = _shard_context["replica_assignment"]
+    requests = [
+        request
+        for request in _shard_context["requests"]
+        if replica_assignment[request.id] in replica_ids
+    ]
+
+    config = _get_shard_config(config, shard_id)
+    set_seeds(config.seed)
+
+    simulator = Simulator(
+        config,
+        _shard_context["execution_time_predictor"],
+        requests,
+        replica_assignment,
+    )
+    simulator.run()
+    simulator.write_output(write_metrics=False)
+
+    return ShardResult(
+        shard_id=shard_id,
+        replica_ids=replica_ids,
+        metric_store=simulator.metric_store,
+        num_batches=Batch._last_id + 1,
+        time=simulator._time,
+        wall_time=time.perf_counter() - start_time,
+    )
+
+
+class ShardedSimulator:
+    """
+    Simulates the replicas of a cluster in `num_shards` processes. With a
+    stateless global scheduler (round robin, random) the replica of every request
+    is known before the simulation starts, and replicas never interact after
+    dispatch, so each shard simulates its replicas with only their requests.
+
+    The requests are generated and assigned here with the configured global
+    scheduler, in arrival order, the same assignment a single simulation makes.
+    The metrics of the shards are merged into one MetricsStore; the per request
+    metrics match a single simulation, batch ids are numbered shard after shard.
+    Traces and profiles are written per shard, under `<output_dir>/shard_<id>`.
+    """
+
+    def __init__(
+        self,
+        config: SimulationConfig,
+        execution_time_predictor: Optional[BaseExecutionTimePredictor] = None,
+    ) -> None:
+        self._config = config
+
+        global_scheduler_type = config.cluster_config.global_scheduler_config.get_type()
+        if not GlobalSchedulerRegistry.get_class(global_scheduler_type).is_stateless():
+            raise ValueError(
+                f"Sharded simulation needs a stateless global scheduler, the"
+                f" {global_scheduler_type} scheduler depends on the replica state"
+            )
+
+        self._execution_time_predictor = (
+            execution_time_predictor or get_execution_time_predictor(config)
+        )
+        self._num_shards = max(1, min(config.num_shards, config.cluster_config.num_replicas))
+        self._replica_ids: List[int] = []
+        self._metric_store = None
+        self._time = 0
+
+        self._output_written = False
+        atexit.register(self._write_output)
+
+    @property
+    def metric_store(self) -> MetricsStore:
+        return self._metric_store
+
+    def _assign_requests(self, requests: List[Request]) -> Dict[int, int]:
+        # replica ids and the global scheduler are set up like in Simulator
+        Cluster.reset_id()
+        Replica.reset_id()
+        cluster = Cluster(
+            self._config.cluster_config,
+            self._config.metrics_config,
+            self._config.request_generator_config,
+        )
+        scheduler = GlobalSchedulerRegistry.get(
+            self._config.cluster_config.global_scheduler_config.get_type(),
+            self._config,
+            cluster.replicas,
+            self._execution_time_predictor,
+        )
+
+        replica_assignment = {}
+        for request in requests:
+            scheduler.add_request(request)
+            for replica_id, scheduled_request in scheduler.schedule():
+                replica_assignment[scheduled_request.id] = replica_id
+
+        self._replica_ids = sorted(cluster.replicas)
+        return replica_assignment
+
+    def run(self) -> None:
+        requests = generate_requests(self._config)
+        replica_assignment = self._assign_requests(requests)
+        shard_replica_ids = [
+            self._replica_ids[shard_id :: self._num_shards]
+            for shard_id in range(self._num_shards)
+        ]
+
+        # the arrival side metrics are recorded for all requests here
+        self._metric_store = MetricsStore(self._config)
+        for request in requests:
+            self._metric_store.on_request_arrival(request.arrived_at, request)
+
+        logger.info(
+            f"Simulating {len(self._replica_ids)} replicas in {self._num_shards} shards,"
+            f" {len(requests)} requests were assigned up front"
+        )
+
+        _shard_context.update(
+            config=self._config,
+            execution_time_predictor=self._execution_time_predictor,
+            requests=requests,
+            replica_assignment=replica_assignment,
+            shard_replica_ids=shard_replica_ids,
+        )
+        try:
+            # without fork (e.g. Windows) the shards run one after another
+            if self._num_shards > 1 and "fork" in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context("fork").Pool(self._num_shards) as pool:
+                    results = pool.map(_run_shard, range(self._num_shards))
+            else:
+                results = [_run_shard(shard_id) for shard_id in range(self._num_shards)]
+        finally:
+            _shard_context.clear()
+
+        batch_id_offset = 0
+        for result in results:
+            logger.info(
+                f"Shard {result.shard_id} (replicas {result.replica_ids}) ended at"
+                f" {result.time}s after {result.wall_time:.1f}s"
+            )
+            self._metric_store.merge_shard(
+                result.metric_store, result.replica_ids, batch_id_offset
+            )
+            batch_id_offset += result.num_batches
+            self._time = max(self._time, result.time)
+        self._metric_store.sort_merged_shards()
+
+        logger.info(
+            f"Simulation ended at: {self._time}s after {len(requests)} request arrivals"
+        )
+
+    def write_output(self) -> None:
+        atexit.unregister(self._write_output)
+        self._write_output()
+
+    def _write_output(self) -> None:
+        if self._output_written or self._metric_store is None:
+            return
+        self._output_written = True
+
+        logger.info("Writing output")
+
+        self._metric_store.plot()
+        logger.info("Metrics written")
@@ -1,33 +1,84 @@
 import atexit
-import heapq
-import json
-from typing import List
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 from vidur.config import SimulationConfig
-from vidur.entities import Cluster
+from vidur.config.utils import dataclass_to_dict
+from vidur.entities import Batch, BatchStage, Cluster, ExecutionTime, Replica, Request
+from vidur.event_queue import EventQueueRegistry
 from vidur.events import BaseEvent, RequestArrivalEvent
+from vidur.execution_time_predictor import BaseExecutionTimePredictor
 from vidur.logger import init_logger
 from vidur.metrics import MetricsStore
 from vidur.request_generator import RequestGeneratorRegistry
+from vidur.request_generator.request_stream import RequestStream
 from vidur.scheduler import BaseGlobalScheduler, GlobalSchedulerRegistry
+from vidur.scheduler.global_scheduler.preassigned_global_scheduler import (
+    PreassignedGlobalScheduler,
+)
+from vidur.utils.checkpoint import Checkpointer, get_config_objects
+from vidur.utils.event_loop_profiler import ROOT_PHASE, EventLoopProfiler
+from vidur.utils.trace_writer import JsonArrayTraceWriter, JsonlTraceWriter
 
 logger = init_logger(__name__)
 
+ENTITY_CLASSES = (Cluster, Replica, Request, Batch, BatchStage, ExecutionTime)
+
 
 class Simulator:
-    def __init__(self, config: SimulationConfig) -> None:
+    def __init__(
+        self,
+        config: SimulationConfig,
+        execution_time_predictor: Optional[BaseExecutionTimePredictor] = None,
+        requests: Optional[List[Request]] = None,
+        replica_assignment: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """
+        `requests` are pre-generated requests in arrival order (e.g. generated once
+        for a whole sweep), by default they are generated lazily from the request
+        generator config. The simulation mutates them, they cannot be reused.
+        `replica_assignment` maps request ids to the replicas they were assigned up
+        front, it replaces the configured global scheduler (see ShardedSimulator).
+        """
         self._config: SimulationConfig = config
 
         self._time = 0
+        self._num_events = 0
         self._terminate = False
         self._time_limit = self._config.time_limit
         if not self._time_limit:
             self._time_limit = float("inf")
 
-        self._event_queue = []
+        self._event_queue = EventQueueRegistry.get(
+            self._config.event_queue_config.get_type(),
+            self._config.event_queue_config,
+        )
 
-        self._event_trace = []
-        self._event_chrome_trace = []
+        # ids come from class level counters, restart them so that simulations run
+        # back to back in one process (e.g. sweeps) number everything the same way
+        for entity_class in ENTITY_CLASSES:
+            entity_class.reset_id()
+        BaseEvent.reset_id()
+
+        # traces are streamed to disk in chunks instead of being kept in memory
+        metrics_config = self._config.metrics_config
+        self._event_trace_writer = None
+        if metrics_config.write_json_trace:
+            self._event_trace_writer = JsonlTraceWriter(
+                f"{metrics_config.output_dir}/event_trace.jsonl",
+                metrics_config.trace_flush_interval,
+            )
+        self._chrome_trace_writer = None
+        if metrics_config.enable_chrome_trace:
+            self._chrome_trace_writer = JsonArrayTraceWriter(
+                f"{metrics_config.output_dir}/chrome_trace.json",
+                metrics_config.trace_flush_interval,
+                prefix='{"traceEvents": [',
+                suffix="]}",
+            )
 
         self._cluster = Cluster(
             self._config.cluster_config,
@@ -35,17 +86,44 @@ class Simulator:
             self._config.request_generator_config,
         )
         self._metric_store = MetricsStore(self._config)
-        self._request_generator = RequestGeneratorRegistry.get(
-            self._config.request_generator_config.get_type(),
-            self._config.request_generator_config,
-        )
-        self._scheduler = GlobalSchedulerRegistry.get(
-            self._config.cluster_config.global_scheduler_config.get_type(),
-            self._config,
-            self._cluster.replicas,
-        )
+        self._requests = requests
+        self._request_generator = None
+        if requests is None:
+            self._request_generator = RequestGeneratorRegistry.get(
+                self._config.request_generator_config.get_type(),
+                self._config.request_generator_config,
+            )
+        if replica_assignment is not None:
+            self._scheduler = PreassignedGlobalScheduler(
+                self._config,
+                self._cluster.replicas,
+                execution_time_predictor,
+                replica_assignment=replica_assignment,
+            )
+        else:
+            self._scheduler = GlobalSchedulerRegistry.get(
+                self._config.cluster_config.global_scheduler_config.get_type(),
+                self._config,
+                self._cluster.replicas,
+                execution_time_predictor,
+            )
+
+        self._profiler = None
+        if metrics_config.enable_event_loop_profiler:
+            self._profiler = EventLoopProfiler()
 
         self._init_event_queue()
+
+        checkpoint_config = self._config.checkpoint_config
+        self._checkpointer = None
+        if checkpoint_config.interval > 0:
+            self._checkpointer = Checkpointer(
+                checkpoint_config.output_dir, checkpoint_config.num_to_keep
+            )
+        if checkpoint_config.resume_from:
+            self._resume(checkpoint_config.resume_from)
+
+        self._output_written = False
         atexit.register(self._write_output)
 
     @property
@@ -58,22 +136,58 @@ class Simulator:
 
     def run(self) -> None:
         logger.info(
-            f"Starting simulation with cluster: {self._cluster} and {len(self._event_queue)} requests"
+            f"Starting simulation with cluster: {self._cluster}, requests are generated"
+            " as they arrive"
         )
 
+        profiler = self._profiler
+        if profiler:
+            self._instrument()
+            profiler.begin(ROOT_PHASE)
+
+        checkpointer = self._checkpointer
+        checkpoint_interval = self._config.checkpoint_config.interval
+        last_checkpoint_time = time.perf_counter()
+
         while self._event_queue and not self._terminate:
-            _, event = heapq.heappop(self._event_queue)
+            event = self._event_queue.pop()
             self._set_time(event._time)
+            self._num_events += 1
+
+            if profiler:
+                profiler.begin(event._event_type.name)
+
             new_events = event.handle_event(self._scheduler, self._metric_store)
             self._add_events(new_events)
 
-            if self._config.metrics_config.write_json_trace:
-                self._event_trace.append(event.to_dict())
+            if event is self._next_arrival_event:
+                self._add_next_request_arrival()
 
-            if self._config.metrics_config.enable_chrome_trace:
+            if self._event_trace_writer:
+                self._event_trace_writer.write(event.to_dict())
+
+            if self._chrome_trace_writer:
                 chrome_trace = event.to_chrome_trace()
                 if chrome_trace:
-                    self._event_chrome_trace.append(chrome_trace)
+                    self._chrome_trace_writer.write(chrome_trace)
+
+            if profiler:
+                profiler.end()
+
+            if (
+                checkpointer
+                and time.perf_counter() - last_checkpoint_time >= checkpoint_interval
+            ):
+                self._save_checkpoint()
+                last_checkpoint_time = time.perf_counter()
+
+        if checkpointer:
+            # resuming a finished simulation from here only rewrites its output
+            self._save_checkpoint()
+
+        if profiler:
+            profiler.end()
+            profiler.uninstrument()
 
         print("Event queue empty or termination triggered, checking pending requests...")
         print("self._event_queue: ", self._event_queue)
@@ -87,40 +201,224 @@ class Simulator:
 
             if not self._scheduler.is_empty():
                 print("\n启动强制清除\n")
-                while replica_scheduler._request_queue:
-                    req = replica_scheduler._request_queue.pop(0)
+                for req in replica_scheduler.drain_pending_requests():
                     replica_scheduler.free(req.id)
 
         assert self._scheduler.is_empty() or self._terminate
 
-        logger.info(f"Simulation ended at: {self._time}s")
+        logger.info(
+            f"Simulation ended at: {self._time}s after {self._request_stream.num_requests}"
+            " request arrivals"
+        )
+
+        cache_stats = self._scheduler.execution_time_predictor.get_execution_time_cache_stats()
+        logger.info(
+            f"Execution time cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses"
+            f" (hit rate {cache_stats['hit_rate']:.2%}, {cache_stats['size']} entries)"
+        )
+
+        for replica_id, replica_scheduler in self._scheduler._replica_schedulers.items():
+            prefix_cache = replica_scheduler.prefix_cache
+            if prefix_cache is None:
+                continue
+            num_prefix_blocks = prefix_cache.num_hit_blocks + prefix_cache.num_miss_blocks
+            logger.info(
+                f"Replica {replica_id} prefix cache: {prefix_cache.num_hit_blocks} of"
+                f" {num_prefix_blocks} prefix blocks reused"
+                f" (hit rate {prefix_cache.num_hit_blocks / max(num_prefix_blocks, 1):.2%})"
+            )
+
+        for replica_id, replica_scheduler in self._scheduler._replica_schedulers.items():
+            if not replica_scheduler.swap_time:
+                continue
+            swap_bytes = replica_scheduler.swap_in_bytes + replica_scheduler.swap_out_bytes
+            logger.info(
+                f"Replica {replica_id} swapped {replica_scheduler.swap_out_bytes / 1024**3:.2f} GiB"
+                f" out and {replica_scheduler.swap_in_bytes / 1024**3:.2f} GiB in per device in"
+                f" {replica_scheduler.swap_time:.3f}s"
+                f" ({swap_bytes / replica_scheduler.swap_time / 1e9:.1f} GB/s)"
+            )
+
+    def write_output(self, write_metrics: bool = True) -> None:
+        """
+        Writes the outputs right away instead of at interpreter exit, for callers that
+        run several simulations in one process (atexit hooks never fire in pool workers).
+        Without `write_metrics` only the traces and the profile are written, e.g. when
+        the caller merges the metrics of several simulations.
+        """
+        atexit.unregister(self._write_output)
+        self._write_output(write_metrics)
+
+    def _write_output(self, write_metrics: bool = True) -> None:
+        if self._output_written:
+            return
+        self._output_written = True
 
-    def _write_output(self) -> None:
         logger.info("Writing output")
 
-        self._metric_store.plot()
-        logger.info("Metrics written")
+        if write_metrics:
+            self._metric_store.plot()
+            logger.info("Metrics written")
 
-        if self._config.metrics_config.write_json_trace:
-            self._write_event_trace()
+        if self._profiler:
+            self._profiler.write_output(self._config.metrics_config.output_dir)
+            logger.info("Event loop profile written")
+
+        if self._event_trace_writer:
+            self._event_trace_writer.close()
             logger.info("Json event trace written")
 
-        if self._config.metrics_config.enable_chrome_trace:
-            self._write_chrome_trace()
+        if self._chrome_trace_writer:
+            self._chrome_trace_writer.close()
             logger.info("Chrome event trace written")
 
+    def _get_checkpoint_external_objects(self) -> Dict[str, Any]:
+        # rebuilt from the config by the resuming process instead of being pickled
+        return {
+            **get_config_objects(self._config),
+            "execution_time_predictor": self._scheduler.execution_time_predictor,
+        }
+
+    def _save_checkpoint(self) -> None:
+        """
+        Snapshots everything the event loop reads or writes between two events,
+        the traces and the event loop profile are not part of the checkpoint.
+        """
+        if self._profiler:
+            # the profiler shadows methods with closures, which cannot be pickled
+            self._profiler.uninstrument()
+
+        state = {
+            "config": dataclass_to_dict(self._config),
+            "time": self._time,
+            "num_events": self._num_events,
+            "terminate": self._terminate,
+            "event_queue": self._event_queue,
+            "next_arrival_event": self._next_arrival_event,
+            "request_stream": self._request_stream.get_state(),
+            "cluster": self._cluster,
+            "scheduler": self._scheduler,
+            "metric_store": self._metric_store,
+            "entity_ids": {
+                entity_class.__name__: entity_class._last_id
+                for entity_class in ENTITY_CLASSES
+            },
+            "event_id": BaseEvent._id,
+            "random_state": random.getstate(),
+            "numpy_random_state": np.random.get_state(),
+        }
+        path = self._checkpointer.save(
+            self._num_events, state, self._get_checkpoint_external_objects()
+        )
+        logger.info(
+            f"Checkpoint after {self._num_events} events at {self._time}s written to {path}"
+        )
+
+        if self._profiler:
+            self._instrument()
+
+    def _resume(self, resume_from: str) -> None:
+        path = Checkpointer.find_checkpoint(resume_from)
+        if path is None:
+            logger.info(f"No checkpoint found in {resume_from}, starting from scratch")
+            return
+
+        state = Checkpointer.load(path, self._get_checkpoint_external_objects())
+
+        config = dataclass_to_dict(self._config)
+        for config_dict in (config, state["config"]):
+            # differ between runs without changing the simulation
+            config_dict["metrics_config"].pop("output_dir")
+            config_dict.pop("checkpoint_config")
+            config_dict.pop("__flat_config__", None)
+        changed_keys = [
+            key for key in config if config.get(key) != state["config"].get(key)
+        ]
+        if changed_keys:
+            logger.warning(
+                f"Resuming from a checkpoint written with a different {', '.join(changed_keys)}"
+            )
+
+        self._time = state["time"]
+        self._num_events = state["num_events"]
+        self._terminate = state["terminate"]
+        self._event_queue = state["event_queue"]
+        self._next_arrival_event = state["next_arrival_event"]
+        self._request_stream.set_state(state["request_stream"])
+        self._cluster = state["cluster"]
+        self._scheduler = state["scheduler"]
+        self._metric_store = state["metric_store"]
+        # the replayed request generator advanced the counters, set them last
+        for entity_class in ENTITY_CLASSES:
+            entity_class._last_id = state["entity_ids"][entity_class.__name__]
+        BaseEvent._id = state["event_id"]
+        random.setstate(state["random_state"])
+        np.random.set_state(state["numpy_random_state"])
+
+        logger.info(
+            f"Resumed from {path} after {self._num_events} events at {self._time}s,"
+            " traces and the event loop profile only cover the resumed part"
+        )
+
+    def _instrument(self) -> None:
+        # time the scheduler, predictor and metrics store entry points of the event
+        # handlers, they show up nested below the event type in the profile
+        profiler = self._profiler
+        profiler.instrument(self._scheduler, ["add_request", "schedule"])
+        for replica_scheduler in self._scheduler._replica_schedulers.values():
+            profiler.instrument(
+                replica_scheduler, ["add_request", "on_schedule", "on_batch_end"]
+            )
+            for stage_scheduler in replica_scheduler._replica_stage_schedulers.values():
+                profiler.instrument(
+                    stage_scheduler, ["add_batch", "on_schedule", "on_stage_end"]
+                )
+        profiler.instrument(
+            self._scheduler.execution_time_predictor, ["get_execution_time"]
+        )
+        profiler.instrument(
+            self._metric_store,
+            [
+                "on_request_arrival",
+                "on_throughput_update",
+                "on_batch_end",
+                "on_replica_schedule",
+                "on_replica_stage_schedule",
+                "on_batch_stage_end",
+            ],
+        )
+        profiler.instrument(self, ["_add_events"])
+        for trace_writer in (self._event_trace_writer, self._chrome_trace_writer):
+            if trace_writer:
+                profiler.instrument(trace_writer, ["write"])
+
     def _add_event(self, event: BaseEvent) -> None:
-        heapq.heappush(self._event_queue, (event._priority_number, event))
+        self._event_queue.push(event)
 
     def _add_events(self, events: List[BaseEvent]) -> None:
-        for event in events:
-            self._add_event(event)
+        self._event_queue.push_all(events)
 
     def _init_event_queue(self) -> None:
-        requests = self._request_generator.generate()
-
-        for request in requests:
-            self._add_event(RequestArrivalEvent(request.arrived_at, request))
+        # requests are generated lazily, only the next arrival sits in the queue
+        if self._requests is not None:
+            requests = iter(self._requests)
+        else:
+            requests = self._request_generator.generate_iter()
+        self._request_stream = RequestStream(requests)
+        self._add_next_request_arrival()
+
+    def _add_next_request_arrival(self) -> None:
+        self._next_arrival_event = None
+
+        next_request = self._request_stream.next()
+        if next_request is None:
+            return
+
+        arrival_index, request = next_request
+        self._next_arrival_event = RequestArrivalEvent(
+            request.arrived_at, request, arrival_index
+        )
+        self._add_event(self._next_arrival_event)
 
     def _set_time(self, time: float) -> None:
         self._time = time
@@ -129,16 +427,3 @@ class Simulator:
                 f"Time limit reached: {self._time_limit}s terminating the simulation."
             )
             self._terminate = True
-
-    def _write_event_trace(self) -> None:
-        trace_file = f"{self._config.metrics_config.output_dir}/event_trace.json"
-        with open(trace_file, "w") as f:
-            json.dump(self._event_trace, f)
-
-    def _write_chrome_trace(self) -> None:
-        trace_file = f"{self._config.metrics_config.output_dir}/chrome_trace.json"
-
-        chrome_trace = {"traceEvents": self._event_chrome_trace}
-
-        with open(trace_file, "w") as f:
-            json.dump(chrome_trace, f)
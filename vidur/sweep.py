@@ -0,0 +1,257 @@
+import copy
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+from vidur.config import SimulationConfig
+from vidur.config.utils import dataclass_to_dict
+from vidur.entities import Request
+from vidur.execution_time_predictor import (
+    BaseExecutionTimePredictor,
+    ExecutionTimePredictorRegistry,
+)
+from vidur.logger import init_logger
+from vidur.request_generator import RequestGeneratorRegistry
+from vidur.request_generator.request_stream import RequestStream
+from vidur.simulator import Simulator
+from vidur.utils.random import set_seeds
+
+logger = init_logger(__name__)
+
+# Loaded predictors keyed by everything that goes into building one. The sweep
+# fills this (and _sweep_configs) in the parent before forking the pool, so the
+# workers share the loaded models copy-on-write instead of reloading them.
+_predictors: Dict[str, BaseExecutionTimePredictor] = {}
+_sweep_configs: Dict[Hashable, SimulationConfig] = {}
+# Requests generated once per distinct request generator setup for warm started
+# sweeps, each forked worker mutates its own copy-on-write copy.
+_sweep_requests: Dict[str, List[Request]] = {}
+
+
+@dataclass
+class SweepResult:
+    key: Hashable
+    output_dir: str
+    wall_time: float
+    error: Optional[str] = None
+
+
+def _get_predictor_key(config: SimulationConfig) -> str:
+    cluster_config = config.cluster_config
+    return json.dumps(
+        [
+            dataclass_to_dict(config.execution_time_predictor_config),
+            dataclass_to_dict(cluster_config.replica_config),
+            str(cluster_config.replica_scheduler_config.get_type()),
+            cluster_config.replica_scheduler_config.block_size,
+            config.metrics_config.cache_dir,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def get_execution_time_predictor(
+    config: SimulationConfig,
+) -> BaseExecutionTimePredictor:
+    predictor_key = _get_predictor_key(config)
+
+    if predictor_key not in _predictors:
+        cluster_config = config.cluster_config
+        _predictors[predictor_key] = ExecutionTimePredictorRegistry.get(
+            config.execution_time_predictor_config.get_type(),
+            predictor_config=config.execution_time_predictor_config,
+            replica_config=cluster_config.replica_config,
+            replica_scheduler_config=cluster_config.replica_scheduler_config,
+            metrics_config=config.metrics_config,
+        )
+
+    return _predictors[predictor_key]
+
+
+def _get_requests_key(config: SimulationConfig) -> str:
+    return json.dumps(
+        [dataclass_to_dict(config.request_generator_config), config.seed],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def generate_requests(config: SimulationConfig) -> List[Request]:
+    """
+    Generates all requests of a simulation up front, the same requests (and ids)
+    the simulator would generate lazily for this config. The generators draw from
+    their own random generators, the global random state is left as seeded here,
+    where a simulation's global scheduler (or the sharded replica assignment)
+    starts drawing from it.
+    """
+    set_seeds(config.seed)
+    Request.reset_id()
+
+    request_generator = RequestGeneratorRegistry.get(
+        config.request_generator_config.get_type(),
+        config.request_generator_config,
+    )
+    request_stream = RequestStream(request_generator.generate_iter())
+
+    requests = []
+    next_request = request_stream.next()
+    while next_request is not None:
+        requests.append(next_request[1])
+        next_request = request_stream.next()
+
+    return requests
+
+
+def run_simulation(
+    key: Hashable,
+    config: SimulationConfig,
+    requests: Optional[List[Request]] = None,
+) -> SweepResult:
+    start_time = time.perf_counter()
+
+    set_seeds(config.seed)
+
+    simulator = Simulator(config, get_execution_time_predictor(config), requests)
+    simulator.run()
+    simulator.write_output()
+
+    return SweepResult(
+        key=key,
+        output_dir=config.metrics_config.output_dir,
+        wall_time=time.perf_counter() - start_time,
+    )
+
+
+def _run_sweep_point(key: Hashable, copy_requests: bool = False) -> SweepResult:
+    start_time = time.perf_counter()
+    config = _sweep_configs[key]
+    requests = _sweep_requests.get(_get_requests_key(config))
+    if requests is not None and copy_requests:
+        # without fork the points share this process, the simulation mutates them
+        requests = copy.deepcopy(requests)
+    try:
+        return run_simulation(key, config, requests)
+    except Exception:
+        return SweepResult(
+            key=key,
+            output_dir=config.metrics_config.output_dir,
+            wall_time=time.perf_counter() - start_time,
+            error=traceback.format_exc(),
+        )
+
+
+def _run_sweep_points(
+    keys: List[Hashable], num_workers: int
+) -> Dict[Hashable, SweepResult]:
+    num_workers = max(1, min(num_workers, len(keys)))
+    results: Dict[Hashable, SweepResult] = {}
+
+    # workers read the configs and predictors from the forked address space,
+    # without fork (e.g. Windows) the sweep runs serially in this process
+    if num_workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        logger.info(f"Running {len(keys)} sweep points on {num_workers} workers")
+        with multiprocessing.get_context("fork").Pool(num_workers) as pool:
+            for result in pool.imap_unordered(_run_sweep_point, keys):
+                results[result.key] = result
+                _log_sweep_result(result)
+    else:
+        for key in keys:
+            results[key] = _run_sweep_point(key, copy_requests=True)
+            _log_sweep_result(results[key])
+
+    return results
+
+
+def _log_sweep_result(result: SweepResult) -> None:
+    if result.error is None:
+        logger.info(f"Sweep point {result.key} done in {result.wall_time:.1f}s")
+    else:
+        logger.warning(
+            f"Sweep point {result.key} failed after {result.wall_time:.1f}s:\n{result.error}"
+        )
+
+
+def run_sweep(
+    points: Dict[Hashable, List[str]],
+    num_workers: Optional[int] = None,
+    output_dir: Optional[str] = None,
+    max_retries: int = 0,
+    resume: bool = False,
+    warm_start: bool = False,
+) -> Dict[Hashable, SweepResult]:
+    """
+    Runs one simulation per sweep point, `points` maps a sweep key to the CLI
+    arguments of that point (same flags as `python -m vidur.main`).
+
+    Configs are built in-process and predictors are loaded once per distinct
+    predictor setup, then the points run on a forked process pool. With
+    `output_dir` set, every point writes under `<output_dir>/<key>/`, its
+    checkpoints (see `--checkpoint_config_interval`) under
+    `<output_dir>/<key>/checkpoints`. Failed points are retried up to
+    `max_retries` times from their latest checkpoint, and `resume` resumes every
+    point from its latest checkpoint, e.g. to restart a sweep that was killed;
+    finished points then only rewrite their output. Results are returned in the
+    order of `points`, keyed by sweep key. Points that still fail raise a
+    RuntimeError.
+
+    With `warm_start`, the requests are generated in this process as well, once
+    per distinct request generator config and seed, so points that only differ
+    in e.g. scheduler parameters share the arrival stream (and trace loading)
+    instead of each worker generating it again.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    for key, args in points.items():
+        if output_dir is not None:
+            args = [
+                *args,
+                "--metrics_config_output_dir",
+                f"{output_dir}/{key}",
+                "--checkpoint_config_output_dir",
+                f"{output_dir}/{key}/checkpoints",
+            ]
+        config = SimulationConfig.create_from_cli_args(args)
+        if resume:
+            config.checkpoint_config.resume_from = config.checkpoint_config.output_dir
+        _sweep_configs[key] = config
+
+    for config in _sweep_configs.values():
+        get_execution_time_predictor(config)
+
+        requests_key = _get_requests_key(config)
+        if warm_start and requests_key not in _sweep_requests:
+            _sweep_requests[requests_key] = generate_requests(config)
+
+    if warm_start:
+        logger.info(
+            f"Generated {sum(map(len, _sweep_requests.values()))} requests for"
+            f" {len(_sweep_requests)} distinct request generator setups"
+        )
+
+    try:
+        results = _run_sweep_points(list(points), num_workers)
+        for _ in range(max_retries):
+            failed_keys = [key for key in points if results[key].error is not None]
+            if not failed_keys:
+                break
+
+            for key in failed_keys:
+                checkpoint_config = _sweep_configs[key].checkpoint_config
+                checkpoint_config.resume_from = checkpoint_config.output_dir
+            logger.info(f"Retrying {len(failed_keys)} failed sweep points")
+            results.update(_run_sweep_points(failed_keys, num_workers))
+    finally:
+        _sweep_configs.clear()
+        _sweep_requests.clear()
+
+    failed_keys = [key for key in points if results[key].error is not None]
+    if failed_keys:
+        raise RuntimeError(f"Sweep points {failed_keys} failed")
+
+    return {key: results[key] for key in points}
@@ -1,6 +1,7 @@
 from vidur.types.activation_type import ActivationType
 from vidur.types.base_int_enum import BaseIntEnum
 from vidur.types.device_sku_type import DeviceSKUType
+from vidur.types.event_queue_type import EventQueueType
 from vidur.types.event_type import EventType
 from vidur.types.execution_time_predictor_type import ExecutionTimePredictorType
 from vidur.types.global_scheduler_type import GlobalSchedulerType
@@ -13,6 +14,7 @@ from vidur.types.request_length_generator_type import RequestLengthGeneratorType
 
 __all__ = [
     EventType,
+    EventQueueType,
     ExecutionTimePredictorType,
     GlobalSchedulerType,
     RequestGeneratorType,
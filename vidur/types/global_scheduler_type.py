@@ -5,3 +5,6 @@ class GlobalSchedulerType(BaseIntEnum):
     RANDOM = 1
     ROUND_ROBIN = 2
     LOR = 3
+    TOKEN_LOAD = 4
+    KV_AWARE = 5
+    POWER_OF_TWO = 6
@@ -0,0 +1,101 @@
+import glob
+import os
+import pickle
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, List, Optional
+
+from vidur.execution_time_predictor.model_store import write_file_atomically
+from vidur.logger import init_logger
+
+logger = init_logger(__name__)
+
+CHECKPOINT_FILE_PREFIX = "checkpoint_"
+CHECKPOINT_FILE_SUFFIX = ".pkl"
+
+
+def get_config_objects(config: Any, path: str = "config") -> Dict[str, Any]:
+    """
+    Maps the dotted path of every dataclass in a config tree to the object, e.g.
+    "config.cluster_config.replica_config".
+    """
+    objects = {path: config}
+    for config_field in fields(config):
+        value = getattr(config, config_field.name)
+        if is_dataclass(value):
+            objects.update(get_config_objects(value, f"{path}.{config_field.name}"))
+    return objects
+
+
+class _CheckpointPickler(pickle.Pickler):
+    # objects that are rebuilt by the resuming process (configs, the execution time
+    # predictor) are written as references and swapped in on load
+    def __init__(self, file, external_objects: Dict[str, Any]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._external_keys = {id(obj): key for key, obj in external_objects.items()}
+
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        return self._external_keys.get(id(obj))
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file, external_objects: Dict[str, Any]) -> None:
+        super().__init__(file)
+        self._external_objects = external_objects
+
+    def persistent_load(self, key: str) -> Any:
+        if key not in self._external_objects:
+            raise pickle.UnpicklingError(f"Checkpoint references unknown object {key}")
+        return self._external_objects[key]
+
+
+class Checkpointer:
+    """
+    Writes numbered snapshots of an object graph to a directory and keeps the
+    latest `num_to_keep` of them. Checkpoints are written atomically, a process
+    killed while writing one leaves the previous checkpoints intact.
+
+    Objects that cannot or should not be pickled are passed as `external_objects`
+    keyed by name, the checkpoint only stores the name and loading resolves it
+    against the objects of the resuming process.
+    """
+
+    def __init__(self, checkpoint_dir: str, num_to_keep: int) -> None:
+        self._checkpoint_dir = checkpoint_dir
+        self._num_to_keep = max(1, num_to_keep)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    @staticmethod
+    def list_checkpoints(checkpoint_dir: str) -> List[str]:
+        # the zero padded index keeps the lexicographic order chronological
+        return sorted(
+            glob.glob(
+                f"{checkpoint_dir}/{CHECKPOINT_FILE_PREFIX}*{CHECKPOINT_FILE_SUFFIX}"
+            )
+        )
+
+    @staticmethod
+    def find_checkpoint(path: str) -> Optional[str]:
+        """Returns `path` if it is a checkpoint file, else the latest one in it."""
+        if os.path.isfile(path):
+            return path
+
+        checkpoints = Checkpointer.list_checkpoints(path)
+        return checkpoints[-1] if checkpoints else None
+
+    def save(
+        self, index: int, state: Any, external_objects: Dict[str, Any]
+    ) -> str:
+        path = f"{self._checkpoint_dir}/{CHECKPOINT_FILE_PREFIX}{index:012d}{CHECKPOINT_FILE_SUFFIX}"
+        write_file_atomically(
+            path, lambda f: _CheckpointPickler(f, external_objects).dump(state)
+        )
+
+        for old_path in self.list_checkpoints(self._checkpoint_dir)[: -self._num_to_keep]:
+            os.remove(old_path)
+
+        return path
+
+    @staticmethod
+    def load(path: str, external_objects: Dict[str, Any]) -> Any:
+        with open(path, "rb") as f:
+            return _CheckpointUnpickler(f, external_objects).load()
@@ -0,0 +1,129 @@
+from collections import defaultdict
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from vidur.logger import init_logger
+
+logger = init_logger(__name__)
+
+ROOT_PHASE = "event_loop"
+
+
+class EventLoopProfiler:
+    """
+    Wall clock profiler for the simulator event loop. Time is attributed to the
+    stack of open phases, i.e. the event type being handled and below it the
+    instrumented scheduler, predictor and metrics store methods.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        self._start_times: List[float] = []
+        self._total_time: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._num_calls: Dict[Tuple[str, ...], int] = defaultdict(int)
+        # (object, attribute name, original instance attribute or None)
+        self._instrumented: List[Tuple[Any, str, Any]] = []
+
+    def begin(self, phase: str) -> None:
+        self._stack.append(phase)
+        self._start_times.append(perf_counter())
+
+    def end(self) -> None:
+        elapsed = perf_counter() - self._start_times.pop()
+        stack = tuple(self._stack)
+        self._stack.pop()
+        self._total_time[stack] += elapsed
+        self._num_calls[stack] += 1
+
+    def wrap(self, func: Callable, phase: str) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            self.begin(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.end()
+
+        return wrapper
+
+    def instrument(self, obj: Any, method_names: List[str]) -> None:
+        """
+        Times the given methods of `obj` by shadowing them with instance attributes,
+        `uninstrument` puts the object back the way it was.
+        """
+        for method_name in method_names:
+            self._instrumented.append((obj, method_name, obj.__dict__.get(method_name)))
+            setattr(
+                obj,
+                method_name,
+                self.wrap(
+                    getattr(obj, method_name), f"{type(obj).__name__}.{method_name}"
+                ),
+            )
+
+    def uninstrument(self) -> None:
+        for obj, method_name, original in reversed(self._instrumented):
+            if original is None:
+                delattr(obj, method_name)
+            else:
+                setattr(obj, method_name, original)
+        self._instrumented = []
+
+    def _get_self_times(self) -> Dict[Tuple[str, ...], float]:
+        self_times = dict(self._total_time)
+        for stack, total_time in self._total_time.items():
+            if len(stack) > 1:
+                self_times[stack[:-1]] -= total_time
+        return self_times
+
+    def get_summary(self) -> pd.DataFrame:
+        self_times = self._get_self_times()
+        loop_time = self._total_time.get((ROOT_PHASE,), 0) or float("nan")
+
+        columns = [
+            "phase",
+            "calls",
+            "total_time_s",
+            "self_time_s",
+            "mean_time_us",
+            "calls_per_s",
+            "loop_time_percent",
+        ]
+        rows = []
+        for stack in sorted(self._total_time):
+            total_time = self._total_time[stack]
+            num_calls = self._num_calls[stack]
+            rows.append(
+                (
+                    ";".join(stack),
+                    num_calls,
+                    total_time,
+                    self_times[stack],
+                    1e6 * total_time / num_calls,
+                    num_calls / total_time if total_time else float("nan"),
+                    100 * total_time / loop_time,
+                )
+            )
+        return pd.DataFrame(rows, columns=columns)
+
+    def write_collapsed_stacks(self, path: str) -> None:
+        # flamegraph.pl / speedscope collapsed format, weights are self time in us
+        with open(path, "w") as f:
+            for stack, self_time in sorted(self._get_self_times().items()):
+                f.write(f"{';'.join(stack)} {max(0, round(1e6 * self_time))}\n")
+
+    def write_output(self, output_dir: str) -> None:
+        summary = self.get_summary()
+        summary.to_csv(f"{output_dir}/event_loop_profile.csv", index=False)
+        self.write_collapsed_stacks(f"{output_dir}/event_loop_profile.collapsed")
+
+        event_types = summary[summary["phase"].str.count(";") == 1]
+        logger.info(
+            "Event loop profile by event type:\n"
+            + event_types.sort_values("total_time_s", ascending=False).to_string(
+                index=False
+            )
+        )
@@ -0,0 +1,82 @@
+import json
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class BaseTraceWriter(ABC):
+    """
+    Buffers trace records in memory and appends them to the output file in chunks
+    of `flush_interval` records, so memory use stays bounded and everything up to
+    the last flushed chunk survives a crash.
+    """
+
+    def __init__(self, path: str, flush_interval: int) -> None:
+        self._path = path
+        self._flush_interval = max(1, flush_interval)
+        self._buffer: List[dict] = []
+        self._num_records = 0
+        self._file = open(path, "w")
+
+    @property
+    def num_records(self) -> int:
+        return self._num_records
+
+    def write(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self._flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file.closed:
+            return
+
+        if self._buffer:
+            self._write_records(self._buffer)
+            self._num_records += len(self._buffer)
+            self._buffer = []
+
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        self.flush()
+        self._write_footer()
+        self._file.close()
+
+    @abstractmethod
+    def _write_records(self, records: List[dict]) -> None:
+        pass
+
+    def _write_footer(self) -> None:
+        pass
+
+
+class JsonlTraceWriter(BaseTraceWriter):
+    """Writes one JSON record per line."""
+
+    def _write_records(self, records: List[dict]) -> None:
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+class JsonArrayTraceWriter(BaseTraceWriter):
+    """
+    Streams records into a JSON array, optionally wrapped in an enclosing object,
+    e.g. prefix='{"traceEvents": [' and suffix="]}" for chrome traces. The output
+    is byte-identical to json.dump of the fully materialized object.
+    """
+
+    def __init__(
+        self, path: str, flush_interval: int, prefix: str = "[", suffix: str = "]"
+    ) -> None:
+        super().__init__(path, flush_interval)
+        self._suffix = suffix
+        self._file.write(prefix)
+
+    def _write_records(self, records: List[dict]) -> None:
+        separator = ", " if self._num_records else ""
+        self._file.write(separator + ", ".join(json.dumps(record) for record in records))
+
+    def _write_footer(self) -> None:
+        self._file.write(self._suffix)